@@ -0,0 +1,400 @@
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+import base_datos
+import busqueda
+import fechas
+import geografia
+import metricas
+
+load_dotenv()
+
+# API de solo lectura para consultar las carreras sin ir a Turso en cada petición:
+#   gunicorn -w 2 -b 0.0.0.0:8000 api:app
+# Cada proceso carga la tabla una vez en memoria, ordenada por fecha, y responde desde ahí.
+# Cuando la fusión escribe algo (columna `modificada`), la API solo relee esas filas; si desaparecen
+# filas de la tabla, la vuelve a leer entera.
+#
+#   GET  /carreras?desde=&hasta=&origen=&ubicacion=&limite=   (desde = hoy si no se pasa)
+#   GET  /carreras?cerca=37.99,-1.13&radio=15                  (o cerca=Cartagena: un lugar del nomenclátor)
+#   GET  /buscar?q=media marat&desde=&limite=                  (texto completo, ver busqueda.py)
+#   GET  /origenes
+#   GET  /salud
+#   POST /recargar   (la llama fusionar_carreras.py al terminar; con API_TOKEN si está configurado)
+
+# Cada cuántos segundos, como mucho, se mira en la base de datos si hay cambios
+INTERVALO_REVISION = float(os.getenv('API_INTERVALO_REVISION', '30'))
+TOKEN = os.getenv('API_TOKEN')
+LIMITE_MAXIMO = int(os.getenv('API_LIMITE_MAXIMO', '1000'))
+# Respuestas ya serializadas que se guardan por versión del índice
+RESPUESTAS_EN_CACHE = int(os.getenv('API_RESPUESTAS_EN_CACHE', '1024'))
+# Radio de las búsquedas con `cerca` si no se pasa `radio`, y el máximo que se acepta (km)
+RADIO_KM = float(os.getenv('API_RADIO_KM', '10'))
+RADIO_MAXIMO_KM = float(os.getenv('API_RADIO_MAXIMO_KM', '200'))
+
+COLUMNAS = ['id', 'titulo', 'fecha', 'ubicacion', 'url_inscripcion', 'url_ficha', 'imagen', 'origen',
+            'imagen_estado', 'imagen_ancho', 'imagen_alto', 'ubicacion_normalizada', 'latitud', 'longitud',
+            'modificada']
+# Lo que se devuelve de cada carrera
+CAMPOS_PUBLICOS = COLUMNAS[:-1]
+
+# Consultas de la carga y del refresco (migraciones.consultas_calientes() comprueba las de cada refresco)
+SQL_TODAS = f"SELECT {', '.join(COLUMNAS)} FROM carreras"
+SQL_ULTIMA_MARCA = "SELECT MAX(modificada) FROM carreras"
+# Recorre el índice más pequeño (unos pocos miles de filas): no está en las consultas calientes,
+# pero es la única forma de ver que se han borrado filas, que no dejan marca
+SQL_TOTAL = "SELECT COUNT(*) FROM carreras"
+SQL_CAMBIADAS = f"SELECT {', '.join(COLUMNAS)} FROM carreras WHERE modificada >= ?"
+
+
+def _normalizar(texto):
+    """Para buscar sin distinguir mayúsculas ni tildes."""
+    texto = unicodedata.normalize('NFKD', str(texto or '').casefold())
+    return texto.encode('ascii', 'ignore').decode('ascii')
+
+
+class Version:
+    """
+    Una foto del índice: las carreras ordenadas por fecha, para cada origen su propia
+    lista ordenada y un índice espacial con la posición de cada carrera que tiene
+    coordenadas. No se modifica nunca; al refrescar se crea otra y se cambia de golpe,
+    así las peticiones en curso no necesitan ningún lock.
+    """
+
+    def __init__(self, por_id, marca):
+        carreras = sorted(por_id.values(), key=lambda c: (c['fecha'], c['id']))
+        self.marca = marca
+        self.total = len(carreras)
+        self.etiqueta = hashlib.sha1(f"{marca}|{self.total}".encode('utf-8')).hexdigest()[:12]
+        self.todas = self._lista(carreras)
+        # Para /buscar, que recibe ids de la base de datos
+        self.json_por_id = {c['id']: c['json'] for c in carreras}
+        agrupadas = {}
+        for carrera in carreras:
+            agrupadas.setdefault(carrera['origen'], []).append(carrera)
+        self.por_origen = {origen: self._lista(lista) for origen, lista in agrupadas.items()}
+        self.origenes = [c['origen'] for c in carreras]
+        self.espacial = geografia.IndiceEspacial(
+            (c['latitud'], c['longitud'], posicion) for posicion, c in enumerate(carreras)
+            if c['latitud'] is not None and c['longitud'] is not None
+        )
+        self.respuestas = {}
+
+    @staticmethod
+    def _lista(carreras):
+        # Fechas (para bisect), ubicación normalizada y JSON ya serializado de cada carrera
+        return (
+            [c['fecha'] for c in carreras],
+            [_normalizar(c['ubicacion']) for c in carreras],
+            [c['json'] for c in carreras],
+        )
+
+    def buscar(self, desde, hasta=None, origen=None, ubicacion=None, limite=None, cerca=None, radio=None):
+        """
+        JSON (ya serializado) de las carreras entre `desde` y `hasta` (incluidas), en orden de fecha.
+        Con `cerca` ((lat, lon)) solo las que están a `radio` km o menos.
+        """
+        if cerca is not None:
+            return self._buscar_cerca(desde, hasta, origen, ubicacion, limite, cerca, radio or RADIO_KM)
+        lista = self.por_origen.get(origen) if origen else self.todas
+        if lista is None:
+            return []
+        dias, ubicaciones, textos = lista
+        inicio = bisect.bisect_left(dias, desde) if desde else 0
+        fin = bisect.bisect_right(dias, hasta) if hasta else len(dias)
+        if ubicacion:
+            buscada = _normalizar(ubicacion)
+            resultado = [textos[i] for i in range(inicio, fin) if buscada in ubicaciones[i]]
+        else:
+            resultado = textos[inicio:fin]
+        return resultado[:limite] if limite else resultado
+
+    def _buscar_cerca(self, desde, hasta, origen, ubicacion, limite, cerca, radio):
+        # El índice espacial da las posiciones en `todas`; las fechas se filtran por posición
+        dias, ubicaciones, textos = self.todas
+        inicio = bisect.bisect_left(dias, desde) if desde else 0
+        fin = bisect.bisect_right(dias, hasta) if hasta else len(dias)
+        posiciones = sorted(p for p in self.espacial.buscar(cerca[0], cerca[1], radio) if inicio <= p < fin)
+        if origen:
+            posiciones = [p for p in posiciones if self.origenes[p] == origen]
+        if ubicacion:
+            buscada = _normalizar(ubicacion)
+            posiciones = [p for p in posiciones if buscada in ubicaciones[p]]
+        return [textos[p] for p in posiciones[:limite or None]]
+
+
+def _conectar():
+    """
+    Como base_datos.conectar(), pero con MODO_BD=replica va directamente a Turso: la copia
+    local solo se sincroniza al conectar y la API se quedaría para siempre con esa foto.
+    """
+    return base_datos.conectar('remoto' if base_datos.MODO_BD == 'replica' else None)
+
+
+class IndiceCarreras:
+    """La tabla carreras en memoria. Se carga entera la primera vez y luego solo lo que cambia."""
+
+    def __init__(self, conectar=None):
+        self.conectar = conectar or _conectar
+        self.client = None
+        self.por_id = {}
+        # Todos los ids de la tabla, también los de las filas que no se sirven (fecha ilegible)
+        self.ids = set()
+        self.version = None
+        self.revisado = 0.0
+        self.lock = threading.Lock()
+
+    def cliente(self):
+        if self.client is None:
+            self.client = self.conectar()
+        return self.client
+
+    def _leer(self, sql, args=None):
+        return self.cliente().execute(sql, args)
+
+    def _guardar(self, filas):
+        for fila in filas:
+            carrera = dict(zip(COLUMNAS, fila))
+            self.ids.add(carrera['id'])
+            dia = fechas.parsear_fecha(carrera['fecha'])
+            if dia is None:
+                self.por_id.pop(carrera['id'], None)
+                continue
+            carrera['fecha'] = dia.isoformat()
+            carrera['json'] = json.dumps({campo: carrera[campo] for campo in CAMPOS_PUBLICOS},
+                                         ensure_ascii=False, separators=(',', ':'))
+            self.por_id[carrera['id']] = carrera
+
+    def cargar(self):
+        """Lee la tabla entera."""
+        inicio = time.perf_counter()
+        filas = self._leer(SQL_TODAS).rows
+        self.por_id = {}
+        self.ids = set()
+        self._guardar(filas)
+        marca = max((c['modificada'] for c in self.por_id.values() if c['modificada']), default='')
+        self.version = Version(self.por_id, marca)
+        self.revisado = time.monotonic()
+        metricas.observar('api_recarga_segundos', time.perf_counter() - inicio, tipo='completa')
+        return len(filas)
+
+    def refrescar(self, forzar=False):
+        """
+        Si ha pasado INTERVALO_REVISION (o `forzar`), mira si hay filas con una marca `modificada`
+        posterior a la última vista y relee solo esas. Si la tabla tiene menos filas de las que
+        habría sin borrar ninguna, la relee entera. Devuelve cuántas filas se han releído.
+        """
+        if self.version is None:
+            with self.lock:
+                if self.version is None:
+                    return self.cargar()
+        if not forzar and time.monotonic() - self.revisado < INTERVALO_REVISION:
+            return 0
+        # Si otro hilo ya está refrescando, esta petición sigue con la versión actual
+        if not self.lock.acquire(blocking=forzar):
+            return 0
+        try:
+            self.revisado = time.monotonic()
+            ultima = self._leer(SQL_ULTIMA_MARCA).rows[0][0] or ''
+            total = self._leer(SQL_TOTAL).rows[0][0]
+            if ultima <= self.version.marca and total == len(self.ids):
+                return 0
+            inicio = time.perf_counter()
+            # >= por si se escribieron más filas en el mismo milisegundo que la última vista
+            filas = self._leer(SQL_CAMBIADAS, [self.version.marca]).rows if ultima > self.version.marca else []
+            if total != len(self.ids | {fila[0] for fila in filas}):
+                # Se han borrado filas (o se ha escrito entre las dos lecturas): se relee todo
+                return self.cargar()
+            self._guardar(filas)
+            self.version = Version(self.por_id, ultima)
+            metricas.observar('api_recarga_segundos', time.perf_counter() - inicio, tipo='incremental')
+            return len(filas)
+        finally:
+            self.lock.release()
+
+
+indice = IndiceCarreras()
+
+
+# --- WSGI ---
+
+class ErrorPeticion(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _parametros(environ):
+    # WSGI entrega la cadena como latin-1; si el cliente no la ha codificado con %XX, viene en UTF-8
+    cadena = environ.get('QUERY_STRING', '').encode('latin-1', 'replace').decode('utf-8', 'replace')
+    valores = parse_qs(cadena)
+    return {clave: lista[-1] for clave, lista in valores.items()}
+
+
+def _fecha(texto, nombre):
+    if not texto:
+        return None
+    dia = fechas.parsear_fecha(texto)
+    if dia is None:
+        raise ErrorPeticion('400 Bad Request', f"'{nombre}' no es una fecha: {texto}")
+    return dia.isoformat()
+
+
+def _cerca(texto):
+    """'37.99,-1.13' o el nombre de un lugar del nomenclátor -> (lat, lon)."""
+    if not texto:
+        return None
+    partes = texto.split(',')
+    if len(partes) == 2:
+        try:
+            latitud, longitud = float(partes[0]), float(partes[1])
+        except ValueError:
+            pass
+        else:
+            if -90 <= latitud <= 90 and -180 <= longitud <= 180:
+                return round(latitud, 4), round(longitud, 4)
+            raise ErrorPeticion('400 Bad Request', f"'cerca' no son unas coordenadas válidas: {texto}")
+    punto = geografia.coordenadas(texto)
+    if punto is None:
+        raise ErrorPeticion('400 Bad Request', f"no se conoce el lugar '{texto}' (usa cerca=latitud,longitud)")
+    return punto
+
+
+def consulta_carreras(parametros):
+    """Normaliza los parámetros de /carreras. Devuelve la clave de la respuesta (también sirve para el ETag)."""
+    try:
+        limite = int(parametros.get('limite') or LIMITE_MAXIMO)
+    except ValueError:
+        raise ErrorPeticion('400 Bad Request', "'limite' tiene que ser un número")
+    try:
+        radio = float(parametros.get('radio') or RADIO_KM)
+    except ValueError:
+        raise ErrorPeticion('400 Bad Request', "'radio' tiene que ser un número (km)")
+    cerca = _cerca(parametros.get('cerca'))
+    return (
+        _fecha(parametros.get('desde'), 'desde') or datetime.date.today().isoformat(),
+        _fecha(parametros.get('hasta'), 'hasta'),
+        parametros.get('origen') or None,
+        parametros.get('ubicacion') or None,
+        max(1, min(limite, LIMITE_MAXIMO)),
+        cerca,
+        max(0.0, min(radio, RADIO_MAXIMO_KM)) if cerca else None,
+    )
+
+
+def responder_carreras(version, parametros):
+    clave = consulta_carreras(parametros)
+    cuerpo = version.respuestas.get(clave)
+    if cuerpo is None:
+        encontradas = version.buscar(*clave)
+        cuerpo = f'{{"total":{len(encontradas)},"carreras":[{",".join(encontradas)}]}}'.encode('utf-8')
+        if len(version.respuestas) < RESPUESTAS_EN_CACHE:
+            version.respuestas[clave] = cuerpo
+    return clave, cuerpo
+
+
+def responder_busqueda(version, parametros):
+    """
+    /buscar va a la base de datos (al índice FTS5), pero la respuesta se guarda con las de
+    /carreras: hasta que cambie la versión del índice, la misma búsqueda no se repite.
+    Las filas se sirven desde la versión en memoria, con los mismos campos que /carreras. Si
+    la base de datos devuelve una que la versión aún no tiene (se ha escrito después del último
+    refresco), se refresca el índice y se responde con la versión nueva.
+    """
+    consulta = busqueda.consulta_fts(parametros.get('q'))
+    if consulta is None:
+        raise ErrorPeticion('400 Bad Request', "falta 'q' (alguna palabra de al menos dos letras)")
+    try:
+        limite = max(1, min(int(parametros.get('limite') or busqueda.LIMITE), LIMITE_MAXIMO))
+    except ValueError:
+        raise ErrorPeticion('400 Bad Request', "'limite' tiene que ser un número")
+    clave = ('buscar', consulta, _fecha(parametros.get('desde'), 'desde') or datetime.date.today().isoformat(), limite)
+    cuerpo = version.respuestas.get(clave)
+    if cuerpo is None:
+        filas, total = busqueda.buscar_con_total(indice.cliente(), parametros['q'], *clave[2:])
+        if any(c['id'] not in version.json_por_id for c in filas):
+            indice.refrescar(forzar=True)
+            version = indice.version
+        encontradas = [version.json_por_id[c['id']] for c in filas if c['id'] in version.json_por_id]
+        # Las que siguen sin estar son filas que la API no sirve (fecha ilegible)
+        total -= len(filas) - len(encontradas)
+        cuerpo = f'{{"total":{total},"carreras":[{",".join(encontradas)}]}}'.encode('utf-8')
+        if len(version.respuestas) < RESPUESTAS_EN_CACHE:
+            version.respuestas[clave] = cuerpo
+    return clave, cuerpo
+
+
+def _json(datos):
+    return json.dumps(datos, ensure_ascii=False).encode('utf-8')
+
+
+def _rutas(metodo, ruta, environ, version):
+    """Devuelve (estado, cuerpo, clave para el ETag o None)."""
+    if ruta == '/recargar':
+        if metodo != 'POST':
+            raise ErrorPeticion('405 Method Not Allowed', "usa POST")
+        if TOKEN and environ.get('HTTP_AUTHORIZATION') != f"Bearer {TOKEN}":
+            raise ErrorPeticion('401 Unauthorized', "falta el token")
+        releidas = indice.refrescar(forzar=True)
+        return '200 OK', _json({'releidas': releidas, 'total': indice.version.total}), None
+
+    if metodo not in ('GET', 'HEAD'):
+        raise ErrorPeticion('405 Method Not Allowed', "solo lectura")
+    if ruta == '/carreras':
+        clave, cuerpo = responder_carreras(version, _parametros(environ))
+        return '200 OK', cuerpo, clave
+    if ruta == '/buscar':
+        clave, cuerpo = responder_busqueda(version, _parametros(environ))
+        return '200 OK', cuerpo, clave
+    if ruta == '/origenes':
+        origenes = {origen: len(lista[0]) for origen, lista in version.por_origen.items()}
+        return '200 OK', _json(origenes), ('origenes',)
+    if ruta == '/salud':
+        return '200 OK', _json({'carreras': version.total, 'modificada': version.marca}), None
+    raise ErrorPeticion('404 Not Found', f"no existe {ruta}")
+
+
+def app(environ, start_response):
+    # Sin métricas por petición: el proceso vive días y los histogramas de metricas.py crecerían sin fin
+    metodo = environ.get('REQUEST_METHOD', 'GET')
+    ruta = environ.get('PATH_INFO') or '/'
+    cabeceras = [('Content-Type', 'application/json; charset=utf-8')]
+    try:
+        indice.refrescar()
+        version = indice.version
+        estado, cuerpo, clave = _rutas(metodo, ruta, environ, version)
+    except ErrorPeticion as e:
+        estado, cuerpo, clave = e.estado, _json({'error': str(e)}), None
+    except Exception as e:
+        print(f"❌ Error en la API ({ruta}): {e}")
+        estado, cuerpo, clave = '503 Service Unavailable', _json({'error': 'base de datos no disponible'}), None
+
+    if clave is not None:
+        # La misma consulta sobre la misma versión del índice da siempre la misma respuesta
+        etag = f'"{version.etiqueta}-{hashlib.sha1(repr(clave).encode("utf-8")).hexdigest()[:8]}"'
+        cabeceras += [('ETag', etag), ('Cache-Control', f"public, max-age={int(INTERVALO_REVISION)}")]
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            estado, cuerpo = '304 Not Modified', b''
+            cabeceras = cabeceras[1:]
+
+    cabeceras.append(('Content-Length', str(len(cuerpo))))
+    start_response(estado, cabeceras)
+    return [b''] if metodo == 'HEAD' else [cuerpo]
+
+
+if __name__ == "__main__":
+    # Para probar en local sin gunicorn: python api.py
+    from wsgiref.simple_server import make_server
+
+    puerto = int(os.getenv('API_PUERTO', '8000'))
+    print(f"🌐 API en http://127.0.0.1:{puerto}/carreras")
+    make_server('127.0.0.1', puerto, app).serve_forever()
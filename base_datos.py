@@ -0,0 +1,346 @@
+import hashlib
+import os
+import time
+
+import libsql_client
+from dotenv import load_dotenv
+
+import geografia
+import metricas
+import migraciones
+
+load_dotenv()
+
+# remoto  -> todas las consultas van a Turso (como siempre)
+# replica -> se copia la tabla de Turso a un SQLite local, se lee en local y solo se envían las escrituras
+# local   -> solo el fichero SQLite local, sin conexión (para pruebas y ejecuciones offline)
+MODO_BD = os.getenv('MODO_BD', 'remoto')
+RUTA_BD_LOCAL = os.getenv('RUTA_BD_LOCAL', 'data/carreras.db')
+
+IMAGEN_DEFECTO_URL_ALCANZA = 'https://www.alcanzatumeta.es/assets/images/no_image.png'
+
+# Número de carreras por SELECT ... IN (...) y de sentencias por transacción
+TAMANO_LOTE = 200
+
+# Marca de la columna `modificada` (la usa la API para releer solo lo que ha cambiado)
+AHORA = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Campos que forman el hash de contenido: si ninguno cambia, la fila no se reescribe
+CAMPOS_HASH = ['fecha', 'ubicacion', 'url_inscripcion', 'url_ficha', 'imagen', 'origen']
+
+# La imagen por defecto de Alcanza (o una que imagenes.py ha visto rota) se sustituye; una imagen
+# propia que funciona se conserva. Es la regla de preparar_sentencias, para el ON CONFLICT.
+SUSTITUIR_IMAGEN = f"""
+    CASE WHEN carreras.imagen = '{IMAGEN_DEFECTO_URL_ALCANZA}'
+              OR (carreras.imagen_estado = 'rota' AND excluded.imagen IS NOT NULL)
+         THEN excluded.imagen ELSE carreras.imagen END
+"""
+
+# Consultas de la sincronización (migraciones.consultas_calientes() comprueba que van por índice).
+# {marcas} son los ? de cada lote de carreras: se leen las filas con su título normalizado (la
+# clave de la tabla) o con su título tal cual (filas con un título normalizado de otra versión).
+SQL_LEER_EXISTENTES = """
+    SELECT id, titulo, titulo_normalizado, fecha, ubicacion_normalizada, imagen, hash_contenido, imagen_estado
+    FROM carreras WHERE titulo_normalizado IN ({marcas}) OR titulo IN ({marcas})
+"""
+# preparar_sentencias ya busca la fila por la clave; el ON CONFLICT solo salta si otra ejecución
+# la ha insertado entre la lectura y la escritura
+SQL_INSERTAR = f"""
+    INSERT INTO carreras (fecha, titulo, ubicacion, url_inscripcion, url_ficha, imagen, origen, publicada, hash_contenido, titulo_normalizado, modificada,
+                          ubicacion_normalizada, latitud, longitud)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, {AHORA}, ?, ?, ?)
+    ON CONFLICT ({migraciones.CLAVE_CARRERA}) DO UPDATE SET
+        titulo = excluded.titulo, ubicacion = excluded.ubicacion, url_inscripcion = excluded.url_inscripcion,
+        url_ficha = excluded.url_ficha, imagen = {SUSTITUIR_IMAGEN}, origen = excluded.origen,
+        hash_contenido = excluded.hash_contenido, modificada = excluded.modificada,
+        ubicacion_normalizada = excluded.ubicacion_normalizada, latitud = excluded.latitud, longitud = excluded.longitud
+"""
+SQL_ACTUALIZAR = f"""
+    UPDATE carreras
+    SET titulo = ?, fecha = ?, ubicacion = ?, url_ficha = ?, imagen = ?, origen = ?, url_inscripcion = ?, hash_contenido = ?,
+        titulo_normalizado = ?, modificada = {AHORA}, ubicacion_normalizada = ?, latitud = ?, longitud = ?
+    WHERE id = ?
+"""
+
+
+def _trozos(lista, tamano):
+    for i in range(0, len(lista), tamano):
+        yield lista[i:i + tamano]
+
+
+def activar_modo_local():
+    global MODO_BD
+    MODO_BD = 'local'
+
+
+def _es_lectura(sentencia):
+    sql = sentencia[0] if isinstance(sentencia, tuple) else sentencia
+    return sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'PRAGMA', 'WITH', 'EXPLAIN')
+
+
+class ClienteReplica:
+    """
+    Réplica embebida: una copia local en SQLite de la tabla carreras.
+    Las lecturas se hacen contra la copia local (sin latencia de red) y las
+    escrituras se envían a Turso y se aplican también en local para que
+    la copia siga al día durante la ejecución.
+    """
+
+    def __init__(self, remoto, local):
+        self.remoto = remoto
+        self.local = local
+
+    def sincronizar(self):
+        """
+        Trae la tabla carreras completa de Turso (con su esquema, índices y la tabla de
+        búsqueda con sus disparadores) en un solo viaje. Al insertar las filas, los
+        disparadores rellenan también la búsqueda local.
+        """
+        esquema, resultado = self.remoto.batch([
+            # Primero las tablas, luego los índices y al final los disparadores, que las necesitan
+            "SELECT sql FROM sqlite_master WHERE tbl_name IN ('carreras', 'carreras_fts') AND sql IS NOT NULL "
+            "ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END, tbl_name",
+            "SELECT * FROM carreras",
+        ])
+        columnas = list(resultado.columns)
+        marcas = ', '.join('?' * len(columnas))
+        sentencias = ["DROP TABLE IF EXISTS carreras_fts", "DROP TABLE IF EXISTS carreras"]
+        sentencias += [fila[0] for fila in esquema.rows]
+        sentencias += [
+            (f"INSERT INTO carreras ({', '.join(columnas)}) VALUES ({marcas})", list(fila))
+            for fila in resultado.rows
+        ]
+        self.local.batch(sentencias)
+        return len(resultado.rows)
+
+    def execute(self, sql, args=None):
+        if _es_lectura(sql):
+            return self.local.execute(sql, args)
+        resultado = self.remoto.execute(sql, args)
+        self.local.execute(sql, args)
+        return resultado
+
+    def batch(self, sentencias):
+        resultados = self.remoto.batch(sentencias)
+        self.local.batch(sentencias)
+        return resultados
+
+    def close(self):
+        self.remoto.close()
+        self.local.close()
+
+
+def _crear_cliente_local():
+    carpeta = os.path.dirname(RUTA_BD_LOCAL)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    return libsql_client.create_client_sync(f"file:{RUTA_BD_LOCAL}")
+
+
+def conectar(modo=None):
+    """
+    Devuelve un cliente (con .execute / .batch / .close) según `modo` (MODO_BD si no se pasa),
+    o None si faltan las credenciales de Turso. El esquema se deja al día
+    con las migraciones pendientes (ver migraciones.py).
+    """
+    modo = modo or MODO_BD
+    if modo == 'local':
+        client = _crear_cliente_local()
+        try:
+            migraciones.migrar(client)
+        except Exception:
+            client.close()
+            raise
+        print(f"   ✅ Usando base de datos local ({RUTA_BD_LOCAL})")
+        return client
+
+    turso_url = os.getenv('TURSO_DATABASE_URL')
+    turso_token = os.getenv('TURSO_AUTH_TOKEN')
+    if not turso_url or not turso_token:
+        print("❌ Faltan las credenciales de Turso en las variables de entorno.")
+        return None
+
+    # Nos conectamos directamente a la nube
+    remoto = libsql_client.create_client_sync(turso_url, auth_token=turso_token)
+    try:
+        migraciones.migrar(remoto)
+    except Exception:
+        remoto.close()
+        raise
+    if modo != 'replica':
+        print("   ✅ Conectado a Turso (Modo Remoto)")
+        return remoto
+
+    client = ClienteReplica(remoto, _crear_cliente_local())
+    try:
+        filas = client.sincronizar()
+    except Exception:
+        client.close()
+        raise
+    print(f"   ✅ Conectado a Turso (Modo Réplica: {filas} carreras copiadas a {RUTA_BD_LOCAL})")
+    return client
+
+
+def hash_carrera(carrera, imagen):
+    """Hash de los campos que se guardan de la carrera (con la imagen que quedará en la BD)."""
+    valores = [getattr(carrera, campo) if campo != 'imagen' else imagen for campo in CAMPOS_HASH]
+    texto = '\x1f'.join('' if v is None else str(v) for v in valores)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+COLUMNAS_EXISTENTES = ['id', 'titulo', 'titulo_normalizado', 'fecha', 'ubicacion_normalizada', 'imagen',
+                       'hash_contenido', 'imagen_estado']
+
+
+def leer_existentes(client, carreras):
+    """
+    Devuelve las filas de la base de datos que pueden ser alguna de `carreras` (como diccionarios
+    con COLUMNAS_EXISTENTES), con una consulta por cada lote en vez de una por carrera.
+    """
+    existentes = {}
+    consultas = 0
+    for lote in _trozos(list(carreras), TAMANO_LOTE):
+        marcas = ', '.join('?' * len(lote))
+        args = [c.clave for c in lote] + [c.titulo for c in lote]
+        with metricas.cronometro('bd_viaje_segundos', tipo='lectura'):
+            resultado = client.execute(SQL_LEER_EXISTENTES.format(marcas=marcas), args)
+        consultas += 1
+        metricas.contar('bd_viajes', tipo='lectura')
+        for fila in resultado.rows:
+            existentes[fila[0]] = dict(zip(COLUMNAS_EXISTENTES, fila))
+    return list(existentes.values()), consultas
+
+
+class _Existentes:
+    """
+    Las filas leídas, para encontrar la de cada carrera. Por orden: la que tiene la misma clave
+    (título normalizado, fecha y lugar); la del mismo título normalizado y fecha si a una de las
+    dos le falta el lugar; la del mismo título y fecha (título normalizado de otra versión).
+    Cada fila es de una sola carrera: dos carreras con el mismo título en días o pueblos
+    distintos no se pisan.
+    """
+
+    def __init__(self, filas):
+        self.por_normalizado = {}
+        self.por_titulo = {}
+        for fila in filas:
+            self.por_normalizado.setdefault((fila['titulo_normalizado'], fila['fecha']), []).append(fila)
+            self.por_titulo.setdefault((fila['titulo'], fila['fecha']), []).append(fila)
+        self.usadas = set()
+
+    def buscar(self, carrera, ubicacion_normalizada):
+        mismas = [f for f in self.por_normalizado.get((carrera.clave, carrera.fecha), []) if f['id'] not in self.usadas]
+        lugar = ubicacion_normalizada or ''
+        candidatas = (
+            [f for f in mismas if (f['ubicacion_normalizada'] or '') == lugar]
+            or [f for f in mismas if not lugar or not f['ubicacion_normalizada']]
+            or [f for f in self.por_titulo.get((carrera.titulo, carrera.fecha), []) if f['id'] not in self.usadas]
+        )
+        if not candidatas:
+            return None
+        self.usadas.add(candidatas[0]['id'])
+        return candidatas[0]
+
+
+def preparar_sentencias(carreras, existentes):
+    """
+    Calcula en local qué hay que insertar y qué actualizar (`existentes` son las filas de
+    leer_existentes). Devuelve la lista de (tipo, sentencia) con tipo 'nueva' o 'actualizada', el
+    número de carreras que no han cambiado y el tiempo gastado calculando hashes.
+    """
+    sentencias = []
+    sin_cambios = 0
+    tiempo_hash = 0.0
+    existentes = _Existentes(existentes)
+
+    for c in carreras:
+        # Lugar y coordenadas (memorizados por ubicación): salen de la ubicación, que ya está en el hash
+        lugar = geografia.columnas_ubicacion(c.ubicacion)
+        fila = existentes.buscar(c, lugar[0])
+
+        # La imagen por defecto de Alcanza (o una que imagenes.py ha visto rota) se sustituye;
+        # una imagen propia que funciona se conserva (lo mismo que SUSTITUIR_IMAGEN)
+        es_nueva = fila is None
+        sustituir = not es_nueva and (fila['imagen'] == IMAGEN_DEFECTO_URL_ALCANZA
+                                      or (fila['imagen_estado'] == 'rota' and c.imagen))
+        imagen = c.imagen if es_nueva or sustituir else fila['imagen']
+
+        inicio = time.perf_counter()
+        hash_nuevo = hash_carrera(c, imagen)
+        tiempo_hash += time.perf_counter() - inicio
+
+        if es_nueva:
+            # CASO 1: ES NUEVA
+            sentencias.append(('nueva', (SQL_INSERTAR, [
+                c.fecha, c.titulo, c.ubicacion, c.url_inscripcion, c.url_ficha, imagen, c.origen, hash_nuevo, c.clave, *lugar,
+            ])))
+
+        elif hash_nuevo == fila['hash_contenido'] and c.titulo == fila['titulo'] and c.clave == fila['titulo_normalizado']:
+            # CASO 2: YA EXISTE y no ha cambiado nada -> no se escribe
+            sin_cambios += 1
+
+        else:
+            # CASO 3: YA EXISTE y ha cambiado algo (el contenido o el título)
+            sentencias.append(('actualizada', (SQL_ACTUALIZAR, [
+                c.titulo, c.fecha, c.ubicacion, c.url_ficha, imagen, c.origen, c.url_inscripcion, hash_nuevo, c.clave, *lugar,
+                fila['id'],
+            ])))
+
+    return sentencias, sin_cambios, tiempo_hash
+
+
+def aplicar_sentencias(client, sentencias):
+    """
+    Ejecuta las sentencias en transacciones de TAMANO_LOTE (un viaje por lote).
+    Si un lote falla, se repite sentencia a sentencia para saber cuál es la culpable
+    y no perder las demás.
+    """
+    resumen = {'nueva': 0, 'actualizada': 0, 'errores': 0, 'viajes': 0}
+
+    for lote in _trozos(sentencias, TAMANO_LOTE):
+        metricas.contar('bd_viajes', tipo='lote')
+        try:
+            with metricas.cronometro('bd_viaje_segundos', tipo='lote'):
+                client.batch([sentencia for _, sentencia in lote])
+            resumen['viajes'] += 1
+            for tipo, _ in lote:
+                resumen[tipo] += 1
+            continue
+        except Exception as e:
+            resumen['viajes'] += 1
+            print(f"   ⚠️ Falló un lote de {len(lote)} sentencias ({e}). Reintentando una a una...")
+
+        for tipo, (sql, args) in lote:
+            metricas.contar('bd_viajes', tipo='sentencia')
+            try:
+                with metricas.cronometro('bd_viaje_segundos', tipo='sentencia'):
+                    client.execute(sql, args)
+                resumen[tipo] += 1
+            except Exception as e:
+                print(f"   ⚠️ Error guardando '{args[1] if tipo == 'nueva' else args[0]}': {e}")
+                resumen['errores'] += 1
+            resumen['viajes'] += 1
+
+    return resumen
+
+
+def sincronizar_carreras(client, carreras):
+    """
+    Inserta o actualiza la lista de carreras (objetos Carrera) en bloque:
+    una lectura por lote de carreras + una transacción por lote de escrituras,
+    en vez de 2 viajes por carrera. Las carreras cuyo hash de contenido no ha
+    cambiado no se escriben.
+    """
+    inicio = time.perf_counter()
+
+    existentes, consultas = leer_existentes(client, carreras)
+    sentencias, sin_cambios, tiempo_hash = preparar_sentencias(carreras, existentes)
+    resumen = aplicar_sentencias(client, sentencias)
+
+    resumen['sin_cambios'] = sin_cambios
+    for tipo in ('nueva', 'actualizada', 'sin_cambios', 'errores'):
+        metricas.contar('bd_carreras', resumen[tipo], resultado=tipo)
+    resumen['segundos_hash'] = tiempo_hash
+    resumen['viajes'] += consultas + 1
+    resumen['segundos'] = time.perf_counter() - inicio
+    return resumen
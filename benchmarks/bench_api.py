@@ -0,0 +1,313 @@
+"""
+Prueba de carga de api.py contra una base SQLite local con la tabla carreras
+(MODO_BD=local, en una carpeta temporal) llena de carreras sintéticas.
+
+    python benchmarks/bench_api.py                                  # 10k carreras, 16 clientes, 5 s
+    python benchmarks/bench_api.py --carreras 50000 --clientes 32 --segundos 10
+    python benchmarks/bench_api.py --servidor wsgiref               # sin gunicorn
+
+Mide peticiones por segundo y latencia (p50/p99) de:
+  - la API por HTTP (gunicorn si está instalado; si no, wsgiref con hilos),
+  - la aplicación WSGI llamada directamente, sin red (lo que cuesta el índice en memoria),
+  - como referencia, la misma consulta hecha contra SQLite en cada petición,
+y lo que tarda la recarga completa del índice frente a la incremental tras
+cambiar unas pocas filas. La mitad de las peticiones HTTP llevan el ETag de
+una respuesta anterior (If-None-Match), como haría un navegador o un CDN.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import socketserver
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.sintetico import LUGARES, ORIGENES, generar_carreras  # noqa: E402
+
+try:
+    import gunicorn  # noqa: F401
+    HAY_GUNICORN = True
+except ImportError:
+    HAY_GUNICORN = False
+
+
+def llenar_base(n):
+    """Crea la base temporal con hasta n carreras por el mismo camino que la fusión. Devuelve su ruta y las filas."""
+    import base_datos
+    from modelo import Carrera
+
+    ruta = os.path.join(tempfile.mkdtemp(prefix='bench_api_'), 'carreras.db')
+    base_datos.RUTA_BD_LOCAL = ruta
+    base_datos.activar_modo_local()
+    # Una por título normalizado y fecha, como quedan tras la deduplicación de la fusión
+    unicas, titulos = {}, set()
+    for fila in generar_carreras(n, dias=730):
+        carrera = Carrera.desde_dict(fila)
+        if (carrera.clave, carrera.fecha) in unicas or carrera.titulo in titulos:
+            continue
+        unicas[(carrera.clave, carrera.fecha)] = carrera
+        titulos.add(carrera.titulo)
+    carreras = list(unicas.values())
+    client = base_datos.conectar()
+    base_datos.sincronizar_carreras(client, carreras)
+    total = client.execute("SELECT COUNT(*) FROM carreras").rows[0][0]
+    client.close()
+    return ruta, total
+
+
+def generar_consultas(n, semilla=0):
+    """Parámetros de /carreras como los pediría la web: próximas, un mes, una fuente, un pueblo."""
+    azar = random.Random(semilla)
+    consultas = []
+    for _ in range(n):
+        mes = azar.randint(1, 12)
+        anio = azar.choice([2026, 2027])
+        parametros = {}
+        tipo = azar.random()
+        if tipo < 0.2:
+            parametros['limite'] = 20
+        else:
+            parametros['desde'] = f"{anio}-{mes:02d}-01"
+            parametros['hasta'] = f"{anio}-{mes:02d}-28"
+            if tipo < 0.5:
+                parametros['origen'] = azar.choice(ORIGENES)
+            elif tipo < 0.7:
+                parametros['ubicacion'] = azar.choice(LUGARES).lower()
+        consultas.append(parametros)
+    return consultas
+
+
+def _ruta(parametros):
+    return f"/carreras?{urlencode(parametros)}" if parametros else "/carreras"
+
+
+def _resumen(nombre, latencias, segundos, extra=''):
+    import metricas
+
+    ordenadas = sorted(latencias)
+    print(f"{nombre:<28} | {len(ordenadas) / segundos:>9.0f} | {metricas.percentil(ordenadas, 50) * 1000:>8.2f} | "
+          f"{metricas.percentil(ordenadas, 99) * 1000:>8.2f} | {extra}")
+
+
+# --- Servidores ---
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class _Silencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _ServidorConHilos(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def arrancar_servidor(tipo, ruta_bd, trabajadores, hilos):
+    """Devuelve (puerto, función para pararlo)."""
+    puerto = _puerto_libre()
+    if tipo == 'gunicorn':
+        entorno = dict(os.environ, MODO_BD='local', RUTA_BD_LOCAL=ruta_bd)
+        proceso = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-w', str(trabajadores), '--threads', str(hilos),
+             '-b', f'127.0.0.1:{puerto}', '--log-level', 'warning', 'api:app'],
+            cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL,
+        )
+        parar = proceso.terminate
+    else:
+        servidor = make_server('127.0.0.1', puerto, _app(), server_class=_ServidorConHilos, handler_class=_Silencioso)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        parar = servidor.shutdown
+
+    # Espera a que responda (la primera petición carga el índice)
+    for _ in range(200):
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=5)
+            conexion.request('GET', '/salud')
+            conexion.getresponse().read()
+            conexion.close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return puerto, parar
+
+
+def _app():
+    import api
+    return api.app
+
+
+# --- Carga ---
+
+def cargar_http(puerto, consultas, clientes, segundos):
+    latencias, estados = [], {}
+    etags = {}
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def cliente(numero):
+        azar = random.Random(numero)
+        conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+        propias, contador = [], {}
+        while time.perf_counter() < fin:
+            ruta = _ruta(azar.choice(consultas))
+            cabeceras = {}
+            if ruta in etags and azar.random() < 0.5:
+                cabeceras['If-None-Match'] = etags[ruta]
+            inicio = time.perf_counter()
+            try:
+                conexion.request('GET', ruta, headers=cabeceras)
+                respuesta = conexion.getresponse()
+                respuesta.read()
+            except (OSError, http.client.HTTPException):
+                conexion.close()
+                conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+                contador['error'] = contador.get('error', 0) + 1
+                continue
+            propias.append(time.perf_counter() - inicio)
+            contador[respuesta.status] = contador.get(respuesta.status, 0) + 1
+            if respuesta.getheader('ETag'):
+                etags[ruta] = respuesta.getheader('ETag')
+        conexion.close()
+        with lock:
+            latencias.extend(propias)
+            for estado, veces in contador.items():
+                estados[estado] = estados.get(estado, 0) + veces
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return latencias, time.perf_counter() - inicio, estados
+
+
+def cargar_wsgi(app, consultas, segundos):
+    """La aplicación sin red: un solo hilo llamando a app() con el entorno WSGI mínimo."""
+    azar = random.Random(1)
+    latencias = []
+    fin = time.perf_counter() + segundos
+    inicio_total = time.perf_counter()
+    while time.perf_counter() < fin:
+        parametros = azar.choice(consultas)
+        entorno = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/carreras', 'QUERY_STRING': urlencode(parametros)}
+        inicio = time.perf_counter()
+        b''.join(app(entorno, lambda estado, cabeceras: None))
+        latencias.append(time.perf_counter() - inicio)
+    return latencias, time.perf_counter() - inicio_total
+
+
+def cargar_sqlite(ruta_bd, consultas, segundos):
+    """Referencia: la consulta equivalente contra SQLite en cada petición (lo que hacen hoy los clientes de Turso)."""
+    import api
+
+    conexion = sqlite3.connect(ruta_bd)
+    columnas = ', '.join(api.CAMPOS_PUBLICOS)
+    azar = random.Random(1)
+    latencias = []
+    fin = time.perf_counter() + segundos
+    inicio_total = time.perf_counter()
+    hoy = time.strftime('%Y-%m-%d')
+    while time.perf_counter() < fin:
+        parametros = azar.choice(consultas)
+        condiciones, args = ["fecha >= ?"], [parametros.get('desde', hoy)]
+        if 'hasta' in parametros:
+            condiciones.append("fecha <= ?")
+            args.append(parametros['hasta'])
+        if 'origen' in parametros:
+            condiciones.append("origen = ?")
+            args.append(parametros['origen'])
+        if 'ubicacion' in parametros:
+            condiciones.append("ubicacion LIKE ?")
+            args.append(f"%{parametros['ubicacion']}%")
+        args.append(parametros.get('limite', api.LIMITE_MAXIMO))
+        inicio = time.perf_counter()
+        filas = conexion.execute(
+            f"SELECT {columnas} FROM carreras WHERE {' AND '.join(condiciones)} ORDER BY fecha LIMIT ?", args
+        ).fetchall()
+        json.dumps([dict(zip(api.CAMPOS_PUBLICOS, fila)) for fila in filas], ensure_ascii=False)
+        latencias.append(time.perf_counter() - inicio)
+    conexion.close()
+    return latencias, time.perf_counter() - inicio_total
+
+
+def medir_recarga(cambiadas):
+    """Recarga completa frente a incremental después de tocar `cambiadas` filas."""
+    import api
+    import base_datos
+
+    indice = api.IndiceCarreras()
+    inicio = time.perf_counter()
+    total = indice.cargar()
+    completa = time.perf_counter() - inicio
+
+    client = base_datos.conectar()
+    client.execute(
+        f"UPDATE carreras SET ubicacion = 'Lorca', modificada = {base_datos.AHORA} "
+        f"WHERE id IN (SELECT id FROM carreras ORDER BY random() LIMIT ?)", [cambiadas]
+    )
+    client.close()
+    inicio = time.perf_counter()
+    releidas = indice.refrescar(forzar=True)
+    incremental = time.perf_counter() - inicio
+    indice.client.close()
+    print(f"\n🔁 Recarga completa: {completa * 1000:.1f} ms ({total} filas). "
+          f"Incremental tras cambiar {cambiadas}: {incremental * 1000:.1f} ms ({releidas} filas releídas).")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--carreras', type=int, default=10_000)
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--servidor', choices=['gunicorn', 'wsgiref'], default='gunicorn' if HAY_GUNICORN else 'wsgiref')
+    parser.add_argument('--trabajadores', type=int, default=2, help="Procesos de gunicorn")
+    parser.add_argument('--hilos', type=int, default=4, help="Hilos por proceso de gunicorn")
+    args = parser.parse_args()
+
+    print(f"🗄️ Creando la base de prueba con {args.carreras} carreras...")
+    ruta_bd, total = llenar_base(args.carreras)
+    consultas = generar_consultas(200)
+    print(f"   {total} filas en {ruta_bd}\n")
+
+    print(f"{'prueba':<28} | {'peticiones/s':>9} | {'p50 ms':>8} | {'p99 ms':>8} |")
+    latencias, segundos = cargar_sqlite(ruta_bd, consultas, args.segundos)
+    _resumen('SQLite en cada petición', latencias, segundos, '1 hilo, sin red')
+
+    latencias, segundos = cargar_wsgi(_app(), consultas, args.segundos)
+    _resumen('api.app (en memoria)', latencias, segundos, '1 hilo, sin red')
+
+    puerto, parar = arrancar_servidor(args.servidor, ruta_bd, args.trabajadores, args.hilos)
+    try:
+        latencias, segundos, estados = cargar_http(puerto, consultas, args.clientes, args.segundos)
+    finally:
+        parar()
+    detalle = ', '.join(f"{veces} × {estado}" for estado, veces in sorted(estados.items(), key=str))
+    servidor = (f"gunicorn {args.trabajadores}×{args.hilos}" if args.servidor == 'gunicorn' else 'wsgiref')
+    _resumen(f"HTTP ({servidor})", latencias, segundos, f"{args.clientes} clientes: {detalle}")
+
+    medir_recarga(max(1, total // 100))
+
+    # El cliente de la base de datos del índice que ha usado api.app tiene su propio hilo
+    import api
+    if api.indice.client is not None:
+        api.indice.client.close()
+
+
+if __name__ == "__main__":
+    main()
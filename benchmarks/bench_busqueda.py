@@ -0,0 +1,141 @@
+"""
+Compara la búsqueda de busqueda.py (índice FTS5 de la migración 9) con filtrar
+la tabla carreras con LIKE '%palabra%', sobre una base SQLite temporal con
+carreras sintéticas (100k por defecto) creada con las migraciones del repo.
+
+    python benchmarks/bench_busqueda.py
+    python benchmarks/bench_busqueda.py --carreras 20000 --repeticiones 50
+
+Para cada búsqueda mide p50/p99 en ms con el mismo cliente libSQL que usa la
+fusión, y cuántas carreras encuentra cada forma (LIKE no ignora las tildes ni
+busca por prefijo dentro de la ubicación normalizada). También mide lo que
+cuesta la inserción con los disparadores que mantienen el índice.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import libsql_client  # noqa: E402
+
+import busqueda  # noqa: E402
+import deduplicacion  # noqa: E402
+import geografia  # noqa: E402
+import metricas  # noqa: E402
+import migraciones  # noqa: E402
+from benchmarks.sintetico import generar_carreras  # noqa: E402
+
+# Palabras muy frecuentes en los títulos sintéticos, combinaciones más raras, ubicaciones con
+# tilde y una que no está en ninguna carrera (lo normal mientras se escribe)
+BUSQUEDAS = ['cross', 'media marat', 'san silvestre', 'sierra esp', 'nocturna cartagena',
+             'trail caravaca', 'alcalde la union', 'ultra bolnuevo 12', 'aguilas molinos', 'mazarron',
+             'zarcilla']
+
+
+def llenar_base(ruta, n, con_fts=True):
+    """Crea la tabla con las migraciones y mete n carreras sintéticas. Devuelve los segundos de la inserción."""
+    client = libsql_client.create_client_sync(f"file:{ruta}")
+    try:
+        migraciones.migrar(client)
+        if not con_fts:
+            client.batch(["DROP TABLE carreras_fts"] + [
+                f"DROP TRIGGER {nombre}"
+                for nombre in ('carreras_fts_insertar', 'carreras_fts_borrar', 'carreras_fts_actualizar')
+            ])
+    finally:
+        client.close()
+
+    filas = []
+    for i, c in enumerate(generar_carreras(n, dias=730)):
+        dia, mes, anio = c['fecha'].split('-')
+        filas.append((
+            f"{anio}-{mes}-{dia}", f"{c['titulo']} #{i}", c['ubicacion'], c['url_inscripcion'], c['url_ficha'],
+            c['imagen'], c['origen'], f"{deduplicacion.normalizar_titulo(c['titulo'])} {i}",
+            geografia.columnas_ubicacion(c['ubicacion'])[0],
+        ))
+    # Con sqlite3 directamente: una sola transacción, sin viajes del cliente
+    conexion = sqlite3.connect(ruta)
+    inicio = time.perf_counter()
+    with conexion:
+        conexion.executemany(
+            "INSERT INTO carreras (fecha, titulo, ubicacion, url_inscripcion, url_ficha, imagen, origen, "
+            "titulo_normalizado, ubicacion_normalizada) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            filas,
+        )
+    segundos = time.perf_counter() - inicio
+    conexion.execute("VACUUM")
+    conexion.close()
+    return segundos
+
+
+def buscar_like(client, texto, desde, limite):
+    """Lo que habría que hacer sin índice: cada palabra en el título o en la ubicación."""
+    palabras = busqueda.consulta_fts(texto).replace('"', '').replace('*', '').split()
+    condiciones = ' AND '.join('(titulo LIKE ? OR ubicacion LIKE ?)' for _ in palabras)
+    args = [f"%{palabra}%" for palabra in palabras for _ in range(2)]
+    return client.execute(
+        f"SELECT id FROM carreras WHERE {condiciones} AND fecha >= ? ORDER BY fecha LIMIT ?",
+        args + [desde, limite],
+    ).rows
+
+
+def contar_like(client, texto):
+    palabras = busqueda.consulta_fts(texto).replace('"', '').replace('*', '').split()
+    condiciones = ' AND '.join('(titulo LIKE ? OR ubicacion LIKE ?)' for _ in palabras)
+    args = [f"%{palabra}%" for palabra in palabras for _ in range(2)]
+    return client.execute(f"SELECT COUNT(*) FROM carreras WHERE {condiciones}", args).rows[0][0]
+
+
+def contar_fts(client, texto):
+    return client.execute("SELECT COUNT(*) FROM carreras_fts WHERE carreras_fts MATCH ?",
+                          [busqueda.consulta_fts(texto)]).rows[0][0]
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return statistics.median(tiempos) * 1000, metricas.percentil(tiempos, 99) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Búsqueda FTS5 frente a LIKE '%...%'")
+    parser.add_argument('--carreras', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='bench_busqueda_')
+    ruta = os.path.join(carpeta, 'carreras.db')
+    sin_indice = llenar_base(os.path.join(carpeta, 'sin_fts.db'), args.carreras, con_fts=False)
+    con_indice = llenar_base(ruta, args.carreras)
+    tamano_sin = os.path.getsize(os.path.join(carpeta, 'sin_fts.db')) / 1e6
+    tamano_con = os.path.getsize(ruta) / 1e6
+    print(f"📦 {args.carreras} carreras en {ruta}")
+    print(f"   Inserción: {sin_indice:.2f}s sin índice, {con_indice:.2f}s con los disparadores del FTS5")
+    print(f"   Tamaño: {tamano_sin:.1f} MB sin índice, {tamano_con:.1f} MB con él\n")
+
+    client = libsql_client.create_client_sync(f"file:{ruta}")
+    desde = '2026-01-01'
+    try:
+        print(f"{'búsqueda':<20} | {'LIKE p50':>9} | {'LIKE p99':>9} | {'FTS p50':>8} | {'FTS p99':>8} | "
+              f"{'veces':>6} | encontradas LIKE / FTS")
+        totales = {'like': [], 'fts': []}
+        for texto in BUSQUEDAS:
+            like = medir(lambda: buscar_like(client, texto, desde, busqueda.LIMITE), args.repeticiones)
+            fts = medir(lambda: busqueda.buscar(client, texto, desde=desde), args.repeticiones)
+            totales['like'].append(like[0])
+            totales['fts'].append(fts[0])
+            print(f"{texto:<20} | {like[0]:9.2f} | {like[1]:9.2f} | {fts[0]:8.2f} | {fts[1]:8.2f} | "
+                  f"{like[0] / fts[0]:5.1f}x | {contar_like(client, texto)} / {contar_fts(client, texto)}")
+        print(f"\n⏱️ Mediana de las p50: LIKE {statistics.median(totales['like']):.2f} ms, "
+              f"FTS5 {statistics.median(totales['fts']):.2f} ms (límite {busqueda.LIMITE}, desde {desde})")
+    finally:
+        client.close()
@@ -0,0 +1,167 @@
+"""
+Compara la deduplicación original (bucle por día con thefuzz) con
+deduplicacion.agrupar_duplicados sobre los CSV reales y sobre datos sintéticos.
+
+    python benchmarks/bench_deduplicacion.py                 # 10k, 20k, 50k, 100k
+    python benchmarks/bench_deduplicacion.py 10000 --legado  # también mide el bucle original
+    python benchmarks/bench_deduplicacion.py --ventana 2     # ventana de ±2 días
+    python benchmarks/bench_deduplicacion.py 50000 --memoria # dos días seguidos con memoria_dedup.py
+
+Los datos sintéticos incluyen duplicados desplazados hasta ±ventana días,
+así se ve cuántos se escapan comparando solo el mismo día.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from thefuzz import fuzz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deduplicacion  # noqa: E402
+import memoria_dedup  # noqa: E402
+from benchmarks.sintetico import generar_carreras  # noqa: E402
+
+ARCHIVOS = [
+    'data/alcanzatumeta_completo.csv',
+    'data/lineadesalida_completo.csv',
+    'data/babelsport_completo.csv'
+]
+
+
+def preparar(df):
+    df['fecha_dt'] = pd.to_datetime(df['fecha'], dayfirst=True, errors='coerce')
+    df = df.dropna(subset=['fecha_dt'])
+    return df.sort_values(by='fecha_dt', kind='stable').reset_index(drop=True)
+
+
+def agrupar_legado(df):
+    """El bucle que había en fusionar_datos antes de deduplicacion.py."""
+    grupos = []
+    for _, grupo in df.groupby('fecha_dt'):
+        lista_dia = list(grupo.index)
+        while lista_dia:
+            candidata = lista_dia.pop(0)
+            actual = [candidata]
+            indices_a_borrar = []
+            for i, otra in enumerate(lista_dia):
+                if fuzz.token_sort_ratio(str(df.at[candidata, 'titulo']), str(df.at[otra, 'titulo'])) > 70:
+                    indices_a_borrar.append(i)
+            for index in sorted(indices_a_borrar, reverse=True):
+                actual.append(lista_dia.pop(index))
+            grupos.append(sorted(actual))
+    return grupos
+
+
+def agrupar_nuevo(df, ventana_dias=0):
+    return deduplicacion.agrupar_duplicados(
+        df['titulo'].astype(str).tolist(),
+        df['fecha_dt'].tolist(),
+        df['ubicacion'].tolist(),
+        ventana_dias=ventana_dias,
+    )
+
+
+def medir(funcion, df, *args):
+    inicio = time.perf_counter()
+    grupos = funcion(df, *args)
+    return time.perf_counter() - inicio, grupos
+
+
+def comparar_csv_reales():
+    dfs = []
+    for archivo in ARCHIVOS:
+        if os.path.exists(archivo):
+            df = pd.read_csv(archivo)
+            df.columns = df.columns.str.lower().str.strip()
+            dfs.append(df)
+    if not dfs:
+        return
+    df = preparar(pd.concat(dfs, ignore_index=True))
+
+    _, legado = medir(agrupar_legado, df)
+    _, nuevo = medir(agrupar_nuevo, df, deduplicacion.VENTANA_DIAS)
+    legado = {tuple(g) for g in legado}
+    nuevo = {tuple(sorted(g)) for g in nuevo}
+
+    print(f"📂 CSV de data/: {len(df)} carreras -> legado {len(legado)} grupos, nuevo {len(nuevo)} grupos")
+    for grupo in sorted(legado - nuevo):
+        print(f"   solo legado: {[df.at[i, 'titulo'] for i in grupo]}")
+    for grupo in sorted(nuevo - legado):
+        print(f"   solo nuevo:  {[df.at[i, 'titulo'] for i in grupo]}")
+
+
+def simular_dias(n, ventana, cambiadas=0.05):
+    """
+    Dos ejecuciones seguidas con la memoria de la deduplicación: el segundo día un
+    `cambiadas` de los títulos ha cambiado (o son carreras nuevas). Compara con no usar memoria.
+    """
+    df = preparar(pd.DataFrame(generar_carreras(n, desfase_dias=ventana)))
+    azar = random.Random(1)
+    dia2 = df.copy()
+    for i in azar.sample(range(len(dia2)), int(len(dia2) * cambiadas)):
+        dia2.at[i, 'titulo'] = f"{dia2.at[i, 'titulo']} {azar.choice(['Solidaria', 'Popular', 'Nocturna'])}"
+
+    ruta = os.path.join(tempfile.mkdtemp(prefix='bench_memoria_'), 'memoria.sqlite')
+    # Las carreras sintéticas empiezan el 1 de enero de 2026: ese es "hoy" para no caducar ninguna
+    hoy = datetime.date(2026, 1, 1)
+    print(f"\n🧠 Memoria de la deduplicación, {n} carreras, {cambiadas:.0%} de títulos cambiados el segundo día:")
+    print(f"{'ejecución':>22} {'s':>7} {'grupos':>8} {'aciertos':>9} {'pares':>9}")
+    for nombre, datos in (('día 1', df), ('día 2', dia2)):
+        deduplicacion.normalizar_titulo.cache_clear()
+        t_sin, sin_memoria = medir(agrupar_nuevo, datos, ventana)
+
+        deduplicacion.normalizar_titulo.cache_clear()
+        inicio = time.perf_counter()
+        memoria = memoria_dedup.MemoriaDedup(ruta, hoy=hoy)
+        con_memoria = deduplicacion.agrupar_duplicados(
+            datos['titulo'].astype(str).tolist(), datos['fecha_dt'].tolist(), datos['ubicacion'].tolist(),
+            ventana_dias=ventana, memoria=memoria,
+        )
+        pares = memoria.guardar()
+        memoria.close()
+        t_con = time.perf_counter() - inicio
+
+        print(f"{nombre + ' sin memoria':>22} {t_sin:>7.3f} {len(sin_memoria):>8}")
+        print(f"{nombre + ' con memoria':>22} {t_con:>7.3f} {len(con_memoria):>8} "
+              f"{memoria.tasa_aciertos():>9.1%} {pares:>9}")
+        if con_memoria != sin_memoria:
+            print("   ❌ Los grupos no coinciden con y sin memoria")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tamanos', nargs='*', type=int, default=[10_000, 20_000, 50_000, 100_000])
+    parser.add_argument('--legado', action='store_true', help="medir también el bucle original (lento)")
+    parser.add_argument('--ventana', type=int, default=1, help="días de tolerancia entre fuentes")
+    parser.add_argument('--memoria', action='store_true', help="simular dos días seguidos con la memoria de pares")
+    args = parser.parse_args()
+
+    if args.memoria:
+        for n in args.tamanos:
+            simular_dias(n, args.ventana)
+        return
+
+    comparar_csv_reales()
+
+    ventana = f"±{args.ventana}d"
+    print(f"\n{'carreras':>10} {'mismo día (s)':>14} {'grupos':>8} {ventana + ' (s)':>10} {'grupos':>8}"
+          f" {'legado (s)':>11} {'grupos':>8}")
+    for n in args.tamanos:
+        df = preparar(pd.DataFrame(generar_carreras(n, desfase_dias=args.ventana)))
+        t_dia, dia = medir(agrupar_nuevo, df, 0)
+        t_ventana, con_ventana = medir(agrupar_nuevo, df, args.ventana)
+        linea = f"{n:>10} {t_dia:>14.3f} {len(dia):>8} {t_ventana:>10.3f} {len(con_ventana):>8}"
+        if args.legado:
+            t_legado, legado = medir(agrupar_legado, df)
+            linea += f" {t_legado:>11.3f} {len(legado):>8}"
+        print(linea)
+
+
+if __name__ == "__main__":
+    main()
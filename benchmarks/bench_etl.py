@@ -0,0 +1,282 @@
+"""
+Benchmark del flujo completo (main.ejecutar_todo) sin tocar las webs reales ni Turso.
+
+Las tres webs se sirven desde un servidor HTTP local con páginas generadas
+con las mismas plantillas que benchmarks/fixtures/ (paginas.py), y la base de
+datos es un SQLite temporal (MODO_BD=local). Cada escala se ejecuta en un
+proceso aparte, para que el pico de memoria (RSS) sea solo suyo, y dos veces:
+la primera con la caché HTTP vacía y la segunda ya con caché e índice incremental.
+
+    python benchmarks/bench_etl.py                 # escalas 1, 10 y 100 (70, 700 y 7000 carreras)
+    python benchmarks/bench_etl.py --escalas 1 10
+    python benchmarks/bench_etl.py --comparar benchmarks/resultados/etl_....json
+
+El resultado se guarda en benchmarks/resultados/etl_<fecha>_<commit>.json.
+"""
+import argparse
+import contextlib
+import datetime
+import functools
+import hashlib
+import http.server
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import unquote
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks import paginas  # noqa: E402
+from benchmarks.sintetico import generar_carreras  # noqa: E402
+
+CARPETA_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+# Carreras (entre las tres fuentes) en la escala 1, parecido a lo que hay hoy en data/
+CARRERAS_BASE = 70
+# Tarjetas por página del listado de lineadesalida
+POR_PAGINA = 24
+
+
+def construir_sitio(carreras):
+    """{ruta: html} con las páginas de las tres webs para estas carreras."""
+    por_origen = {'ALCANZATUMETA': [], 'BABELSPORT': [], 'LINEADESALIDA': []}
+    for c in carreras:
+        por_origen[c['origen']].append(c)
+
+    sitio = {
+        '/alcanza/calendario.php': paginas.pagina_alcanza(por_origen['ALCANZATUMETA']),
+        '/babel/eventos-proximos/': paginas.pagina_babel(por_origen['BABELSPORT']),
+    }
+    linea = por_origen['LINEADESALIDA']
+    for pagina, inicio in enumerate(range(0, len(linea), POR_PAGINA), start=1):
+        ruta = '/linea/proximas-carreras' + ('' if pagina == 1 else f'?page={pagina}')
+        sitio[ruta] = paginas.pagina_listado_lineadesalida(linea[inicio:inicio + POR_PAGINA], inicio)
+    for i, c in enumerate(linea):
+        sitio[f'/linea/carreras/{paginas.slug_ficha(c, i)}'] = paginas.pagina_ficha_lineadesalida(c)
+    return {ruta: html.encode('utf-8') for ruta, html in sitio.items()}
+
+
+class _Manejador(http.server.BaseHTTPRequestHandler):
+    """Sirve el sitio en memoria con ETag (para que la segunda pasada reciba 304)."""
+    protocol_version = 'HTTP/1.1'
+    sitio = {}
+    peticiones = 0
+
+    def do_GET(self):
+        ruta = unquote(self.path)
+        contenido = self.sitio.get(ruta)
+        if contenido is None and '?page=' in ruta:
+            # Después de la última página, un listado vacío (como la web real)
+            contenido = paginas.pagina_listado_lineadesalida([]).encode('utf-8')
+        type(self).peticiones += 1
+        if contenido is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        etag = '"' + hashlib.sha1(contenido).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def log_message(self, *args):
+        pass
+
+
+def _cronometrar(modulo, nombre, tiempos, clave, acumular=False):
+    """Sustituye modulo.nombre por una versión que apunta su duración en tiempos[clave]."""
+    original = getattr(modulo, nombre)
+    lock = threading.Lock()
+
+    @functools.wraps(original)
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with lock:
+                tiempos[clave] = tiempos.get(clave, 0.0) + duracion if acumular else duracion
+
+    setattr(modulo, nombre, envoltura)
+
+
+def ejecutar_escala(escala, peticiones_por_segundo, concurrencia):
+    """Se ejecuta en el proceso hijo: prepara el entorno, lanza dos pasadas y devuelve las medidas."""
+    temporal = tempfile.mkdtemp(prefix='bench_etl_')
+
+    import base_datos
+    import deduplicacion
+    import feeds
+    import fusionar_carreras
+    import imagenes
+    import main
+    import memoria_dedup
+    import metricas
+    from scrapers import cache_http, cliente_http, parseo, registro, scraper_alcanza, scraper_babel, scraper_lineadesalida
+    from scrapers.limitador import LimitadorPorHost
+
+    carreras = generar_carreras(CARRERAS_BASE * escala, semilla=escala)
+    _Manejador.sitio = construir_sitio(carreras)
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{servidor.server_address[1]}'
+
+    # Las webs apuntan al servidor local
+    scraper_alcanza.url_objetivo, scraper_alcanza.url_base = f'{url}/alcanza/calendario.php', f'{url}/alcanza/'
+    scraper_babel.DEFINICION.url, scraper_babel.DEFINICION.url_base = f'{url}/babel/eventos-proximos/', f'{url}/babel/'
+    scraper_lineadesalida.url_inicial, scraper_lineadesalida.url_base = f'{url}/linea/proximas-carreras', f'{url}/linea/'
+    scraper_lineadesalida.limitador = LimitadorPorHost(peticiones_por_segundo)
+    scraper_lineadesalida.CONCURRENCIA = concurrencia
+
+    # Todo lo que se escribe en disco va a la carpeta temporal
+    cache_http.RUTA_CACHE = os.path.join(temporal, 'cache_http.sqlite')
+    scraper_lineadesalida.RUTA_INDICE = os.path.join(temporal, 'indice_lineadesalida.json')
+    for fuente in registro.fuentes():
+        fuente.ruta_csv = os.path.join(temporal, os.path.basename(fuente.ruta_csv))
+    base_datos.RUTA_BD_LOCAL = os.path.join(temporal, 'carreras.db')
+    memoria_dedup.RUTA = os.path.join(temporal, 'memoria_dedup.sqlite')
+    feeds.CARPETA = os.path.join(temporal, 'feeds')
+    base_datos.activar_modo_local()
+    # Las imágenes de prueba no existen: la comprobación de imágenes no entra en la medida
+    imagenes.ACTIVO = False
+    # El informe de métricas va dentro del JSON del benchmark, no a data/
+    metricas.RUTA_INFORME = ''
+
+    tiempos = {}
+    _cronometrar(main, 'ejecutar_todo', tiempos, 'total')
+    _cronometrar(main, 'ejecutar_fuentes', tiempos, 'descarga_y_parseo')
+    _cronometrar(parseo, 'analizar', tiempos, 'parseo_acumulado', acumular=True)
+    _cronometrar(fusionar_carreras, 'fusionar_datos', tiempos, 'fusion')
+    _cronometrar(deduplicacion, 'agrupar_duplicados', tiempos, 'deduplicacion')
+    _cronometrar(base_datos, 'sincronizar_carreras', tiempos, 'base_datos')
+
+    pasadas = []
+    for nombre in ('primera', 'repetida'):
+        tiempos.clear()
+        _Manejador.peticiones = 0
+        for clave in ('peticiones', 'bytes', 'respuestas_304', 'desde_cache', 'errores'):
+            cliente_http.estadisticas[clave] = 0
+        cliente_http.estadisticas['por_host'] = {}
+        metricas.reiniciar()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.ejecutar_todo()
+
+        estadisticas = dict(cliente_http.estadisticas)
+        estadisticas.pop('por_host')
+        pasadas.append({
+            'pasada': nombre,
+            'segundos': {clave: round(valor, 4) for clave, valor in tiempos.items()},
+            'http': estadisticas,
+            'peticiones_servidor': _Manejador.peticiones,
+            'rss_max_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'metricas': metricas.informe(),
+        })
+
+    servidor.shutdown()
+    return {
+        'escala': escala,
+        'carreras': len(carreras),
+        'paginas_servidas': len(_Manejador.sitio),
+        'pasadas': pasadas,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+def imprimir(resultados, anterior=None):
+    previas = {}
+    if anterior:
+        for r in anterior['escalas']:
+            for p in r['pasadas']:
+                previas[(r['escala'], p['pasada'])] = p
+
+    print(f"{'escala':>6} | {'carreras':>8} | {'pasada':<8} | {'total s':>8} | {'descarga':>8} | "
+          f"{'parseo':>7} | {'dedup':>6} | {'BD':>6} | {'peticiones':>10} | {'RSS MB':>7}")
+    for r in resultados:
+        for p in r['pasadas']:
+            s = p['segundos']
+            linea = (f"{r['escala']:>6} | {r['carreras']:>8} | {p['pasada']:<8} | {s.get('total', 0):>8.2f} | "
+                     f"{s.get('descarga_y_parseo', 0):>8.2f} | {s.get('parseo_acumulado', 0):>7.2f} | "
+                     f"{s.get('deduplicacion', 0):>6.3f} | {s.get('base_datos', 0):>6.3f} | "
+                     f"{p['http']['peticiones']:>10} | {p['rss_max_mb']:>7.1f}")
+            previa = previas.get((r['escala'], p['pasada']))
+            if previa and previa['segundos'].get('total'):
+                linea += f" | {s.get('total', 0) / previa['segundos']['total']:.2f}× el total anterior"
+            print(linea)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--escalas', nargs='*', type=int, default=[1, 10, 100])
+    parser.add_argument('--peticiones-por-segundo', type=float, default=1000,
+                        help="Límite del limitador de lineadesalida (el real es 2; aquí se mide el código, no la espera)")
+    parser.add_argument('--concurrencia', type=int, default=4)
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--salida', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        resultado = ejecutar_escala(args.escalas[0], args.peticiones_por_segundo, args.concurrencia)
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f)
+        return
+
+    resultados = []
+    for escala in args.escalas:
+        print(f"⏱️ Escala {escala} ({CARRERAS_BASE * escala} carreras)...")
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            salida = f.name
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--hijo', '--escalas', str(escala),
+                        '--salida', salida, '--peticiones-por-segundo', str(args.peticiones_por_segundo),
+                        '--concurrencia', str(args.concurrencia)], cwd=RAIZ, check=True)
+        with open(salida, encoding='utf-8') as f:
+            resultados.append(json.load(f))
+        os.remove(salida)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+    imprimir(resultados, anterior)
+
+    commit = _commit()
+    os.makedirs(CARPETA_RESULTADOS, exist_ok=True)
+    ruta = os.path.join(CARPETA_RESULTADOS, f"etl_{datetime.datetime.now():%Y%m%d_%H%M%S}_{commit}.json")
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'concurrencia': args.concurrencia,
+            'peticiones_por_segundo': args.peticiones_por_segundo,
+            'escalas': resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n📂 Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
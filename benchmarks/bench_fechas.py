@@ -0,0 +1,138 @@
+"""
+Compara la lectura de fechas de antes (limpiar_fecha de Alcanza fila a fila y
+luego pd.to_datetime(dayfirst=True, errors='coerce') sobre la columna mezclada,
+como hacía fusionar_datos) con fechas.py sobre una columna con los formatos de
+las tres webs.
+
+    python benchmarks/bench_fechas.py              # 100k filas
+    python benchmarks/bench_fechas.py 10000 100000 1000000
+
+Además de los tiempos cuenta cuántas fechas válidas se pierde cada método
+(deberían ser 0) y comprueba que la versión vectorizada y la de un texto
+suelto (la que usa Carrera) dan exactamente lo mismo.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fechas  # noqa: E402
+from benchmarks.paginas import MESES  # noqa: E402
+
+# Lo que no es una fecha (se debe avisar, no inventar)
+NO_FECHAS = ['Desconocida', 'Aplazada', '31-02-2026', '29 Foo 26', 'Próximamente']
+
+
+def limpiar_fecha_legado(fecha_texto):
+    """scraper_alcanza.limpiar_fecha antes de fechas.py."""
+    if not fecha_texto:
+        return None
+    meses = {
+        'jan': '01', 'ene': '01', 'feb': '02', 'mar': '03', 'apr': '04', 'abr': '04', 'may': '05',
+        'jun': '06', 'jul': '07', 'aug': '08', 'ago': '08', 'sep': '09', 'oct': '10', 'nov': '11',
+        'dec': '12', 'dic': '12',
+    }
+    try:
+        partes = fecha_texto.lower().replace('.', '').strip().split()
+        if len(partes) == 3:
+            anio = partes[2]
+            if len(anio) == 2:
+                anio = f"20{anio}"
+            mes_numero = meses.get(partes[1][0:3], '00')
+            if mes_numero == '00':
+                return fecha_texto
+            return f"{partes[0].zfill(2)}-{mes_numero}-{anio}"
+        return fecha_texto
+    except Exception:
+        return fecha_texto
+
+
+def generar_textos(n, semilla=0):
+    """
+    n textos de fecha como los dejan las webs y las instantáneas, mezclados.
+    Devuelve (textos, fechas esperadas) con None donde no hay fecha.
+    """
+    azar = random.Random(semilla)
+    inicio = datetime.date(2026, 1, 1)
+    textos, esperadas = [], []
+    for _ in range(n):
+        if azar.random() < 0.01:
+            textos.append(azar.choice(NO_FECHAS))
+            esperadas.append(None)
+            continue
+        dia = inicio + datetime.timedelta(days=azar.randrange(730))
+        formato = azar.random()
+        if formato < 0.4:
+            # Alcanza: '29 May 26'
+            textos.append(f"{dia.day} {MESES[dia.month - 1]} {dia.year % 100}")
+        elif formato < 0.8:
+            # Babelsport y Línea de Salida: '29-05-2026'
+            textos.append(dia.strftime('%d-%m-%Y'))
+        else:
+            # Instantáneas guardadas por Carrera: '2026-05-29'
+            textos.append(dia.isoformat())
+        esperadas.append(dia)
+    return textos, esperadas
+
+
+def antes(textos):
+    limpios = pd.Series([limpiar_fecha_legado(t) for t in textos], dtype='object')
+    return pd.to_datetime(limpios, dayfirst=True, errors='coerce')
+
+
+def perdidas(resultado, esperadas):
+    """Fechas válidas que el método no ha leído o ha leído mal."""
+    mal = 0
+    for valor, esperada in zip(resultado, esperadas):
+        if esperada is not None and (pd.isna(valor) or valor.date() != esperada):
+            mal += 1
+    return mal
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tamanos', nargs='*', type=int, default=[100_000])
+    args = parser.parse_args()
+
+    print(f"{'filas':>9} | {'método':<28} | {'segundos':>9} | {'perdidas':>8} | {'avisadas':>8}")
+    for n in args.tamanos:
+        textos, esperadas = generar_textos(n)
+
+        resultado, segundos = medir(antes, textos)
+        print(f"{n:>9} | {'antes (fila a fila + pandas)':<28} | {segundos:>9.3f} | "
+              f"{perdidas(resultado, esperadas):>8} | {0:>8}")
+
+        vectorizado, segundos = medir(fechas.normalizar_fechas, textos)
+        avisadas = len(fechas.no_entendidas(textos, vectorizado))
+        print(f"{n:>9} | {'fechas.normalizar_fechas':<28} | {segundos:>9.3f} | "
+              f"{perdidas(vectorizado, esperadas):>8} | {avisadas:>8}")
+
+        fechas.parsear_fecha.cache_clear()
+        sueltas, segundos = medir(lambda ts: [fechas.parsear_fecha(t) for t in ts], textos)
+        print(f"{n:>9} | {'fechas.parsear_fecha (caché)':<28} | {segundos:>9.3f} | "
+              f"{sum(e is not None and s != e for s, e in zip(sueltas, esperadas)):>8} | {'-':>8}")
+
+        distintas = sum(
+            (s is None) != pd.isna(v) or (s is not None and s != v.date())
+            for s, v in zip(sueltas, vectorizado)
+        )
+        if distintas:
+            print(f"\n❌ {distintas} fechas distintas entre la versión vectorizada y la de un texto suelto.")
+            sys.exit(1)
+    print("\n✅ La versión vectorizada y la de un texto suelto dan lo mismo.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Mide geografia.py sobre un año de carreras sintéticas repartidas por los lugares del nomenclátor.
+
+    python benchmarks/bench_geografia.py                       # 3.000 carreras, 5.000 búsquedas
+    python benchmarks/bench_geografia.py --carreras 20000 --radio 25
+
+Mide:
+  - la geocodificación de las ubicaciones (con las variantes de las webs: "Barreros, Los / MURCIA",
+    mayúsculas, sin tildes) y cuántas se resuelven desde la memoria,
+  - las búsquedas por radio con el índice espacial frente a recorrer todas las carreras
+    (µs por búsqueda, p50/p99, y que las dos den lo mismo),
+  - la deduplicación con y sin la distancia como clave de bloqueo (comparaciones y grupos).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deduplicacion  # noqa: E402
+import geografia  # noqa: E402
+import metricas  # noqa: E402
+from benchmarks.sintetico import generar_carreras  # noqa: E402
+
+
+def _variante(nombre, azar):
+    """El mismo lugar escrito como lo haría cada web."""
+    palabras = nombre.split(' ', 1)
+    opciones = [
+        lambda: nombre,
+        lambda: f"{nombre} / MURCIA",
+        lambda: nombre.upper(),
+        lambda: geografia._sin_tildes(nombre),
+    ]
+    if len(palabras) == 2 and palabras[0].lower() in geografia.ARTICULOS:
+        # "Los Barreros" -> "Barreros, Los / MURCIA"
+        opciones.append(lambda: f"{palabras[1]}, {palabras[0]} / MURCIA")
+    return azar.choice(opciones)()
+
+
+def generar(n, semilla=0):
+    """Carreras sintéticas de un año con la ubicación cambiada por un lugar del nomenclátor."""
+    azar = random.Random(semilla)
+    lugares = [lugar.nombre for lugar in {id(v): v for v in geografia.nomenclator()[0].values()}.values()]
+    carreras = generar_carreras(n, semilla=semilla, dias=365)
+    # Las copias de una misma carrera (mismo título base y fecha) comparten lugar
+    por_carrera = {}
+    for carrera in carreras:
+        clave = (deduplicacion.normalizar_titulo(carrera['titulo']), carrera['fecha'])
+        lugar = por_carrera.setdefault(clave, azar.choice(lugares))
+        carrera['ubicacion'] = _variante(lugar, azar)
+    return carreras
+
+
+def medir_geocodificacion(carreras):
+    geografia.geocodificar.cache_clear()
+    inicio = time.perf_counter()
+    puntos = [geografia.coordenadas(c['ubicacion']) for c in carreras]
+    segundos = time.perf_counter() - inicio
+    info = geografia.geocodificar.cache_info()
+    reconocidas = sum(p is not None for p in puntos)
+    print(f"🗺️ Geocodificación de {len(carreras)} ubicaciones: {segundos * 1000:.1f} ms, "
+          f"{reconocidas} reconocidas, {info.misses} distintas, "
+          f"{info.hits / max(info.hits + info.misses, 1):.1%} desde la memoria")
+    return puntos
+
+
+def medir_busquedas(puntos, busquedas, radio, semilla=0):
+    elementos = [(p[0], p[1], i) for i, p in enumerate(puntos) if p is not None]
+    inicio = time.perf_counter()
+    indice = geografia.IndiceEspacial(elementos)
+    construccion = time.perf_counter() - inicio
+
+    azar = random.Random(semilla)
+    # Centros al azar dentro de la región (y algo de costa de Alicante)
+    centros = [(azar.uniform(37.4, 38.6), azar.uniform(-2.0, -0.7)) for _ in range(busquedas)]
+
+    tiempos_indice, tiempos_todas, encontradas = [], [], 0
+    for latitud, longitud in centros:
+        inicio = time.perf_counter()
+        con_indice = indice.buscar(latitud, longitud, radio)
+        tiempos_indice.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        recorriendo = [i for lat, lon, i in elementos if geografia.distancia_km(latitud, longitud, lat, lon) <= radio]
+        tiempos_todas.append(time.perf_counter() - inicio)
+
+        if sorted(con_indice) != recorriendo:
+            raise SystemExit(f"❌ El índice y el recorrido no coinciden en ({latitud}, {longitud})")
+        encontradas += len(con_indice)
+
+    print(f"\n📍 {busquedas} búsquedas a {radio:g} km sobre {len(elementos)} carreras "
+          f"({len(indice.celdas)} celdas, índice creado en {construccion * 1000:.1f} ms, "
+          f"{encontradas / busquedas:.0f} carreras por búsqueda de media):")
+    for nombre, tiempos in (('Índice espacial', tiempos_indice), ('Recorriendo todas', tiempos_todas)):
+        tiempos.sort()
+        print(f"   {nombre:<18} p50 {statistics.median(tiempos) * 1e6:8.1f} µs   "
+              f"p99 {metricas.percentil(tiempos, 99) * 1e6:8.1f} µs")
+
+
+def medir_deduplicacion(carreras, puntos):
+    titulos = [c['titulo'] for c in carreras]
+    dias = [time.strptime(c['fecha'], '%d-%m-%Y').tm_yday for c in carreras]
+    ubicaciones = [c['ubicacion'] for c in carreras]
+    orden = sorted(range(len(carreras)), key=lambda i: dias[i])
+
+    print("\n🧹 Deduplicación:")
+    resultados = {}
+    for nombre, coordenadas in (('Sin coordenadas', None), ('Con coordenadas', [puntos[i] for i in orden])):
+        metricas.reiniciar()
+        inicio = time.perf_counter()
+        grupos = deduplicacion.agrupar_duplicados(
+            [titulos[i] for i in orden], [dias[i] for i in orden], [ubicaciones[i] for i in orden],
+            coordenadas=coordenadas,
+        )
+        segundos = time.perf_counter() - inicio
+        contadores = {c['nombre']: c['valor'] for c in metricas.informe()['contadores']}
+        resultados[nombre] = grupos
+        descartadas = int(contadores.get('dedup_descartadas_distancia', 0))
+        print(f"   {nombre:<16} {segundos * 1000:7.1f} ms   "
+              f"{int(contadores.get('dedup_comparaciones', 0)):>7} comparaciones   {len(grupos)} grupos"
+              + (f"   ({descartadas} pares descartados por distancia)" if coordenadas else ''))
+    separados = len(resultados['Con coordenadas']) - len(resultados['Sin coordenadas'])
+    if separados:
+        print(f"   {separados} grupos más con coordenadas: carreras de título parecido en pueblos a más de "
+              f"{deduplicacion.DISTANCIA_MAXIMA_KM:g} km que sin ellas se juntaban")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geocodificación, índice espacial y bloqueo por distancia")
+    parser.add_argument('--carreras', type=int, default=3000, help="Carreras en un año (por defecto 3000)")
+    parser.add_argument('--busquedas', type=int, default=5000)
+    parser.add_argument('--radio', type=float, default=15.0, help="km")
+    args = parser.parse_args()
+
+    carreras = generar(args.carreras)
+    puntos = medir_geocodificacion(carreras)
+    medir_busquedas(puntos, args.busquedas, args.radio)
+    medir_deduplicacion(carreras, puntos)
@@ -0,0 +1,69 @@
+"""
+Memoria y tiempo de la fusión con diccionarios (como antes) frente a objetos Carrera.
+
+    python benchmarks/bench_modelo.py            # 10k, 100k
+    python benchmarks/bench_modelo.py 50000
+
+Para cada tamaño mide cuánta memoria ocupan las carreras ya cargadas y lo que
+cuesta la preparación que hacía fusionar_datos por fila (fecha, títulos, limpieza).
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deduplicacion  # noqa: E402
+from benchmarks.sintetico import generar_carreras  # noqa: E402
+from modelo import Carrera, limpiar_valor  # noqa: E402
+
+
+def medir(crear):
+    """Devuelve (resultado, MB retenidos, segundos)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = crear()
+    segundos = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+    return resultado, memoria, segundos
+
+
+def preparar_diccionarios(filas):
+    """Lo que hacía fusionar_datos: DataFrame, fechas con pandas y limpieza celda a celda."""
+    df = pd.DataFrame(filas)
+    df['fecha_dt'] = pd.to_datetime(df['fecha'], dayfirst=True, errors='coerce')
+    df = df.dropna(subset=['fecha_dt']).sort_values(by='fecha_dt', kind='stable')
+    claves = [deduplicacion.normalizar_titulo(t) for t in df['titulo'].astype(str)]
+    carreras = [{campo: limpiar_valor(fila[campo]) for campo in filas[0]} for _, fila in df.iterrows()]
+    return carreras, claves
+
+
+def preparar_objetos(filas):
+    carreras = [Carrera.desde_dict(fila) for fila in filas]
+    carreras.sort(key=lambda c: c.dia)
+    return carreras
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tamanos', nargs='*', type=int, default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'carreras':>9} | {'dict MB':>8} | {'dict s':>7} | {'Carrera MB':>10} | {'Carrera s':>9}")
+    for n in args.tamanos:
+        filas = generar_carreras(n)
+        # Cada caso empieza con las cachés de normalización vacías
+        deduplicacion.normalizar_titulo.cache_clear()
+        _, mb_dict, s_dict = medir(lambda: preparar_diccionarios(filas))
+        deduplicacion.normalizar_titulo.cache_clear()
+        _, mb_obj, s_obj = medir(lambda: preparar_objetos(filas))
+        print(f"{n:>9} | {mb_dict:>8.1f} | {s_dict:>7.2f} | {mb_obj:>10.1f} | {s_obj:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Tiempo y memoria de análisis de cada página guardada en benchmarks/fixtures/
+con cada motor (html.parser, lxml si está instalado) analizando el documento
+entero o solo la parte que lee el scraper (SoupStrainer).
+
+    python benchmarks/bench_parseo.py              # 50 repeticiones por página
+    python benchmarks/bench_parseo.py --repeticiones 200
+
+También comprueba que lo extraído es idéntico en todas las combinaciones
+(tomando como referencia html.parser con el documento entero, lo de antes).
+Si las fixtures no existen se generan con paginas.py.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.paginas import CARPETA_FIXTURES, generar_fixtures  # noqa: E402
+from scrapers import parseo, scraper_alcanza, scraper_babel, scraper_lineadesalida  # noqa: E402
+
+URL_FICHA = 'https://lineadesalida.net/carreras/ejemplo'
+
+# Página -> función que extrae lo que usaría el scraper (comparable entre motores)
+EXTRACTORES = {
+    'alcanza_calendario.html': lambda html: [c.a_dict() for c in scraper_alcanza.extraer_carreras(html)],
+    'babel_eventos.html': lambda html: [c.a_dict() for c in scraper_babel.extraer_carreras(html)],
+    'lineadesalida_listado.html': lambda html: [
+        (t.find('a')['href'], scraper_lineadesalida.huella_tarjeta(t))
+        for t in scraper_lineadesalida.extraer_tarjetas(html)
+    ],
+    'lineadesalida_ficha.html': lambda html: scraper_lineadesalida.extraer_detalle(html, URL_FICHA).a_dict(),
+}
+
+
+def combinaciones():
+    motores = ['html.parser']
+    if parseo.MOTOR_POR_DEFECTO == 'lxml':
+        motores.append('lxml')
+    return [(motor, parcial) for motor in motores for parcial in (False, True)]
+
+
+def medir(extractor, html, repeticiones):
+    """Devuelve (resultado, ms por página (mediana), pico de memoria en KB)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = extractor(html)
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    extractor(html)
+    pico = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return resultado, statistics.median(tiempos) * 1000, pico
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    if not all(os.path.exists(os.path.join(CARPETA_FIXTURES, nombre)) for nombre in EXTRACTORES):
+        generar_fixtures()
+
+    motor_original, parcial_original = parseo.MOTOR, parseo.PARCIAL
+    distintos = 0
+    print(f"{'página':<28} | {'motor':<11} | {'parcial':<7} | {'ms/página':>9} | {'pico KB':>8} | igual")
+    for nombre, extractor in EXTRACTORES.items():
+        with open(os.path.join(CARPETA_FIXTURES, nombre), encoding='utf-8') as f:
+            html = f.read()
+
+        referencia = None
+        for motor, parcial in combinaciones():
+            parseo.MOTOR, parseo.PARCIAL = motor, parcial
+            resultado, ms, pico = medir(extractor, html, args.repeticiones)
+            if referencia is None:
+                referencia = resultado
+            igual = resultado == referencia
+            distintos += not igual
+            print(f"{nombre:<28} | {motor:<11} | {'sí' if parcial else 'no':<7} | {ms:>9.2f} | {pico:>8.0f} | "
+                  f"{'✅' if igual else '❌'}")
+
+    parseo.MOTOR, parseo.PARCIAL = motor_original, parcial_original
+    if distintos:
+        print(f"\n❌ {distintos} combinaciones extraen algo distinto a html.parser con el documento entero.")
+        sys.exit(1)
+    print("\n✅ Todas las combinaciones extraen exactamente lo mismo.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Genera páginas HTML con la misma estructura que las webs reales (la parte que
+leen los scrapers más la cabecera, menús, scripts y pie que los rodean) a
+partir de las carreras sintéticas de sintetico.py.
+
+    python benchmarks/paginas.py          # reescribe benchmarks/fixtures/
+
+Las fixtures guardadas son las que usa bench_parseo.py.
+"""
+import os
+import sys
+from html import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sintetico import generar_carreras  # noqa: E402
+
+CARPETA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+
+def _slug(texto):
+    return '-'.join(''.join(c if c.isalnum() else ' ' for c in texto.lower()).split())
+
+
+def slug_ficha(carrera, i):
+    """Ruta única de la ficha de la i-ésima carrera del listado (los títulos se pueden repetir)."""
+    return f"{_slug(carrera['titulo'])}-{i}"
+
+
+def _envoltorio(titulo, cuerpo):
+    """Página completa: lo que descarga el scraper aunque solo le interese `cuerpo`."""
+    enlaces = '\n'.join(f'<link rel="stylesheet" href="/assets/css/estilo{i}.css">' for i in range(15))
+    scripts = '\n'.join(f'<script src="/assets/js/libreria{i}.js"></script>' for i in range(15))
+    # Un bloque de JavaScript en línea como los de analítica y cookies
+    en_linea = '<script>\n' + '\n'.join(
+        f'window.dataLayer = window.dataLayer || []; dataLayer.push({{"evento": "vista", "n": {i}}});'
+        for i in range(300)
+    ) + '\n</script>'
+    menu = '\n'.join(
+        f'<li class="nav-item"><a class="nav-link" href="/seccion/{i}">Sección {i}</a>'
+        f'<ul class="dropdown-menu"><li><a href="/seccion/{i}/a">Apartado A</a></li>'
+        f'<li><a href="/seccion/{i}/b">Apartado B</a></li></ul></li>'
+        for i in range(60)
+    )
+    pie = '\n'.join(f'<p class="small">Aviso legal, privacidad y cookies ({i})</p>' for i in range(40))
+    return (
+        f'<!DOCTYPE html>\n<html lang="es">\n<head>\n<meta charset="utf-8">\n<title>{escape(titulo)}</title>\n'
+        f'{enlaces}\n{scripts}\n{en_linea}\n</head>\n<body>\n'
+        f'<nav class="navbar"><ul class="navbar-nav">\n{menu}\n</ul></nav>\n'
+        f'<main class="container">\n{cuerpo}\n</main>\n'
+        f'<footer class="footer">\n{pie}\n</footer>\n</body>\n</html>\n'
+    )
+
+
+def pagina_alcanza(carreras):
+    """Calendario de alcanzatumeta.es: una tabla con una fila por carrera."""
+    filas = ['<tr><th>Fecha</th><th>Cartel</th><th>Tipo</th><th>Evento</th><th>Estado</th></tr>']
+    for i, c in enumerate(carreras):
+        dia, mes, anio = c['fecha'].split('-')
+        slug = _slug(c['titulo'])
+        filas.append(
+            f'<tr role="row">'
+            f'<td><span style="display: none">{anio}{mes}{dia}</span>{int(dia)} {MESES[int(mes) - 1]} {anio[2:]}</td>'
+            f'<td><a href="{slug}"><img class="img-fluid" src="uploads/Cartel/{i}.jpeg"></a></td>'
+            f'<td>Trail</td>'
+            f'<td><strong>{escape(c["titulo"])}</strong><br>{escape(c["ubicacion"])}<br>'
+            f'<a class="btn btn-sm" href="{slug}">FICHA DE EVENTO</a> '
+            f'<a class="btn btn-sm" href="inscrip-previa.php?id={1000 + i}">INSCRIBIRSE</a></td>'
+            f'<td>Abierta</td></tr>'
+        )
+        if i % 20 == 19:
+            # Separadores de mes con menos celdas, que el scraper se salta
+            filas.append('<tr><td colspan="5">&nbsp;</td></tr>')
+    tabla = '<table class="table" id="calendario">\n' + '\n'.join(filas) + '\n</table>'
+    return _envoltorio('Calendario - Alcanza tu meta', tabla)
+
+
+def pagina_babel(carreras):
+    """Próximos eventos de babelsport.com: una tarjeta 'row p-3' por carrera."""
+    tarjetas = []
+    for i, c in enumerate(carreras):
+        slug = _slug(c['titulo'])
+        tarjetas.append(
+            f'<div class="row p-3">'
+            f'<div class="col-md-4"><img class="img-fluid" src="carteles/{i}_{slug}.jpg"></div>'
+            f'<div class="col-md-8"><h3>{escape(c["titulo"])}</h3>'
+            f'<div class="row"><div class="col-5 mb-4"><span>{c["fecha"]}</span></div>'
+            f'<div class="col-7 mb-4 text-end">{escape(c["ubicacion"])}</div></div>'
+            f'<a class="btn" href="evento/{slug}/">INSCRÍBETE</a> '
+            f'<a class="btn" href="evento/{slug}/Reglamento/">REGLAMENTO</a></div>'
+            f'</div>'
+        )
+    return _envoltorio('Eventos próximos - Babelsport', '\n'.join(tarjetas))
+
+
+def pagina_listado_lineadesalida(carreras, inicio=0):
+    """
+    Una página del listado de lineadesalida.net: tarjetas con el enlace a cada ficha.
+    `inicio` es la posición en el listado completo de la primera carrera de la página.
+    """
+    tarjetas = []
+    for i, c in enumerate(carreras, start=inicio):
+        slug = slug_ficha(c, i)
+        tarjetas.append(
+            f'<div class="col d-flex justify-content-center"><div class="card">'
+            f'<a href="/carreras/{slug}"><img src="/storage/miniaturas/{slug}.jpg">'
+            f'<h5 class="card-title">{escape(c["titulo"])}</h5></a>'
+            f'<p class="card-text">{c["fecha"]} · {escape(c["ubicacion"])}</p></div></div>'
+        )
+    listado = '<div id="todasCarrerasDiv"><div class="row">\n' + '\n'.join(tarjetas) + '\n</div></div>'
+    return _envoltorio('Próximas carreras - Línea de Salida', listado)
+
+
+def pagina_ficha_lineadesalida(carrera):
+    """La ficha de detalle de una carrera en lineadesalida.net."""
+    slug = _slug(carrera['titulo'])
+    ficha = (
+        f'<div class="row mt-3"><div class="col-md-4"><img src="/storage/miniaturas/{slug}.jpg"></div>'
+        f'<div class="col-md-8"><h3>{escape(carrera["titulo"])}</h3><div class="row">'
+        f'<div class="col-12 col-md mb-1 text-center"><i class="bi bi-geo"></i> Lugar: {escape(carrera["ubicacion"])}</div>'
+        f'<div class="col-12 col-md mb-1 text-center"><i class="bi bi-calendar"></i> Fecha: {carrera["fecha"]}</div>'
+        f'<div class="col-12 col-md mb-1 text-center"><i class="bi bi-clock"></i> Hora: 10:00</div>'
+        f'</div></div></div>\n'
+        + '\n'.join(f'<div class="row"><p>Recorrido, avituallamientos y categorías ({i}).</p></div>' for i in range(30))
+        + f'\n<div class="row px-2 py-3"><a class="btn" href="/storage/reglamentos/{slug}.pdf">Reglamento</a></div>'
+    )
+    return _envoltorio(f'{carrera["titulo"]} - Línea de Salida', ficha)
+
+
+def generar_fixtures(carpeta=CARPETA_FIXTURES, n=60, semilla=0):
+    """Escribe una página de cada tipo en `carpeta` y devuelve {nombre: ruta}."""
+    os.makedirs(carpeta, exist_ok=True)
+    carreras = generar_carreras(n, semilla=semilla)
+    paginas = {
+        'alcanza_calendario.html': pagina_alcanza(carreras),
+        'babel_eventos.html': pagina_babel(carreras[:n // 2]),
+        'lineadesalida_listado.html': pagina_listado_lineadesalida(carreras[:24]),
+        'lineadesalida_ficha.html': pagina_ficha_lineadesalida(carreras[0]),
+    }
+    rutas = {}
+    for nombre, html in paginas.items():
+        ruta = os.path.join(carpeta, nombre)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(html)
+        rutas[nombre] = ruta
+    return rutas
+
+
+if __name__ == "__main__":
+    for nombre, ruta in generar_fixtures().items():
+        print(f"📂 {ruta} ({os.path.getsize(ruta) / 1024:.1f} KB)")
@@ -0,0 +1,74 @@
+"""
+Generador de carreras sintéticas para los benchmarks.
+Cada carrera "real" aparece en una o varias fuentes con pequeñas variaciones
+en el título (edición, año, mayúsculas, tildes), igual que en los CSV de data/.
+"""
+import datetime
+import random
+
+TIPOS = ['Carrera Popular', 'Media Maratón', 'Cross', 'Trail', 'Subida', 'Carrera Solidaria',
+         'Marcha', 'San Silvestre', 'Duatlón', 'Milla Urbana', 'Carrera Nocturna', 'Ultra Trail']
+TEMAS = ['Alcalde', 'Virgen del Carmen', 'de la Mujer', 'Solidaria', 'de Navidad', 'de las Fiestas',
+         'del Mar Menor', 'Sierra Espuña', 'Barrio del Progreso', 'Huerta', 'Castillo', 'Los Molinos',
+         'del Cabezo', 'Ruta del Agua', 'Contra el Cáncer', 'de los Colegios', 'Nocturna', 'del Puerto']
+LUGARES = ['Murcia', 'Cartagena', 'Lorca', 'Molina de Segura', 'Alcantarilla', 'Mazarrón', 'Águilas',
+           'Cieza', 'Yecla', 'Jumilla', 'Totana', 'Caravaca de la Cruz', 'Santomera', 'La Unión',
+           'Torre Pacheco', 'San Javier', 'Archena', 'Puerto Lumbreras', 'Bullas', 'Mula', 'Bolnuevo']
+ORIGENES = ['ALCANZATUMETA', 'LINEADESALIDA', 'BABELSPORT']
+ROMANOS = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X', 'XI', 'XII', 'XIII', 'XIV',
+           'XV', 'XX', 'XXV', 'XXX', 'XXXV', 'XL']
+
+
+def _sin_tildes(texto):
+    return texto.translate(str.maketrans('áéíóúÁÉÍÓÚ', 'aeiouAEIOU'))
+
+
+def _variante(titulo, edicion, anio, azar):
+    """Otra fuente escribiendo el mismo título a su manera."""
+    opciones = [
+        lambda: f"{ROMANOS[edicion % len(ROMANOS)]} {titulo} {anio}",
+        lambda: f"{edicion + 1}ª {titulo}",
+        lambda: f"{titulo} {anio}".upper(),
+        lambda: _sin_tildes(f"{ROMANOS[edicion % len(ROMANOS)]} {titulo}"),
+        lambda: f"{titulo} - {anio}",
+    ]
+    return azar.choice(opciones)()
+
+
+def generar_carreras(n, semilla=0, dias=365, proporcion_duplicados=0.4, desfase_dias=0):
+    """
+    Devuelve una lista de n diccionarios con las columnas de los CSV de data/.
+    `desfase_dias` permite que una fuente publique el duplicado hasta ±N días
+    de la fecha real (como pasa a veces con Alcanza).
+    """
+    azar = random.Random(semilla)
+    inicio = datetime.date(2026, 1, 1)
+    carreras = []
+
+    while len(carreras) < n:
+        titulo = f"{azar.choice(TIPOS)} {azar.choice(TEMAS)} {azar.choice(LUGARES)}"
+        if azar.random() < 0.5:
+            titulo = f"{titulo} {azar.randint(1, 999)}"
+        lugar = azar.choice(LUGARES)
+        fecha = inicio + datetime.timedelta(days=azar.randrange(dias))
+        edicion = azar.randrange(40)
+
+        copias = 1
+        while copias < len(ORIGENES) and azar.random() < proporcion_duplicados:
+            copias += 1
+
+        for origen in azar.sample(ORIGENES, copias):
+            fecha_copia = fecha
+            if desfase_dias and carreras and azar.random() < 0.3:
+                fecha_copia = fecha + datetime.timedelta(days=azar.randint(-desfase_dias, desfase_dias))
+            carreras.append({
+                'fecha': fecha_copia.strftime('%d-%m-%Y'),
+                'titulo': _variante(titulo, edicion, fecha.year, azar),
+                'ubicacion': lugar if origen != 'ALCANZATUMETA' else f"{lugar} / MURCIA",
+                'url_inscripcion': f"https://example.org/{origen.lower()}/{len(carreras)}/inscripcion",
+                'url_ficha': f"https://example.org/{origen.lower()}/{len(carreras)}",
+                'imagen': f"https://example.org/{origen.lower()}/{len(carreras)}.jpg",
+                'origen': origen,
+            })
+
+    return carreras[:n]
@@ -0,0 +1,108 @@
+import argparse
+import datetime
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Búsqueda por texto en títulos y ubicaciones con el índice FTS5 `carreras_fts` (migración 9).
+# No distingue mayúsculas ni tildes ("maraton" encuentra "Maratón") y cada palabra vale como
+# prefijo ("media mar" encuentra "Media Maratón de Cartagena"). Los resultados salen por
+# relevancia (bm25), con el título pesando más que la ubicación.
+LIMITE = int(os.getenv('BUSQUEDA_LIMITE', '20'))
+# Peso de cada columna del índice al ordenar: titulo, ubicacion, ubicacion_normalizada
+PESOS = [float(peso) for peso in os.getenv('BUSQUEDA_PESOS', '10,2,2').split(',')]
+
+COLUMNAS = ['id', 'titulo', 'fecha', 'ubicacion', 'url_inscripcion', 'url_ficha', 'imagen', 'origen']
+
+SQL_BUSCAR = f"""
+    SELECT {', '.join('c.' + columna for columna in COLUMNAS)}
+    FROM carreras_fts JOIN carreras c ON c.id = carreras_fts.rowid
+    WHERE carreras_fts MATCH ? AND rank MATCH 'bm25({', '.join(map(str, PESOS))})' AND c.fecha >= ?
+    ORDER BY rank LIMIT ?
+"""
+# Cuántas hay sin el límite (la API lo devuelve como `total`)
+SQL_CONTAR = """
+    SELECT COUNT(*)
+    FROM carreras_fts JOIN carreras c ON c.id = carreras_fts.rowid
+    WHERE carreras_fts MATCH ? AND c.fecha >= ?
+"""
+
+# Las palabras de una letra casi no filtran y, como prefijo, recorrerían medio índice
+LONGITUD_MINIMA = 2
+_PALABRA = re.compile(r'\w+')
+
+
+def consulta_fts(texto):
+    """
+    'Media Marat' -> '"media"* "marat"*' (todas las palabras, cada una como prefijo).
+    Cada palabra va entre comillas para que nada del texto se lea como sintaxis de FTS5
+    (AND, NEAR, paréntesis...). Devuelve None si no queda ninguna palabra útil.
+    """
+    palabras = [p for p in _PALABRA.findall(str(texto or '').casefold()) if len(p) >= LONGITUD_MINIMA]
+    if not palabras:
+        return None
+    return ' '.join(f'"{palabra}"*' for palabra in dict.fromkeys(palabras))
+
+
+def buscar(client, texto, desde=None, limite=None):
+    """
+    Carreras que contienen todas las palabras de `texto`, de la más a la menos relevante.
+    `desde` (AAAA-MM-DD, hoy por defecto) deja fuera las que ya han pasado; '' las incluye.
+    Devuelve una lista de diccionarios con COLUMNAS.
+    """
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return []
+    if desde is None:
+        desde = datetime.date.today().isoformat()
+    resultado = client.execute(SQL_BUSCAR, [consulta, desde, limite or LIMITE])
+    return [dict(zip(COLUMNAS, fila)) for fila in resultado.rows]
+
+
+def buscar_con_total(client, texto, desde=None, limite=None):
+    """Como buscar(), pero devuelve (carreras, cuántas hay sin el límite), en un solo viaje a la base de datos."""
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return [], 0
+    if desde is None:
+        desde = datetime.date.today().isoformat()
+    encontradas, total = client.batch([
+        (SQL_BUSCAR, [consulta, desde, limite or LIMITE]),
+        (SQL_CONTAR, [consulta, desde]),
+    ])
+    return [dict(zip(COLUMNAS, fila)) for fila in encontradas.rows], total.rows[0][0]
+
+
+def reconstruir(client):
+    """Vuelve a crear el índice entero a partir de la tabla carreras (si se ha tocado a mano, sin los disparadores)."""
+    client.execute("INSERT INTO carreras_fts (carreras_fts) VALUES ('rebuild')")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca carreras por título o ubicación")
+    parser.add_argument('texto', nargs='?', help="Palabras a buscar (valen como prefijo)")
+    parser.add_argument('--todas', action='store_true', help="Incluye las carreras que ya han pasado")
+    parser.add_argument('--limite', type=int, default=None)
+    parser.add_argument('--reconstruir', action='store_true', help="Rehace el índice de búsqueda")
+    args = parser.parse_args()
+
+    import base_datos
+
+    client = base_datos.conectar()
+    if client is not None:
+        try:
+            if args.reconstruir:
+                inicio = time.perf_counter()
+                reconstruir(client)
+                print(f"🔎 Índice de búsqueda reconstruido en {time.perf_counter() - inicio:.2f}s.")
+            if args.texto:
+                carreras = buscar(client, args.texto, desde='' if args.todas else None, limite=args.limite)
+                print(f"🔎 {len(carreras)} carreras para '{args.texto}' ({consulta_fts(args.texto)}):")
+                for carrera in carreras:
+                    print(f"   · {carrera['fecha']}  {carrera['titulo']} ({carrera['ubicacion'] or 'sin ubicación'})")
+        finally:
+            client.close()
@@ -0,0 +1,282 @@
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+import metricas
+
+# Dos carreras con una similitud mayor que esta se consideran la misma
+UMBRAL_SIMILITUD = 70
+# Días de diferencia que se toleran entre fuentes (a veces una publica la carrera un día antes o después)
+VENTANA_DIAS = int(os.getenv('DEDUP_VENTANA_DIAS', '1'))
+# Cuánto puede restar una ubicación distinta a la similitud del título (0.2 = hasta un 20%)
+PESO_UBICACION = float(os.getenv('DEDUP_PESO_UBICACION', '0.2'))
+# Ubicaciones que no distinguen nada: "Murcia" es el valor por defecto de los scrapers
+UBICACIONES_GENERICAS = {'', 'murcia', 'region de murcia'}
+# Dos carreras en lugares del nomenclátor a más de estos km no se comparan (0 = no se mira la distancia)
+DISTANCIA_MAXIMA_KM = float(os.getenv('DEDUP_DISTANCIA_KM', '15'))
+
+# Palabras que aparecen en casi todos los títulos y no sirven para agrupar candidatas
+PALABRAS_VACIAS = {
+    'a', 'al', 'de', 'del', 'el', 'en', 'la', 'las', 'los', 'por', 'y', 'e', 'o',
+    'carrera', 'carreras', 'edicion',
+}
+
+# Número romano de edición (I, IV, XII, XXXVII... hasta LXXXIX). Sin M, D ni C: "mi", "md", "cd"
+# o "mix" son palabras o siglas de clubes, no ediciones. Solo se quita al principio del título
+# ("XXXV Carrera...") o delante de "edición" ("Cross de Lorca, XV edición").
+_ROMANO = re.compile(r'^(xl|l?x{0,3})(ix|iv|v?i{0,3})$')
+# Números y ordinales: "4", "2026", "1a" (de "1ª"), "12o" (de "12º"), "3er"...
+_NUMERO = re.compile(r'^\d+(a|o|er|ra|na|ta|va|da)?$')
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+# Longitud del prefijo de cada palabra que se usa como clave de bloqueo.
+# Con un prefijo corto, "santomera" y "santomer" caen en el mismo bloque.
+LONGITUD_CLAVE = 4
+
+
+def _sin_tildes(texto):
+    # NFKD separa la tilde de la letra ("ó" -> "o" + "´") y al pasar a ASCII se pierde la tilde
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+@lru_cache(maxsize=65536)
+def normalizar_titulo(titulo):
+    """
+    Deja el título listo para comparar:
+    'XXXV Carrera Alcalde de La Unión 2026' -> 'carrera alcalde de la union'
+    (minúsculas, sin tildes, sin números romanos ni números de edición/año).
+    """
+    texto = _sin_tildes(str(titulo).casefold())
+    palabras = _NO_ALFANUMERICO.sub(' ', texto).split()
+
+    limpias = [
+        p for k, p in enumerate(palabras)
+        if not _NUMERO.match(p)
+        and not (_ROMANO.match(p) and (k == 0 or palabras[k + 1:k + 2] == ['edicion']))
+    ]
+
+    # Si el título era solo un número ("XII") nos quedamos con lo que había
+    return ' '.join(limpias or palabras)
+
+
+def claves_bloqueo(titulo_normalizado):
+    return {p[:LONGITUD_CLAVE] for p in titulo_normalizado.split() if p not in PALABRAS_VACIAS}
+
+
+@lru_cache(maxsize=16384)
+def normalizar_ubicacion(ubicacion):
+    """
+    'Union, La / MURCIA' -> 'union la'. Devuelve '' si no aporta información
+    (vacía o el "Murcia" genérico que ponen los scrapers por defecto).
+    """
+    if ubicacion is None or ubicacion != ubicacion:  # None o NaN
+        return ''
+    texto = _sin_tildes(str(ubicacion).casefold())
+    # La provincia que añade Alcanza ("/ MURCIA") no distingue nada
+    texto = texto.split('/')[0]
+    texto = ' '.join(_NO_ALFANUMERICO.sub(' ', texto).split())
+    return '' if texto in UBICACIONES_GENERICAS else texto
+
+
+def _ordinal(fecha):
+    return fecha if isinstance(fecha, (int, np.integer)) else fecha.toordinal()
+
+
+def _pares_en_ventana(indices, dias, ventana):
+    """
+    `indices` y `dias` ordenados por fecha. Devuelve dos arrays (izquierda, derecha)
+    con todos los pares separados como mucho `ventana` días, sin recorrer
+    el producto cruzado: cada elemento solo mira hacia delante hasta salir de la ventana.
+    """
+    posiciones = np.arange(len(dias))
+    fin = np.searchsorted(dias, dias + ventana, side='right')
+    cuantos = fin - posiciones - 1
+    total = int(cuantos.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    izquierda = np.repeat(posiciones, cuantos)
+    # Para cada par, posición del segundo elemento: p+1, p+2, ..., fin[p]-1
+    inicio_tramo = np.repeat(np.cumsum(cuantos) - cuantos, cuantos)
+    derecha = np.arange(total) - inicio_tramo + izquierda + 1
+    return indices[izquierda], indices[derecha]
+
+
+def _pares_candidatos(claves, dias, ventana):
+    """
+    Pares (i, j), i < j, que comparten al menos una clave de bloqueo y cuyas fechas
+    están a ±`ventana` días. Los títulos sin claves se comparan con todos los de su ventana.
+    """
+    indice_invertido = defaultdict(list)
+    sin_claves = []
+    for i, claves_i in enumerate(claves):
+        if claves_i:
+            for clave in claves_i:
+                indice_invertido[clave].append(i)
+        else:
+            sin_claves.append(i)
+
+    n = len(claves)
+    trozos = []
+
+    def anadir(izquierda, derecha):
+        if len(izquierda):
+            trozos.append(np.minimum(izquierda, derecha) * n + np.maximum(izquierda, derecha))
+
+    for lista in indice_invertido.values():
+        if len(lista) > 1:
+            indices = np.array(sorted(lista, key=lambda i: (dias[i], i)), dtype=np.int64)
+            anadir(*_pares_en_ventana(indices, dias[indices], ventana))
+
+    if sin_claves:
+        todos = np.argsort(dias, kind='stable')
+        dias_ordenados = dias[todos]
+        for i in sin_claves:
+            desde = np.searchsorted(dias_ordenados, dias[i] - ventana, side='left')
+            hasta = np.searchsorted(dias_ordenados, dias[i] + ventana, side='right')
+            otros = todos[desde:hasta]
+            otros = otros[otros != i]
+            anadir(np.full(len(otros), i, dtype=np.int64), otros)
+
+    if not trozos:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Un mismo par puede salir por varias claves: ordenamos y quitamos repetidos
+    codigos = np.concatenate(trozos)
+    codigos.sort()
+    codigos = codigos[np.concatenate(([True], codigos[1:] != codigos[:-1]))]
+    return codigos // n, codigos % n
+
+
+def _lejanas(izquierda, derecha, coordenadas, lugares, distancia_km):
+    """
+    Máscara de los pares cuyas dos carreras tienen coordenadas y están a más de `distancia_km`.
+    Las de ubicación genérica no cuentan: el "Murcia" por defecto no dice dónde es la carrera.
+    """
+    puntos = np.array([
+        punto if punto is not None and lugar else (np.nan, np.nan)
+        for punto, lugar in zip(coordenadas, lugares)
+    ], dtype=np.float64).reshape(-1, 2)
+    latitudes, longitudes = np.radians(puntos[:, 0]), np.radians(puntos[:, 1])
+    lat_a, lat_b = latitudes[izquierda], latitudes[derecha]
+    a = (np.sin((lat_b - lat_a) / 2) ** 2
+         + np.cos(lat_a) * np.cos(lat_b) * np.sin((longitudes[derecha] - longitudes[izquierda]) / 2) ** 2)
+    with np.errstate(invalid='ignore'):
+        distancias = 2 * 6371.0 * np.arcsin(np.sqrt(a))
+        # Con NaN (alguna sin coordenadas) la comparación da False: el par se queda
+        return distancias > distancia_km
+
+
+def similitud_titulos(titulos_a, titulos_b):
+    """Similitud 0-100 de cada par de títulos normalizados (listas paralelas), en C y en varios hilos."""
+    return process.cpdist(titulos_a, titulos_b, scorer=fuzz.token_sort_ratio, workers=-1)
+
+
+def puntuar(titulos_a, titulos_b, ubicaciones_a, ubicaciones_b, umbral=UMBRAL_SIMILITUD, peso_ubicacion=None,
+            similitudes=None):
+    """
+    Puntuación combinada 0-100 para listas paralelas de pares ya normalizados.
+    La ubicación solo penaliza: con la misma ubicación queda la similitud del título y,
+    cuanto más se diferencian, más se rebaja. Si alguna de las dos no aporta
+    información, cuenta solo el título. Si ya se tiene la similitud de los títulos
+    (de la memoria de ejecuciones anteriores) se pasa en `similitudes`.
+    """
+    if peso_ubicacion is None:
+        peso_ubicacion = PESO_UBICACION
+    puntuaciones = similitud_titulos(titulos_a, titulos_b) if similitudes is None else similitudes
+    if peso_ubicacion <= 0:
+        return puntuaciones
+
+    # Como la ubicación solo resta, basta con mirarla en los pares que ya superan el umbral
+    posiciones = [k for k in np.flatnonzero(puntuaciones > umbral) if ubicaciones_a[k] and ubicaciones_b[k]]
+    if posiciones:
+        metricas.contar('dedup_comparaciones_ubicacion', len(posiciones))
+        lugares = process.cpdist(
+            [ubicaciones_a[k] for k in posiciones],
+            [ubicaciones_b[k] for k in posiciones],
+            scorer=fuzz.token_set_ratio,
+            workers=-1,
+        )
+        puntuaciones = puntuaciones.astype(np.float64)
+        puntuaciones[posiciones] *= (1 - peso_ubicacion) + peso_ubicacion * lugares / 100
+    return puntuaciones
+
+
+@metricas.cronometrado('deduplicacion_segundos')
+def agrupar_duplicados(titulos, fechas, ubicaciones=None, umbral=UMBRAL_SIMILITUD, ventana_dias=None,
+                       normalizados=None, coordenadas=None, distancia_km=None, memoria=None):
+    """
+    Agrupa las carreras repetidas.
+
+    `titulos`, `fechas` (date/Timestamp u ordinales) y `ubicaciones` son listas
+    paralelas. Se comparan carreras separadas como mucho `ventana_dias` días
+    (0 = solo el mismo día). Si ya se tienen los títulos normalizados
+    (`Carrera.clave`) se pueden pasar en `normalizados`. Con `coordenadas` ((lat, lon) o None
+    por carrera, de geografia.py) no se comparan las que están a más de `distancia_km`. Con
+    `memoria` se reutilizan las similitudes de ejecuciones anteriores. Devuelve una lista de grupos (listas de índices)
+    ordenada por el primer índice de cada grupo, que es el que se queda como representante.
+
+    Se mantiene el criterio del bucle original: recorriendo en orden, cada
+    carrera aún libre se queda con todas las posteriores que se le parezcan.
+    """
+    if ventana_dias is None:
+        ventana_dias = VENTANA_DIAS
+    if distancia_km is None:
+        distancia_km = DISTANCIA_MAXIMA_KM
+    if ubicaciones is None:
+        ubicaciones = [None] * len(titulos)
+
+    if normalizados is None:
+        normalizados = [normalizar_titulo(t) for t in titulos]
+    lugares = [normalizar_ubicacion(u) for u in ubicaciones]
+    claves = [claves_bloqueo(t) for t in normalizados]
+    dias = np.array([_ordinal(f) for f in fechas], dtype=np.int64)
+
+    izquierda, derecha = _pares_candidatos(claves, dias, ventana_dias)
+    # Con memoria, antes de descartar por distancia: así "ya comparado" solo depende de títulos y fechas
+    similitudes = None
+    if memoria is not None:
+        firma = f"{umbral}|{ventana_dias}|{LONGITUD_CLAVE}|{' '.join(sorted(PALABRAS_VACIAS))}"
+        similitudes = memoria.similitudes(normalizados, dias, izquierda, derecha, similitud_titulos, umbral, firma)
+    if coordenadas is not None and distancia_km > 0 and len(izquierda):
+        lejanas = _lejanas(izquierda, derecha, coordenadas, lugares, distancia_km)
+        metricas.contar('dedup_descartadas_distancia', int(lejanas.sum()))
+        izquierda, derecha = izquierda[~lejanas], derecha[~lejanas]
+        if similitudes is not None:
+            similitudes = similitudes[~lejanas]
+    metricas.contar('dedup_carreras', len(titulos))
+    metricas.contar('dedup_comparaciones', len(izquierda))
+
+    # Todas las comparaciones de golpe (en C y en varios hilos)
+    similares = defaultdict(list)
+    if len(izquierda):
+        puntuaciones = puntuar(
+            [normalizados[i] for i in izquierda],
+            [normalizados[j] for j in derecha],
+            [lugares[i] for i in izquierda],
+            [lugares[j] for j in derecha],
+            umbral,
+            similitudes=similitudes,
+        )
+        for k in np.flatnonzero(puntuaciones > umbral):
+            similares[int(izquierda[k])].append(int(derecha[k]))
+
+    grupos = []
+    asignada = [False] * len(titulos)
+    for i in range(len(titulos)):
+        if asignada[i]:
+            continue
+        asignada[i] = True
+        grupo = [i]
+        for j in similares.get(i, ()):
+            if not asignada[j]:
+                asignada[j] = True
+                grupo.append(j)
+        grupos.append(grupo)
+
+    metricas.contar('dedup_grupos', len(grupos))
+    return grupos
@@ -0,0 +1,139 @@
+import re
+from datetime import date
+from functools import lru_cache
+
+import pandas as pd
+
+# Un único sitio donde se leen las fechas de todas las webs, con formatos explícitos
+# (nada de que pandas "adivine" el formato fila a fila). La misma gramática se aplica
+# a un texto suelto (parsear_fecha, al crear cada Carrera) o a una columna entera de
+# golpe (normalizar_fechas, para las instantáneas y los lotes grandes).
+
+# Abreviaturas de los meses en español e inglés (se comparan las 3 primeras letras)
+MESES = {
+    'ene': 1, 'jan': 1,
+    'feb': 2,
+    'mar': 3,
+    'abr': 4, 'apr': 4,
+    'may': 5,
+    'jun': 6,
+    'jul': 7,
+    'ago': 8, 'aug': 8,
+    'sep': 9, 'set': 9,
+    'oct': 10,
+    'nov': 11,
+    'dic': 12, 'dec': 12,
+}
+
+# Formatos que dan las webs, de más a menos habitual. Cada uno con grupos dia, mes y anio.
+PATRONES = (
+    # 18-01-2026, 18/1/26, 18.01.2026 (Babelsport, Línea de Salida, instantáneas antiguas)
+    r'^(?P<dia>\d{1,2})(?P<sep>[-/.])(?P<mes>\d{1,2})(?P=sep)(?P<anio>\d{4}|\d{2})$',
+    # 2026-01-18, 2026/01/18 (lo que guarda Carrera)
+    r'^(?P<anio>\d{4})(?P<sep>[-/])(?P<mes>\d{1,2})(?P=sep)(?P<dia>\d{1,2})$',
+    # 29 may 26, 29 de mayo de 2026 (Alcanza)
+    r'^(?P<dia>\d{1,2})[ -](?:de )?(?P<mes>[a-zñ]{3,})[ -](?:de )?(?P<anio>\d{4}|\d{2})$',
+    # may 29 2026 (inglés)
+    r'^(?P<mes>[a-z]{3,}) (?P<dia>\d{1,2}) (?P<anio>\d{4})$',
+)
+_PATRONES = tuple(re.compile(patron) for patron in PATRONES)
+
+# "Fecha: 27-07-2026" -> "27-07-2026"; "2026-01-18 00:00:00" -> "2026-01-18"; "29 May. 26" -> "29 may 26"
+_ETIQUETA = r'^[^\d:]*:\s*'
+_HORA = r'[ t]\d{1,2}:\d{2}(?::\d{2})?$'
+_PUNTUACION = r'(?<=[a-zñ])\.|,'
+
+
+def _limpiar(texto):
+    texto = re.sub(_ETIQUETA, '', texto.strip().lower())
+    texto = re.sub(_PUNTUACION, '', re.sub(_HORA, '', texto))
+    return ' '.join(texto.split())
+
+
+def _numero_mes(mes):
+    if mes.isdigit():
+        return int(mes)
+    return MESES.get(mes[:3])
+
+
+def _anio_completo(anio):
+    # Años de dos cifras: '26' -> 2026
+    return anio + 2000 if anio < 100 else anio
+
+
+@lru_cache(maxsize=4096)
+def parsear_fecha(texto):
+    """'18-01-2026', '29 May 26', 'Fecha: 18/1/26'... -> date. None si no se entiende."""
+    if not texto:
+        return None
+    limpio = _limpiar(str(texto))
+    for patron in _PATRONES:
+        encontrado = patron.match(limpio)
+        if not encontrado:
+            continue
+        mes = _numero_mes(encontrado['mes'])
+        if mes is None:
+            return None
+        try:
+            return date(_anio_completo(int(encontrado['anio'])), mes, int(encontrado['dia']))
+        except ValueError:
+            return None
+    return None
+
+
+def normalizar_fechas(textos):
+    """
+    Versión vectorizada de parsear_fecha para una columna entera.
+    Devuelve una Series datetime64 (NaT en las que no se entienden) con el mismo índice.
+    """
+    serie = pd.Series(textos, dtype='object')
+    # Las fechas se repiten mucho (cientos de días distintos en miles de carreras):
+    # se leen solo los textos distintos y luego se reparten a sus filas
+    codigos, unicos = pd.factorize(serie)
+    if not len(unicos):
+        return pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    leidas = _normalizar_unicos(pd.Series(unicos, dtype='object'))
+    resultado = pd.Series(leidas.to_numpy()[codigos], index=serie.index, dtype='datetime64[ns]')
+    # factorize da -1 a los vacíos (None, NaN)
+    return resultado.where(codigos >= 0)
+
+
+def _normalizar_unicos(serie):
+    limpio = (
+        serie.astype(str).str.strip().str.lower()
+        .str.replace(_ETIQUETA, '', regex=True)
+        .str.replace(_HORA, '', regex=True)
+        .str.replace(_PUNTUACION, '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+    )
+
+    partes = pd.DataFrame(index=serie.index, columns=['dia', 'mes', 'anio'], dtype='object')
+    for patron in PATRONES:
+        pendientes = partes['dia'].isna()
+        if not pendientes.any():
+            break
+        encontradas = limpio[pendientes].str.extract(patron).dropna()
+        partes.loc[encontradas.index, ['dia', 'mes', 'anio']] = encontradas[['dia', 'mes', 'anio']].to_numpy()
+
+    meses_texto = partes['mes'].where(partes['mes'].notna(), '').astype(str)
+    mes = pd.to_numeric(meses_texto, errors='coerce')
+    mes = mes.fillna(meses_texto.str[:3].map(MESES))
+    anio = pd.to_numeric(partes['anio'], errors='coerce')
+    anio = anio.where(anio >= 100, anio + 2000)
+
+    # Los componentes que no son una fecha real (31-02, mes desconocido...) quedan en NaT
+    return pd.to_datetime(
+        pd.DataFrame({'year': anio, 'month': mes, 'day': pd.to_numeric(partes['dia'], errors='coerce')}),
+        errors='coerce',
+    )
+
+
+def no_entendidas(textos, fechas):
+    """Textos (no vacíos) que no se han podido leer como fecha, sin repetir."""
+    serie = pd.Series(textos, dtype='object')
+    return sorted(set(serie[fechas.isna().to_numpy() & serie.notna().to_numpy()].astype(str)) - {''})
+
+
+def a_iso(fechas):
+    """Series datetime64 -> textos 'AAAA-MM-DD' (None donde hay NaT)."""
+    return fechas.dt.strftime('%Y-%m-%d').astype(object).where(fechas.notna(), None)
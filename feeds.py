@@ -0,0 +1,258 @@
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+
+import base_datos
+import fechas
+import metricas
+from ficheros import escribir_atomico
+
+# brotli es opcional: sin él solo se genera la versión .gz
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+load_dotenv()
+
+# Ficheros estáticos con las próximas carreras, generados al terminar la fusión para que la
+# web y los calendarios se sirvan desde el CDN sin leer la base de datos:
+#   indice.json              meses disponibles, con el número de carreras y el hash de cada uno
+#   meses/AAAA-MM.json/.ics  las carreras de un mes
+#   origenes/<origen>.ics    las carreras de una fuente
+#   carreras.ics             todas
+# Cada fichero va también comprimido (.gz y, si está brotli, .br) y solo se reescribe si cambia.
+# Los feeds empiezan el día 1 del mes en curso (la web quita las carreras pasadas): así la
+# partición de este mes no cambia cada día al quedarse atrás las carreras de ayer.
+ACTIVO = os.getenv('FEEDS_GENERAR', '1') == '1'
+CARPETA = os.getenv('FEEDS_CARPETA', 'data/feeds')
+NOMBRE_CALENDARIO = os.getenv('FEEDS_NOMBRE', 'Carreras en Murcia')
+DOMINIO_UID = os.getenv('FEEDS_DOMINIO', 'carreras-murcia')
+
+COLUMNAS = ['titulo', 'fecha', 'ubicacion', 'imagen', 'url_inscripcion', 'url_ficha', 'origen',
+            'imagen_estado', 'imagen_ancho', 'imagen_alto', 'imagen_miniatura']
+# La misma consulta que hace la web (front/src/pages/index.astro)
+SQL_PROXIMAS = f"SELECT {', '.join(COLUMNAS)} FROM carreras WHERE fecha >= ? ORDER BY fecha ASC"
+
+
+def leer_proximas(client, desde=None):
+    """Carreras con fecha >= hoy (o `desde`), ordenadas por fecha, como diccionarios."""
+    desde = desde or datetime.date.today().isoformat()
+    resultado = client.execute(SQL_PROXIMAS, [desde])
+    carreras = []
+    for fila in resultado.rows:
+        carrera = dict(zip(COLUMNAS, fila))
+        # Filas antiguas con una fecha que no es AAAA-MM-DD: se leen igual o se dejan fuera
+        dia = fechas.parsear_fecha(carrera['fecha'])
+        if dia is None:
+            continue
+        carrera['fecha'] = dia.isoformat()
+        carreras.append(carrera)
+    return carreras
+
+
+def _hash(contenido):
+    return hashlib.sha1(contenido).hexdigest()[:16]
+
+
+def _nombre_fichero(texto):
+    return re.sub(r'[^a-z0-9]+', '-', str(texto).lower()).strip('-') or 'sin-origen'
+
+
+# --- JSON ---
+
+def json_mes(carreras):
+    # Sin la fecha de generación dentro: si las carreras no cambian, el fichero tampoco
+    return json.dumps(carreras, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+# --- iCalendar (RFC 5545) ---
+
+def _escapar(texto):
+    return (str(texto).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _plegar(linea):
+    """Las líneas de más de 75 bytes se parten y siguen en la siguiente con un espacio delante."""
+    datos = linea.encode('utf-8')
+    if len(datos) <= 75:
+        return linea
+    trozos, actual = [], ''
+    for caracter in linea:
+        limite = 75 if not trozos else 74
+        if len((actual + caracter).encode('utf-8')) > limite:
+            trozos.append(actual)
+            actual = ''
+        actual += caracter
+    trozos.append(actual)
+    return '\r\n '.join(trozos)
+
+
+def uid(carrera):
+    """Identificador estable del evento: el mismo aunque cambien la ubicación o los enlaces."""
+    clave = f"{carrera['titulo']}|{carrera['fecha']}".encode('utf-8')
+    return f"{hashlib.sha1(clave).hexdigest()[:16]}@{DOMINIO_UID}"
+
+
+def _dtstamp(generado):
+    return generado.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def evento(carrera, generado):
+    dia = datetime.date.fromisoformat(carrera['fecha'])
+    enlace = carrera['url_inscripcion'] or carrera['url_ficha']
+    lineas = [
+        'BEGIN:VEVENT',
+        f"UID:{uid(carrera)}",
+        # Cuándo se ha generado: escribir_si_cambia no lo tiene en cuenta al comparar
+        f"DTSTAMP:{_dtstamp(generado)}",
+        f"DTSTART;VALUE=DATE:{dia.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(dia + datetime.timedelta(days=1)).strftime('%Y%m%d')}",
+        f"SUMMARY:{_escapar(carrera['titulo'])}",
+    ]
+    if carrera['ubicacion']:
+        lineas.append(f"LOCATION:{_escapar(carrera['ubicacion'])}")
+    if enlace:
+        lineas.append(f"URL:{enlace}")
+    descripcion = [texto for texto in (
+        f"Inscripción: {carrera['url_inscripcion']}" if carrera['url_inscripcion'] else None,
+        f"Reglamento: {carrera['url_ficha']}" if carrera['url_ficha'] else None,
+        f"Fuente: {carrera['origen']}" if carrera['origen'] else None,
+    ) if texto]
+    if descripcion:
+        lineas.append(f"DESCRIPTION:{_escapar(chr(10).join(descripcion))}")
+    lineas.append('END:VEVENT')
+    return lineas
+
+
+def calendario(carreras, nombre, generado=None):
+    generado = generado or datetime.datetime.now(datetime.timezone.utc)
+    lineas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f"PRODID:-//{DOMINIO_UID}//{NOMBRE_CALENDARIO}//ES",
+        'CALSCALE:GREGORIAN',
+        f"X-WR-CALNAME:{_escapar(nombre)}",
+    ]
+    for carrera in carreras:
+        lineas += evento(carrera, generado)
+    lineas.append('END:VCALENDAR')
+    return ('\r\n'.join(_plegar(linea) for linea in lineas) + '\r\n').encode('utf-8')
+
+
+# --- Escritura ---
+
+def versiones(contenido):
+    """{extensión: bytes}: el original y sus versiones comprimidas."""
+    resultado = {'': contenido, '.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        resultado['.br'] = brotli.compress(contenido, quality=11)
+    return resultado
+
+
+def versiones_disponibles():
+    return ['.gz'] + (['.br'] if brotli is not None else [])
+
+
+def _sin_dtstamp(contenido):
+    return re.sub(rb'^DTSTAMP:[0-9TZ]+\r\n', b'', contenido, flags=re.MULTILINE)
+
+
+def escribir_si_cambia(ruta, contenido):
+    """
+    Escribe el fichero y sus comprimidos solo si el contenido es distinto del que hay (sin
+    contar el DTSTAMP de los calendarios, que cambia en cada ejecución). Devuelve si se ha escrito.
+    """
+    try:
+        with open(ruta, 'rb') as f:
+            if _sin_dtstamp(f.read()) == _sin_dtstamp(contenido) and all(os.path.exists(ruta + ext) for ext in versiones_disponibles()):
+                return False
+    except FileNotFoundError:
+        pass
+    for ext, datos in versiones(contenido).items():
+        escribir_atomico(ruta + ext, datos)
+    return True
+
+
+def particiones(carreras):
+    """{ruta relativa: bytes} de todos los ficheros del feed."""
+    generado = datetime.datetime.now(datetime.timezone.utc)
+    meses, origenes = {}, {}
+    for carrera in carreras:
+        meses.setdefault(carrera['fecha'][:7], []).append(carrera)
+        origenes.setdefault(carrera['origen'] or 'sin origen', []).append(carrera)
+
+    ficheros = {}
+    indice = {'meses': {}, 'origenes': {}}
+    for mes, del_mes in meses.items():
+        contenido = json_mes(del_mes)
+        ficheros[f"meses/{mes}.json"] = contenido
+        ficheros[f"meses/{mes}.ics"] = calendario(del_mes, f"{NOMBRE_CALENDARIO} ({mes})", generado)
+        indice['meses'][mes] = {'carreras': len(del_mes), 'hash': _hash(contenido)}
+    for origen, del_origen in origenes.items():
+        nombre = f"origenes/{_nombre_fichero(origen)}.ics"
+        ficheros[nombre] = calendario(del_origen, f"{NOMBRE_CALENDARIO} ({origen})", generado)
+        indice['origenes'][origen] = {'carreras': len(del_origen), 'calendario': nombre}
+    ficheros['carreras.ics'] = calendario(carreras, NOMBRE_CALENDARIO, generado)
+    ficheros['indice.json'] = json.dumps(indice, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8')
+    return ficheros
+
+
+def generar_feeds(carreras, carpeta=None):
+    """
+    Escribe los ficheros del feed en `carpeta` (FEEDS_CARPETA) y borra los de particiones
+    que ya no existen (meses pasados, fuentes sin carreras). Devuelve un resumen.
+    """
+    carpeta = carpeta or CARPETA
+    inicio = time.perf_counter()
+    ficheros = particiones(carreras)
+    escritos = [nombre for nombre, contenido in ficheros.items()
+                if escribir_si_cambia(os.path.join(carpeta, nombre), contenido)]
+
+    borrados = []
+    for subcarpeta in ('meses', 'origenes'):
+        ruta = os.path.join(carpeta, subcarpeta)
+        if not os.path.isdir(ruta):
+            continue
+        for archivo in os.listdir(ruta):
+            base = re.sub(r'\.(gz|br)$', '', archivo)
+            if f"{subcarpeta}/{base}" not in ficheros:
+                os.remove(os.path.join(ruta, archivo))
+                borrados.append(f"{subcarpeta}/{archivo}")
+
+    segundos = time.perf_counter() - inicio
+    metricas.observar('etapa_segundos', segundos, etapa='feeds')
+    metricas.contar('feeds_ficheros', len(escritos), resultado='escrito')
+    metricas.contar('feeds_ficheros', len(ficheros) - len(escritos), resultado='sin_cambios')
+    print(f"   🗓️ Feeds en '{carpeta}' ({segundos * 1000:.0f} ms): {len(escritos)} de {len(ficheros)} "
+          f"ficheros reescritos{f', {len(borrados)} borrados' if borrados else ''}"
+          f"{'' if brotli is not None else ' (sin brotli: solo .gz)'}")
+    return {'ficheros': len(ficheros), 'escritos': escritos, 'borrados': borrados}
+
+
+def actualizar_feeds(client, carpeta=None, hoy=None):
+    """Lee las carreras desde el día 1 de este mes y regenera los feeds que hayan cambiado."""
+    hoy = hoy or datetime.date.today()
+    return generar_feeds(leer_proximas(client, hoy.replace(day=1).isoformat()), carpeta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera los feeds estáticos (JSON e iCalendar) de las próximas carreras")
+    parser.add_argument('--carpeta', default=None, help=f"Carpeta de salida (por defecto FEEDS_CARPETA={CARPETA})")
+    args = parser.parse_args()
+
+    print("🗓️ Generando feeds...")
+    client = base_datos.conectar()
+    if client is not None:
+        try:
+            actualizar_feeds(client, args.carpeta)
+        finally:
+            client.close()
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+
+def escribir_atomico(ruta, contenido):
+    """
+    Escribe `contenido` (bytes) en `ruta` creando las carpetas que falten. Se escribe en un
+    temporal de la misma carpeta y se renombra: quien lea el fichero (el CDN, la web, otra
+    ejecución) nunca ve uno a medias.
+    """
+    carpeta = os.path.dirname(ruta) or '.'
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
@@ -1,152 +1,216 @@
 import pandas as pd
-from thefuzz import fuzz
 import os
-import numpy as np
-import libsql_client
+import time
+from operator import attrgetter
 from dotenv import load_dotenv
 import requests
 
+import base_datos
+import deduplicacion
+import fechas
+import geografia
+import feeds
+import imagenes
+import memoria_dedup
+import metricas
+from modelo import CAMPOS, Carrera
+from scrapers import registro
+
 load_dotenv()
-IMAGEN_DEFECTO_URL_ALCANZA = 'https://www.alcanzatumeta.es/assets/images/no_image.png'
+
+# csv | parquet (necesita pyarrow) | ninguno (no se guardan instantáneas)
+FORMATO_INSTANTANEA = os.getenv('FORMATO_INSTANTANEA', 'csv')
+# Si está, no se avisa a Vercel: si hay cambios se deja este fichero y el workflow avisa después de
+# publicar los feeds y las miniaturas, para que la web se construya ya con ellos
+AVISO_VERCEL_PENDIENTE = os.getenv('VERCEL_AVISO_PENDIENTE')
+
+
+def _ruta_instantanea(ruta):
+    if FORMATO_INSTANTANEA == 'parquet':
+        return os.path.splitext(ruta)[0] + '.parquet'
+    return ruta
+
+
+def guardar_instantanea(carreras, ruta):
+    """Guarda las carreras de una fuente (CSV o Parquet) para poder usarlas si la web falla."""
+    if FORMATO_INSTANTANEA == 'ninguno' or not carreras:
+        return
+    ruta = _ruta_instantanea(ruta)
+    df = pd.DataFrame([carrera.a_dict() for carrera in carreras], columns=CAMPOS)
+    try:
+        if FORMATO_INSTANTANEA == 'parquet':
+            df.to_parquet(ruta, index=False)
+        else:
+            df.to_csv(ruta, index=False, encoding='utf-8-sig')
+        print(f"   📂 Instantánea guardada en '{ruta}' ({len(df)} carreras)")
+    except Exception as e:
+        print(f"   ⚠️ No se pudo guardar la instantánea '{ruta}': {e}")
 
 
-def limpiar_datos_json(dato):
-    if pd.isna(dato) or dato is None:
-        return None
-    if isinstance(dato, (np.integer, np.floating)):
-        if np.isnan(dato) or np.isinf(dato):
-            return None
-        return float(dato) if isinstance(dato, np.floating) else int(dato)
-    return str(dato) if dato != '' else None
+def cargar_instantanea(ruta):
+    """Lee la última instantánea guardada de una fuente y devuelve sus carreras (objetos Carrera)."""
+    for archivo in dict.fromkeys([_ruta_instantanea(ruta), ruta]):
+        if not os.path.exists(archivo):
+            continue
+        try:
+            df = pd.read_parquet(archivo) if archivo.endswith('.parquet') else pd.read_csv(archivo)
+            df.columns = df.columns.str.lower().str.strip()
+            if 'titulo' in df.columns and 'fecha' in df.columns:
+                print(f"   ✅ Cargado: {archivo} ({len(df)} carreras)")
+                # Toda la columna de fechas de una vez; las que no se entienden se avisan y se dejan tal cual
+                dias = fechas.normalizar_fechas(df['fecha'])
+                malas = fechas.no_entendidas(df['fecha'], dias)
+                if malas:
+                    print(f"   ⚠️ {archivo}: fechas que no se entienden: {', '.join(malas[:5])}")
+                df['fecha'] = fechas.a_iso(dias).where(dias.notna(), df['fecha'])
+                carreras = []
+                for fila in df.to_dict('records'):
+                    try:
+                        carreras.append(Carrera.desde_dict(fila))
+                    except ValueError as e:
+                        print(f"   ⚠️ Fila descartada de {archivo}: {e}")
+                return carreras
+        except Exception as e:
+            print(f"   ❌ Error leyendo {archivo}: {e}")
+    return []
 
 
-def fusionar_datos():
+def fusionar_datos(carreras=None):
+    """
+    Fusiona, deduplica y guarda las carreras. `carreras` es la lista que llega
+    directamente de los scrapers (ver main.py); si no se pasa, se parte de
+    las últimas instantáneas guardadas en data/.
+    """
     print("🔄 Iniciando proceso de fusión...")
 
     # --- 1. CONFIGURACIÓN TURSO ---
-    turso_url = os.getenv('TURSO_DATABASE_URL')
-    turso_token = os.getenv('TURSO_AUTH_TOKEN')
-
-    if not turso_url or not turso_token:
+    if base_datos.MODO_BD != 'local' and (not os.getenv('TURSO_DATABASE_URL') or not os.getenv('TURSO_AUTH_TOKEN')):
         print("❌ Faltan las credenciales de Turso en las variables de entorno.")
         return
 
-    # --- 2. LISTA Y CARGA DE ARCHIVOS CSV ---
-    archivos = [
-        'data/alcanzatumeta_completo.csv',
-        'data/lineadesalida_completo.csv',
-        'data/babelsport_completo.csv'
-    ]
-    dfs = []
-
-    for archivo in archivos:
-        if os.path.exists(archivo):
-            try:
-                df = pd.read_csv(archivo)
-                df.columns = df.columns.str.lower().str.strip()
-                if 'titulo' in df.columns and 'fecha' in df.columns:
-                    print(f"   ✅ Cargado: {archivo} ({len(df)} carreras)")
-                    dfs.append(df)
-            except Exception as e:
-                print(f"   ❌ Error leyendo {archivo}: {e}")
-
-    if not dfs:
+    # --- 2. CARGA DE LAS INSTANTÁNEAS (solo si no vienen de los scrapers) ---
+    if carreras is None:
+        carreras = []
+        # Instantáneas que deja cada scraper registrado, en el orden de prioridad de las fuentes
+        for fuente in registro.fuentes():
+            carreras += cargar_instantanea(fuente.ruta_csv)
+
+    if not carreras:
         print("❌ No se han cargado datos.")
         return
 
     # --- 3. UNIFICACIÓN Y LIMPIEZA ---
-    df_master = pd.concat(dfs, ignore_index=True)
-    df_master['fecha_dt'] = pd.to_datetime(df_master['fecha'], dayfirst=True, errors='coerce')
-    df_master = df_master.dropna(subset=['fecha_dt'])
-    df_master = df_master.sort_values(by='fecha_dt')
+    # Las fechas ya vienen leídas en cada Carrera: se descartan las que no se entienden, avisando
+    validas = [c for c in carreras if c.dia is not None]
+    sin_fecha = [c for c in carreras if c.dia is None]
+    if sin_fecha:
+        print(f"   ⚠️ {len(sin_fecha)} carreras descartadas por fecha que no se entiende:")
+        for c in sin_fecha[:10]:
+            print(f"      · [{c.origen}] {c.titulo}: {c.fecha!r}")
+        for c in sin_fecha:
+            metricas.contar('fechas_no_entendidas', origen=c.origen)
+    # Orden estable: a igualdad de fecha se respeta el orden de las fuentes (su prioridad)
+    validas.sort(key=attrgetter('dia'))
 
     # --- 4. DEDUPLICACIÓN INTELIGENTE ---
-    carreras_unicas = []
-    for fecha, grupo in df_master.groupby('fecha_dt'):
-        lista_dia = grupo.to_dict('records')
-        while lista_dia:
-            candidata = lista_dia.pop(0)
-            carreras_unicas.append(candidata)
-            indices_a_borrar = []
-            for i, otra in enumerate(lista_dia):
-                if fuzz.token_sort_ratio(str(candidata['titulo']), str(otra['titulo'])) > 70:
-                    indices_a_borrar.append(i)
-            for index in sorted(indices_a_borrar, reverse=True):
-                del lista_dia[index]
+    # Las similitudes de los pares ya comparados en ejecuciones anteriores se leen de la memoria
+    memoria = None
+    if memoria_dedup.ACTIVA:
+        try:
+            memoria = memoria_dedup.MemoriaDedup()
+        except Exception as e:
+            print(f"   ⚠️ No se puede abrir la memoria de la deduplicación ({e}). Se compara todo.")
+    inicio = time.perf_counter()
+    grupos = deduplicacion.agrupar_duplicados(
+        [c.titulo for c in validas],
+        [c.dia for c in validas],
+        [c.ubicacion for c in validas],
+        normalizados=[c.clave for c in validas],
+        coordenadas=[geografia.coordenadas(c.ubicacion) for c in validas],
+        memoria=memoria,
+    )
+    print(f"   🧹 {len(validas)} carreras -> {len(grupos)} únicas "
+          f"({time.perf_counter() - inicio:.3f}s de deduplicación)")
+    if memoria is not None:
+        try:
+            titulos = memoria.guardar()
+            print(f"   🧠 Memoria de la deduplicación: {memoria.tasa_aciertos():.0%} de aciertos "
+                  f"({memoria.aciertos} pares ya conocidos, {memoria.fallos} comparados; "
+                  f"{titulos} títulos recordados, {memoria.caducados} de carreras pasadas olvidados)")
+        except Exception as e:
+            print(f"   ⚠️ No se ha podido guardar la memoria de la deduplicación: {e}")
+        finally:
+            memoria.close()
 
     # --- 5. PREPARACIÓN FINAL ---
-    df_final = pd.DataFrame(carreras_unicas)
-    df_final['fecha'] = df_final['fecha_dt'].dt.strftime('%Y-%m-%d')
+    # Nos quedamos con la primera carrera de cada grupo
+    carreras = [validas[grupo[0]] for grupo in grupos]
 
     print("\n💾 Guardando en base de datos (Turso)...")
 
-    contador_nuevas = 0
-    contador_actualizadas = 0
-    errores_db = 0
-
     # --- 6. CONEXIÓN A TURSO ---
     try:
-        # Nos conectamos directamente a la nube
-        client = libsql_client.create_client_sync(turso_url, auth_token=turso_token)
-        print("   ✅ Conectado a Turso (Modo Remoto)")
+        client = base_datos.conectar()
     except Exception as e:
         print(f"   ❌ Error conectando a Turso: {e}")
         return
+    if client is None:
+        return
 
     # --- 7. INSERCIÓN / ACTUALIZACIÓN ---
-    for index, fila in df_final.iterrows():
-        titulo = limpiar_datos_json(fila['titulo'])
-        fecha = limpiar_datos_json(fila['fecha'])
-        ubicacion = limpiar_datos_json(fila.get('ubicacion', ''))
-        url_inscripcion = limpiar_datos_json(fila.get('url_inscripcion', ''))
-        url_ficha = limpiar_datos_json(fila.get('url_ficha', ''))
-        imagen = limpiar_datos_json(fila.get('imagen', ''))
-        origen = limpiar_datos_json(fila.get('origen', ''))
+    try:
+        with metricas.cronometro('etapa_segundos', etapa='base_datos'):
+            resumen = base_datos.sincronizar_carreras(client, carreras)
+    except Exception as e:
+        print(f"   ❌ Error sincronizando con Turso: {e}")
+        client.close()
+        return
 
+    # --- 8. IMÁGENES DE LAS PRÓXIMAS CARRERAS ---
+    imagenes_cambiadas = 0
+    if imagenes.ACTIVO:
+        print("\n🖼️ Comprobando imágenes...")
         try:
-            # Comprobamos si existe (Nota: pasamos la variable entre corchetes [titulo])
-            resultado = client.execute("SELECT imagen FROM carreras WHERE titulo = ?", [titulo])
-
-            if len(resultado.rows) == 0:
-                # CASO 1: ES NUEVA
-                client.execute("""
-                    INSERT INTO carreras (fecha, titulo, ubicacion, url_inscripcion, url_ficha, imagen, origen, publicada) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, 0)
-                """, [fecha, titulo, ubicacion, url_inscripcion, url_ficha, imagen, origen])
-                contador_nuevas += 1
-
-            else:
-                # CASO 2: YA EXISTE
-                fila_db = resultado.rows[0]
-                imagen_actual_db = fila_db[0]
-
-                if imagen_actual_db == IMAGEN_DEFECTO_URL_ALCANZA:
-                    client.execute("""
-                        UPDATE carreras 
-                        SET fecha = ?, ubicacion = ?, url_ficha = ?, imagen = ?, origen = ?, url_inscripcion = ? 
-                        WHERE titulo = ?
-                    """, [fecha, ubicacion, url_ficha, imagen, origen, url_inscripcion, titulo])
-                else:
-                    client.execute("""
-                        UPDATE carreras 
-                        SET fecha = ?, ubicacion = ?, url_ficha = ?, origen = ?, url_inscripcion = ? 
-                        WHERE titulo = ?
-                    """, [fecha, ubicacion, url_ficha, origen, url_inscripcion, titulo])
-
-                contador_actualizadas += 1
+            resumen_imagenes = imagenes.procesar_imagenes(client)
+            imagenes_cambiadas = resumen_imagenes['guardadas'] if resumen_imagenes else 0
+        except Exception as e:
+            print(f"   ⚠️ Error comprobando imágenes: {e}")
 
+    # --- 9. FEEDS ESTÁTICOS (JSON e iCalendar por mes y por fuente) ---
+    if feeds.ACTIVO:
+        print("\n🗓️ Generando feeds...")
+        try:
+            feeds.actualizar_feeds(client)
         except Exception as e:
-            print(f"   ⚠️ Error guardando '{titulo}': {e}")
-            errores_db += 1
+            print(f"   ⚠️ Error generando los feeds: {e}")
 
     # Cerramos la conexión
     client.close()
 
+    contador_nuevas = resumen['nueva']
+    contador_actualizadas = resumen['actualizada']
+
     print(f"\n📊 Resumen de Sincronización:")
     print(f"   ✨ Nuevas insertadas: {contador_nuevas}")
-    print(f"   🔄 Existentes actualizadas: {contador_actualizadas}")
-
-    if contador_nuevas > 0 or contador_actualizadas > 0:
+    print(f"   🔄 Existentes con cambios: {contador_actualizadas}")
+    print(f"   💤 Sin cambios (no se escriben): {resumen['sin_cambios']} "
+          f"({resumen['segundos_hash'] * 1000:.1f} ms calculando hashes)")
+    if resumen['errores']:
+        print(f"   ⚠️ Errores: {resumen['errores']}")
+    print(f"   📡 {resumen['viajes']} viajes a la base de datos en {resumen['segundos']:.2f}s")
+
+    hay_cambios = contador_nuevas > 0 or contador_actualizadas > 0 or imagenes_cambiadas > 0
+    if AVISO_VERCEL_PENDIENTE:
+        # El workflow avisa a Vercel cuando ha publicado los feeds y las miniaturas
+        if hay_cambios:
+            with open(AVISO_VERCEL_PENDIENTE, 'w', encoding='utf-8') as f:
+                f.write('1\n')
+            print(f"\n🚀 Hay cambios: se avisará a Vercel después de publicar ('{AVISO_VERCEL_PENDIENTE}').")
+        elif os.path.exists(AVISO_VERCEL_PENDIENTE):
+            os.remove(AVISO_VERCEL_PENDIENTE)
+    elif base_datos.MODO_BD == 'local':
+        print("\n💤 Base de datos local: no se avisa a Vercel.")
+    elif hay_cambios:
         print("\n🚀 Avisando a Vercel para que actualice la página web...")
         vercel_webhook_url = os.getenv('VERCEL_URL')
         
@@ -161,6 +225,18 @@ def fusionar_datos():
     else:
         print("\n💤 No hay cambios. No hace falta actualizar la web.")
 
+    # La API (api.py) relee sola las filas cambiadas cada API_INTERVALO_REVISION segundos;
+    # con API_RECARGAR_URL se le avisa para que lo haga ya
+    api_url = os.getenv('API_RECARGAR_URL')
+    if api_url and hay_cambios:
+        token = os.getenv('API_TOKEN')
+        try:
+            respuesta = requests.post(api_url, headers={'Authorization': f"Bearer {token}"} if token else {},
+                                      timeout=30)
+            print(f"   🌐 API avisada ({respuesta.status_code}).")
+        except Exception as e:
+            print(f"   ⚠️ Fallo de conexión con la API: {e}")
+
 
 if __name__ == "__main__":
     fusionar_datos()
\ No newline at end of file
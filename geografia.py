@@ -0,0 +1,295 @@
+import argparse
+import csv
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+import metricas
+
+# Coordenadas de las ubicaciones de las carreras, sin servicios externos: se buscan en un
+# nomenclátor que va con el repo (data/nomenclator_murcia.csv: municipios de la Región de
+# Murcia, sus pedanías y pueblos de la costa con carreras, y los pueblos vecinos de Alicante,
+# Almería y Albacete que salen en las webs). Las coordenadas son las del centro del pueblo.
+RUTA_NOMENCLATOR = os.getenv('NOMENCLATOR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         'data', 'nomenclator_murcia.csv'))
+# Lado de las celdas del índice espacial
+CELDA_KM = float(os.getenv('GEO_CELDA_KM', '5'))
+
+RADIO_TIERRA_KM = 6371.0
+KM_POR_GRADO = 111.32
+
+ARTICULOS = ('el', 'la', 'los', 'las', 'l')
+PROVINCIAS = {'murcia', 'alicante', 'almeria', 'albacete'}
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+class Lugar:
+    """Una entrada del nomenclátor."""
+
+    __slots__ = ('nombre', 'municipio', 'provincia', 'latitud', 'longitud')
+
+    def __init__(self, nombre, municipio, provincia, latitud, longitud):
+        self.nombre = nombre
+        self.municipio = municipio
+        self.provincia = provincia
+        self.latitud = latitud
+        self.longitud = longitud
+
+    def __repr__(self):
+        return f"Lugar({self.nombre!r}, {self.municipio!r}, {self.latitud}, {self.longitud})"
+
+
+def _sin_tildes(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+def normalizar_lugar(texto):
+    """
+    'Barreros, Los / MURCIA' -> ('los barreros', 'murcia'); 'La Unión' -> ('la union', None).
+    Devuelve el lugar normalizado y la provincia si venía detrás de una barra.
+    """
+    partes = _sin_tildes(str(texto).casefold()).split('/')
+    provincia = ' '.join(_NO_ALFANUMERICO.sub(' ', partes[1]).split()) if len(partes) > 1 else None
+    lugar = partes[0]
+    # "Torres de Cotillas, Las" -> "Las Torres de Cotillas"
+    if ',' in lugar:
+        nombre, _, articulo = lugar.rpartition(',')
+        if articulo.strip() in ARTICULOS:
+            lugar = f"{articulo} {nombre}"
+    return ' '.join(_NO_ALFANUMERICO.sub(' ', lugar).split()), provincia or None
+
+
+def _sin_articulo(nombre):
+    palabras = nombre.split()
+    return ' '.join(palabras[1:]) if len(palabras) > 1 and palabras[0] in ARTICULOS else nombre
+
+
+@lru_cache(maxsize=1)
+def nomenclator():
+    """{nombre normalizado: Lugar} con los nombres, los alias y las formas sin artículo."""
+    nombres = {}
+    with open(RUTA_NOMENCLATOR, encoding='utf-8') as f:
+        for fila in csv.DictReader(f):
+            lugar = Lugar(fila['nombre'], fila['municipio'], fila['provincia'],
+                          float(fila['latitud']), float(fila['longitud']))
+            for nombre in [fila['nombre']] + [a for a in (fila['alias'] or '').split('|') if a]:
+                clave, _ = normalizar_lugar(nombre)
+                nombres.setdefault(clave, lugar)
+    sin_articulo = {_sin_articulo(clave): lugar for clave, lugar in nombres.items()}
+    return nombres, sin_articulo
+
+
+@lru_cache(maxsize=16384)
+def geocodificar(texto):
+    """
+    Lugar del nomenclátor al que se refiere la ubicación, o None si no se reconoce.
+    Se memoriza por texto: en una ejecución solo se buscan las ubicaciones distintas.
+    """
+    if not texto or texto != texto:  # None o NaN
+        return None
+    lugar, provincia = normalizar_lugar(texto)
+    nombres, sin_articulo = nomenclator()
+
+    encontrado = nombres.get(lugar) or sin_articulo.get(_sin_articulo(lugar))
+    if encontrado is None:
+        # "Polideportivo de El Palmar (Murcia)": el trozo más largo que es un lugar conocido
+        palabras = lugar.split()
+        for largo in range(len(palabras), 0, -1):
+            for inicio in range(len(palabras) - largo + 1):
+                encontrado = nombres.get(' '.join(palabras[inicio:inicio + largo]))
+                if encontrado:
+                    break
+            if encontrado:
+                break
+    if encontrado is None:
+        return None
+    # "Murcia / ALICANTE" no es la ciudad de Murcia
+    if provincia in PROVINCIAS and _sin_tildes(encontrado.provincia.casefold()) != provincia:
+        return None
+    return encontrado
+
+
+def coordenadas(texto):
+    """(latitud, longitud) de una ubicación, o None."""
+    lugar = geocodificar(texto)
+    return (lugar.latitud, lugar.longitud) if lugar else None
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distancia por la superficie de la Tierra (haversine)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+class IndiceEspacial:
+    """
+    Cuadrícula de celdas de CELDA_KM de lado. Cada celda guarda los puntos que caen en
+    ella; una búsqueda por radio solo mira las celdas que toca el círculo.
+    Las carreras se concentran en unos cientos de pueblos, así que cada punto distinto
+    se guarda una vez con la lista de elementos que tiene.
+    """
+
+    def __init__(self, elementos, celda_km=None):
+        """`elementos`: iterable de (latitud, longitud, valor)."""
+        celda_km = celda_km or CELDA_KM
+        self.alto = celda_km / KM_POR_GRADO
+        # Con la anchura a la latitud de Murcia; más al norte las celdas quedan algo más estrechas
+        self.ancho = celda_km / (KM_POR_GRADO * math.cos(math.radians(38)))
+        puntos = {}
+        for latitud, longitud, valor in elementos:
+            puntos.setdefault((latitud, longitud), []).append(valor)
+        self.celdas = {}
+        for (latitud, longitud), valores in puntos.items():
+            self.celdas.setdefault(self._celda(latitud, longitud), []).append((latitud, longitud, valores))
+        self.total = sum(len(valores) for valores in puntos.values())
+
+    def _celda(self, latitud, longitud):
+        return math.floor(latitud / self.alto), math.floor(longitud / self.ancho)
+
+    def buscar(self, latitud, longitud, radio_km):
+        """Valores a `radio_km` o menos del punto (sin orden)."""
+        margen_lat = radio_km / KM_POR_GRADO
+        margen_lon = radio_km / (KM_POR_GRADO * max(math.cos(math.radians(latitud)), 0.01))
+        fila_min, columna_min = self._celda(latitud - margen_lat, longitud - margen_lon)
+        fila_max, columna_max = self._celda(latitud + margen_lat, longitud + margen_lon)
+        resultado = []
+        for fila in range(fila_min, fila_max + 1):
+            for columna in range(columna_min, columna_max + 1):
+                for lat, lon, valores in self.celdas.get((fila, columna), ()):
+                    if distancia_km(latitud, longitud, lat, lon) <= radio_km:
+                        resultado.extend(valores)
+        return resultado
+
+
+# --- Base de datos ---
+
+def columnas_ubicacion(ubicacion):
+    """Valores de (ubicacion_normalizada, latitud, longitud) para guardar en la tabla."""
+    lugar = geocodificar(ubicacion)
+    if lugar is None:
+        return None, None, None
+    return lugar.nombre, lugar.latitud, lugar.longitud
+
+
+# Filas de las ubicaciones de un lote que no han cambiado a su lugar nuevo: el UPDATE OR IGNORE
+# se las salta porque otra fila ya tiene esa clave (mismo título normalizado, fecha y lugar)
+SQL_CHOCAN = """
+WITH nuevas (ubicacion, ubicacion_normalizada) AS (VALUES {valores})
+SELECT carreras.id, carreras.ubicacion
+FROM carreras JOIN nuevas ON carreras.ubicacion = nuevas.ubicacion
+WHERE COALESCE(carreras.ubicacion_normalizada, '') != nuevas.ubicacion_normalizada
+"""
+
+
+def _juntar_repetidas(client, chocan, valores_de):
+    """
+    Resuelve las filas que el UPDATE OR IGNORE se ha saltado. Primero se reintentan (la fila con
+    la que chocaban puede haber cambiado de lugar después); las que siguen chocando se copian a
+    carreras_repetidas (como en la migración 10) y se quitan. Si estaban publicadas, la que se
+    queda también. Devuelve cuántas se han quitado.
+    """
+    client.batch([
+        (
+            "UPDATE OR IGNORE carreras SET ubicacion_normalizada = ?, latitud = ?, longitud = ? WHERE id = ?",
+            list(valores_de[ubicacion]) + [id_fila],
+        )
+        for id_fila, ubicacion in chocan
+    ])
+    marcas = ', '.join('?' * len(chocan))
+    filas = client.execute(
+        f"SELECT id, ubicacion, titulo_normalizado, fecha, ubicacion_normalizada, publicada FROM carreras WHERE id IN ({marcas})",
+        [id_fila for id_fila, _ in chocan],
+    ).rows
+    # La tabla de la migración 10 no tiene las columnas que se han añadido después
+    client.execute("CREATE TABLE IF NOT EXISTS carreras_repetidas AS SELECT * FROM carreras WHERE 0")
+    columnas = ', '.join(fila[1] for fila in client.execute("PRAGMA table_info(carreras_repetidas)").rows)
+    sentencias, quitadas = [], 0
+    for id_fila, ubicacion, titulo_normalizado, fecha, ubicacion_normalizada, publicada in filas:
+        nueva = valores_de[ubicacion][0]
+        if ubicacion_normalizada == nueva:
+            continue
+        if publicada == 1:
+            sentencias.append((
+                "UPDATE carreras SET publicada = 1 WHERE titulo_normalizado = ? AND fecha = ? AND ubicacion_normalizada = ?",
+                [titulo_normalizado, fecha, nueva],
+            ))
+        sentencias.append((f"INSERT INTO carreras_repetidas ({columnas}) SELECT {columnas} FROM carreras WHERE id = ?",
+                           [id_fila]))
+        sentencias.append(("DELETE FROM carreras WHERE id = ?", [id_fila]))
+        quitadas += 1
+    if sentencias:
+        client.batch(sentencias)
+    return quitadas
+
+
+def geocodificar_tabla(client, solo_pendientes=True):
+    """
+    Rellena ubicacion_normalizada, latitud y longitud de la tabla carreras (una sentencia por
+    ubicación distinta). Con `solo_pendientes=False` rehace todas (tras cambiar el nomenclátor).
+    Las ubicaciones que no se reconocen no se tocan. Si dos escrituras de un pueblo ("Lorca" y
+    "Lorca / MURCIA") dejan la misma carrera dos veces con la misma clave, se queda una sola fila.
+    Devuelve un Counter con las ubicaciones que no se han reconocido.
+    """
+    filtro = "WHERE latitud IS NULL AND ubicacion IS NOT NULL" if solo_pendientes else "WHERE ubicacion IS NOT NULL"
+    filas = client.execute(f"SELECT ubicacion, COUNT(*) FROM carreras {filtro} GROUP BY ubicacion").rows
+    reconocidas, sin_reconocer = [], Counter()
+    for ubicacion, veces in filas:
+        valores = columnas_ubicacion(ubicacion)
+        if valores[0] is None:
+            sin_reconocer[ubicacion] += veces
+        else:
+            reconocidas.append((ubicacion, valores))
+
+    chocan = []
+    for i in range(0, len(reconocidas), 200):
+        lote = reconocidas[i:i + 200]
+        client.batch([
+            (
+                "UPDATE OR IGNORE carreras SET ubicacion_normalizada = ?, latitud = ?, longitud = ? WHERE ubicacion = ?",
+                list(valores) + [ubicacion],
+            )
+            for ubicacion, valores in lote
+        ])
+        chocan.extend(tuple(fila) for fila in client.execute(
+            SQL_CHOCAN.format(valores=', '.join(['(?, ?)'] * len(lote))),
+            [valor for ubicacion, valores in lote for valor in (ubicacion, valores[0])],
+        ).rows)
+    if chocan:
+        repetidas = _juntar_repetidas(client, chocan, dict(reconocidas))
+        if repetidas:
+            print(f"   🧹 {repetidas} carreras repetidas al normalizar su lugar juntadas; "
+                  f"las filas quitadas están en carreras_repetidas.")
+
+    metricas.contar('geo_ubicaciones', len(reconocidas), resultado='reconocida')
+    metricas.contar('geo_ubicaciones', len(sin_reconocer), resultado='sin_reconocer')
+    return sin_reconocer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geocodifica las ubicaciones de la tabla carreras con el nomenclátor")
+    parser.add_argument('--todas', action='store_true',
+                        help="Rehace todas las filas, no solo las que aún no tienen coordenadas")
+    args = parser.parse_args()
+
+    import base_datos
+
+    client = base_datos.conectar()
+    if client is not None:
+        try:
+            inicio = time.perf_counter()
+            sin_reconocer = geocodificar_tabla(client, solo_pendientes=not args.todas)
+            print(f"🗺️ Ubicaciones geocodificadas en {time.perf_counter() - inicio:.2f}s "
+                  f"({geocodificar.cache_info().currsize} distintas).")
+            if sin_reconocer:
+                print(f"⚠️ {len(sin_reconocer)} ubicaciones no están en el nomenclátor ({RUTA_NOMENCLATOR}):")
+                for ubicacion, veces in sin_reconocer.most_common(30):
+                    print(f"   · {ubicacion} ({veces} carreras)")
+        finally:
+            client.close()
@@ -0,0 +1,323 @@
+import argparse
+import glob
+import hashlib
+import io
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+import base_datos
+import metricas
+from base_datos import IMAGEN_DEFECTO_URL_ALCANZA
+from ficheros import escribir_atomico
+from scrapers import cliente_http
+from scrapers.limitador import LimitadorPorHost
+
+# Pillow es opcional: sin él se leen igual las dimensiones (de la cabecera del fichero)
+# pero no se generan miniaturas
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+load_dotenv()
+
+# Comprobación de los carteles de las próximas carreras: si la URL sigue viva, su tamaño,
+# y una copia local guardada por su hash (la misma imagen en dos carreras se guarda una vez).
+# Si el servidor da el mismo ETag que la vez anterior, no se vuelve a descargar.
+ACTIVO = os.getenv('IMAGENES_COMPROBAR', '1') == '1'
+CARPETA = os.getenv('IMAGENES_CARPETA', 'data/imagenes')
+CONCURRENCIA = int(os.getenv('IMAGENES_CONCURRENCIA', '8'))
+PETICIONES_POR_SEGUNDO = float(os.getenv('IMAGENES_PETICIONES_POR_SEGUNDO', '4'))
+# Las miniaturas se publican (el workflow sube CARPETA/miniaturas a GitHub Pages) y la web las
+# sirve desde IMAGENES_URL; en `imagen_miniatura` se guarda su ruta dentro de CARPETA
+# Anchos de las miniaturas WebP (solo con Pillow)
+ANCHOS = [int(ancho) for ancho in os.getenv('IMAGENES_ANCHOS', '320,640').split(',') if ancho.strip()]
+TAMANO_MAXIMO = int(float(os.getenv('IMAGENES_MAX_MB', '10')) * 1024 * 1024)
+
+# Valores de la columna `imagen_estado`
+OK, ROTA, DEFECTO = 'ok', 'rota', 'defecto'
+# Respuestas del GET que no dicen nada de la imagen (el servidor está caído o nos frena)
+ERRORES_TEMPORALES = {408, 429, 500, 502, 503, 504}
+
+COLUMNAS = ['imagen_estado', 'imagen_hash', 'imagen_ancho', 'imagen_alto', 'imagen_etag', 'imagen_miniatura']
+
+# Consultas de la comprobación (migraciones.consultas_calientes() comprueba que van por índice).
+# {marcas} son los ? de las carreras que comparten imagen.
+SQL_LEER = (f"SELECT id, imagen, {', '.join(COLUMNAS)} FROM carreras "
+            "WHERE fecha >= date('now') AND imagen IS NOT NULL AND imagen != ''")
+SQL_GUARDAR = (f"UPDATE carreras SET {', '.join(f'{columna} = ?' for columna in COLUMNAS)}, "
+               f"modificada = {base_datos.AHORA} WHERE id IN ({{marcas}})")
+
+EXTENSIONES = {b'\x89PNG': 'png', b'\xff\xd8': 'jpg', b'GIF8': 'gif', b'RIFF': 'webp'}
+
+limitador = LimitadorPorHost(PETICIONES_POR_SEGUNDO)
+
+
+def extension(contenido):
+    for inicio, ext in EXTENSIONES.items():
+        if contenido.startswith(inicio) and (ext != 'webp' or contenido[8:12] == b'WEBP'):
+            return ext
+    return None
+
+
+def dimensiones(contenido):
+    """(ancho, alto) leídos de la cabecera PNG, GIF, JPEG o WebP. (None, None) si no se reconoce."""
+    ext = extension(contenido)
+    try:
+        if ext == 'png':
+            return struct.unpack('>II', contenido[16:24])
+        if ext == 'gif':
+            return struct.unpack('<HH', contenido[6:10])
+        if ext == 'webp':
+            return _dimensiones_webp(contenido)
+        if ext == 'jpg':
+            return _dimensiones_jpeg(contenido)
+    except struct.error:
+        pass
+    if Image is not None:
+        try:
+            return Image.open(io.BytesIO(contenido)).size
+        except Exception:
+            pass
+    return None, None
+
+
+def _dimensiones_webp(contenido):
+    tipo = contenido[12:16]
+    if tipo == b'VP8 ':
+        ancho, alto = struct.unpack('<HH', contenido[26:30])
+        return ancho & 0x3fff, alto & 0x3fff
+    if tipo == b'VP8L':
+        bits = struct.unpack('<I', contenido[21:25])[0]
+        return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    if tipo == b'VP8X':
+        ancho = int.from_bytes(contenido[24:27], 'little') + 1
+        alto = int.from_bytes(contenido[27:30], 'little') + 1
+        return ancho, alto
+    return None, None
+
+
+def _dimensiones_jpeg(contenido):
+    # Se recorren los segmentos hasta el SOFn, que lleva alto y ancho
+    i = 2
+    while i + 9 < len(contenido):
+        if contenido[i] != 0xff:
+            i += 1
+            continue
+        marcador = contenido[i + 1]
+        if marcador in (0xd8, 0x01) or 0xd0 <= marcador <= 0xd7:
+            i += 2
+            continue
+        longitud = struct.unpack('>H', contenido[i + 2:i + 4])[0]
+        if 0xc0 <= marcador <= 0xcf and marcador not in (0xc4, 0xc8, 0xcc):
+            alto, ancho = struct.unpack('>HH', contenido[i + 5:i + 9])
+            return ancho, alto
+        i += 2 + longitud
+    return None, None
+
+
+def firma(cabeceras):
+    """ETag o, si el servidor no lo da, Last-Modified + tamaño. None si no hay nada con que comparar."""
+    if cabeceras.get('ETag'):
+        return cabeceras['ETag']
+    if cabeceras.get('Last-Modified'):
+        return f"{cabeceras['Last-Modified']}|{cabeceras.get('Content-Length', '')}"
+    return None
+
+
+def ruta_original(hash_imagen, ext):
+    # Dos niveles para no tener miles de ficheros en una carpeta
+    return os.path.join(CARPETA, 'originales', hash_imagen[:2], f"{hash_imagen}.{ext}")
+
+
+def nombre_miniatura(hash_imagen, ancho):
+    """Ruta de la miniatura dentro de CARPETA: la que se guarda en la BD y se publica."""
+    return f"miniaturas/{hash_imagen}_{ancho}.webp"
+
+
+def ruta_miniatura(hash_imagen, ancho):
+    return os.path.join(CARPETA, nombre_miniatura(hash_imagen, ancho))
+
+
+def _guardada(hash_imagen):
+    return bool(hash_imagen) and bool(glob.glob(ruta_original(hash_imagen, '*')))
+
+
+def guardar_original(contenido, ext):
+    """Guarda la imagen por su sha256. Devuelve (hash, si ya estaba guardada)."""
+    hash_imagen = hashlib.sha256(contenido).hexdigest()
+    ruta = ruta_original(hash_imagen, ext)
+    if os.path.exists(ruta):
+        return hash_imagen, True
+    escribir_atomico(ruta, contenido)
+    return hash_imagen, False
+
+
+def podar(hashes):
+    """
+    Borra los originales y las miniaturas cuyo hash no está en `hashes` (las imágenes de las
+    próximas carreras): sin esto la carpeta, y la caché del workflow, crecerían sin límite.
+    Devuelve (ficheros borrados, bytes liberados).
+    """
+    borrados, liberados = 0, 0
+    rutas = glob.glob(os.path.join(CARPETA, 'originales', '*', '*')) + glob.glob(os.path.join(CARPETA, 'miniaturas', '*'))
+    for ruta in rutas:
+        nombre = os.path.basename(ruta)
+        # Originales "<hash>.<ext>" y miniaturas "<hash>_<ancho>.webp"
+        hash_imagen = nombre.split('.', 1)[0].split('_', 1)[0]
+        if hash_imagen in hashes or nombre.endswith('.tmp'):
+            continue
+        try:
+            liberados += os.path.getsize(ruta)
+            os.remove(ruta)
+            borrados += 1
+        except OSError as e:
+            print(f"   ⚠️ No se pudo borrar {ruta}: {e}")
+    return borrados, liberados
+
+
+def crear_miniaturas(hash_imagen, contenido=None):
+    """
+    Miniaturas WebP de los ANCHOS (sin ampliar) que aún no existen. Sin `contenido` se leen del
+    original guardado. Devuelve el nombre_miniatura de la más pequeña, o None si no las hay
+    (sin Pillow solo valen las que ya estaban hechas).
+    """
+    if not ANCHOS:
+        return None
+    faltan = [ancho for ancho in sorted(ANCHOS) if not os.path.exists(ruta_miniatura(hash_imagen, ancho))]
+    if faltan and Image is None:
+        return None
+    try:
+        if faltan:
+            if contenido is None:
+                with open(glob.glob(ruta_original(hash_imagen, '*'))[0], 'rb') as f:
+                    contenido = f.read()
+            original = Image.open(io.BytesIO(contenido))
+            original.load()
+        for ancho in faltan:
+            ruta = ruta_miniatura(hash_imagen, ancho)
+            copia = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+            if copia.width > ancho:
+                copia = copia.resize((ancho, round(copia.height * ancho / copia.width)))
+            salida = io.BytesIO()
+            copia.save(salida, 'WEBP', quality=80)
+            escribir_atomico(ruta, salida.getvalue())
+    except Exception as e:
+        print(f"   ⚠️ No se pudo crear la miniatura de {hash_imagen[:12]}: {e}")
+        return None
+    return nombre_miniatura(hash_imagen, min(ANCHOS))
+
+
+def revisar(url, anterior):
+    """
+    Comprueba una imagen. `anterior` es {columna: valor} con lo que había en la BD.
+    Devuelve (resultado, datos) con resultado 'sin_cambios', 'descargada', 'repetida',
+    'rota', 'defecto' o 'error' (un fallo temporal: se queda lo que había) y datos {columna: valor} a guardar.
+    """
+    if url == IMAGEN_DEFECTO_URL_ALCANZA:
+        return 'defecto', dict.fromkeys(COLUMNAS) | {'imagen_estado': DEFECTO}
+    rota = dict.fromkeys(COLUMNAS) | {'imagen_estado': ROTA}
+
+    try:
+        response = cliente_http.cabecera(url, limitador)
+        # Un error en el HEAD no basta para darla por rota: hay servidores que no aceptan HEAD
+        # (405, 501, 403...). Se confirma con el GET.
+        if response.status_code < 400:
+            etag = firma(response.headers)
+            if (etag and etag == anterior.get('imagen_etag') and anterior.get('imagen_estado') == OK
+                    and _guardada(anterior.get('imagen_hash'))):
+                # La miniatura se rehace si falta (o si se ha cambiado ANCHOS)
+                return 'sin_cambios', dict(anterior, imagen_miniatura=crear_miniaturas(anterior['imagen_hash']))
+
+        response = cliente_http.descargar(url, limitador)
+    except requests.exceptions.RequestException:
+        # Sin conexión o sin respuesta: se deja como estaba hasta la próxima ejecución
+        return 'error', dict(anterior)
+    if response.status_code in ERRORES_TEMPORALES:
+        return 'error', dict(anterior)
+    contenido = response.content
+    if response.status_code >= 400 or not contenido or len(contenido) > TAMANO_MAXIMO:
+        return 'rota', rota
+    ext = extension(contenido)
+    ancho, alto = dimensiones(contenido)
+    if ext is None and ancho is None:
+        # No es una imagen (p. ej. una página de error con 200)
+        return 'rota', rota
+
+    hash_imagen, repetida = guardar_original(contenido, ext or 'img')
+    return ('repetida' if repetida else 'descargada'), {
+        'imagen_estado': OK,
+        'imagen_hash': hash_imagen,
+        'imagen_ancho': ancho,
+        'imagen_alto': alto,
+        'imagen_etag': firma(response.headers),
+        'imagen_miniatura': crear_miniaturas(hash_imagen, contenido),
+    }
+
+
+def leer_imagenes(client):
+    """{url: ([ids], {columna: valor})} de las imágenes de las carreras futuras."""
+    resultado = client.execute(SQL_LEER)
+    imagenes = {}
+    for id_, url, *valores in resultado.rows:
+        ids, _ = imagenes.setdefault(url, ([], dict(zip(COLUMNAS, valores))))
+        ids.append(id_)
+    return imagenes
+
+
+def procesar_imagenes(client):
+    """Revisa las imágenes de las carreras futuras y guarda en la BD solo lo que ha cambiado."""
+    if cliente_http.modo_offline:
+        print("   📴 Modo offline: no se comprueban las imágenes.")
+        return None
+
+    inicio = time.perf_counter()
+    imagenes = leer_imagenes(client)
+    urls = list(imagenes)
+    with ThreadPoolExecutor(max_workers=max(1, CONCURRENCIA)) as pool:
+        revisadas = list(pool.map(lambda url: revisar(url, imagenes[url][1]), urls))
+
+    resumen = dict.fromkeys(['sin_cambios', 'descargada', 'repetida', 'rota', 'defecto', 'error'], 0)
+    sentencias = []
+    for url, (resultado, datos) in zip(urls, revisadas):
+        resumen[resultado] += 1
+        metricas.contar('imagenes', resultado=resultado)
+        ids, anterior = imagenes[url]
+        if datos == anterior:
+            continue
+        marcas = ', '.join('?' * len(ids))
+        sentencias.append((SQL_GUARDAR.format(marcas=marcas), [datos[columna] for columna in COLUMNAS] + ids))
+    for i in range(0, len(sentencias), base_datos.TAMANO_LOTE):
+        metricas.contar('bd_viajes', tipo='imagenes')
+        client.batch(sentencias[i:i + base_datos.TAMANO_LOTE])
+
+    resumen['guardadas'] = len(sentencias)
+    # Lo que queda en la BD para cada imagen (con un error temporal, lo que ya había)
+    borrados, liberados = podar({datos['imagen_hash'] for _, datos in revisadas if datos['imagen_hash']})
+    resumen['borradas'] = borrados
+    segundos = time.perf_counter() - inicio
+    metricas.observar('etapa_segundos', segundos, etapa='imagenes')
+    print(f"   🖼️ {len(urls)} imágenes en {segundos:.2f}s: {resumen['sin_cambios']} sin cambios, "
+          f"{resumen['descargada']} descargadas, {resumen['repetida']} ya guardadas (mismo hash), "
+          f"{resumen['rota']} rotas, {resumen['defecto']} por defecto, {resumen['error']} sin comprobar (error temporal); "
+          f"{len(sentencias)} cambios en la BD; {borrados} ficheros sin usar borrados ({liberados / 1e6:.1f} MB)"
+          f"{'' if Image is not None else ' (sin Pillow: no se crean miniaturas)'}")
+    return resumen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comprueba y guarda en local las imágenes de las próximas carreras")
+    parser.parse_args()
+
+    print("🖼️ Comprobando imágenes...")
+    client = base_datos.conectar()
+    if client is not None:
+        try:
+            procesar_imagenes(client)
+        finally:
+            client.close()
@@ -1,9 +1,15 @@
+import argparse
+import hashlib
 import requests
 import urllib.parse
 import os
-import libsql_client
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+import base_datos
+from modelo import Carrera
+from scrapers.limitador import CuboDeTokens
+
 # Cargamos las variables del .env local (importante para las pruebas)
 load_dotenv()
 
@@ -12,74 +18,178 @@ WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 TURSO_URL = os.getenv('TURSO_DATABASE_URL')
 TURSO_TOKEN = os.getenv('TURSO_AUTH_TOKEN')
 
-def publicar_pendientes():
+# Carreras que se publican por ejecución (1 = solo la más inminente, para no saturar las redes).
+# Tras una caída se puede subir para ponerse al día en una sola ejecución.
+LOTE = int(os.getenv('PUBLICAR_LOTE', '1'))
+# Envíos a Make a la vez y ritmo máximo (envíos por minuto)
+CONCURRENCIA = int(os.getenv('PUBLICAR_CONCURRENCIA', '2'))
+POR_MINUTO = float(os.getenv('PUBLICAR_POR_MINUTO', '12'))
+TIMEOUT_WEBHOOK = float(os.getenv('PUBLICAR_TIMEOUT', '30'))
+# Minutos que puede estar una carrera reservada antes de darla por perdida y volver a enviarla
+RESERVA_MAXIMA = float(os.getenv('PUBLICAR_RESERVA_MAXIMA', '60'))
+
+# Valores de la columna `publicada`. Antes de enviar, cada carrera se reserva (ENVIANDO)
+# con su clave de publicación y la hora (`reservada`). Si el proceso muere a mitad de lote,
+# la siguiente ejecución no las toca hasta que pasan RESERVA_MAXIMA minutos (la anterior
+# podría seguir enviando); después vuelven a pendientes y Make descarta las que ya
+# recibió por su clave.
+PENDIENTE, PUBLICADA, ENVIANDO = 0, 1, 2
+
+# Consultas de cada publicación (migraciones.consultas_calientes() comprueba que van por índice)
+SQL_ATASCADAS = "SELECT titulo, fecha, clave_publicacion, reservada FROM carreras WHERE publicada = ?"
+# Las reservadas antes de hace N minutos (el último argumento es '-N minutes')
+SQL_DESATASCAR = (f"UPDATE carreras SET publicada = ? WHERE publicada = ? "
+                  f"AND COALESCE(reservada, '') < strftime('%Y-%m-%d %H:%M:%f', 'now', ?)")
+# Las `lote` carreras NO publicadas (0) y FUTURAS (>= hoy) más inminentes
+SQL_SIGUIENTES = """
+    SELECT * FROM carreras
+    WHERE publicada = 0 AND fecha >= date('now')
+    ORDER BY fecha ASC
+    LIMIT ?
+"""
+# Por id: dos carreras con el mismo título el mismo día en pueblos distintos son dos filas
+SQL_RESERVAR = (f"UPDATE carreras SET publicada = ?, clave_publicacion = ?, reservada = {base_datos.AHORA} "
+                f"WHERE id = ? AND publicada = ?")
+SQL_MARCAR = "UPDATE carreras SET publicada = ? WHERE id = ?"
+
+
+def clave_publicacion(carrera):
+    """Clave de idempotencia: la misma carrera da siempre la misma clave (Make puede descartar repetidas)."""
+    return hashlib.sha1(f"{carrera.titulo}|{carrera.fecha}".encode('utf-8')).hexdigest()[:16]
+
+
+def preparar_payload(carrera, clave):
+    # Limpieza de URL para la imagen
+    url_sucia = carrera.imagen
+    url_limpia = urllib.parse.quote(url_sucia, safe=':/') if url_sucia else None
+
+    return {
+        "titulo": carrera.titulo,
+        "fecha": carrera.fecha,
+        "ubicacion": carrera.ubicacion,
+        "imagen": url_limpia,
+        "link": carrera.url_inscripcion,
+        "clave": clave
+    }
+
+
+def enviar(carrera, clave, ritmo):
+    """Envía una carrera al webhook de Make. Devuelve True si Make la ha aceptado."""
+    ritmo.esperar()
+    try:
+        response = requests.post(WEBHOOK_URL, json=preparar_payload(carrera, clave),
+                                 headers={'Idempotency-Key': clave}, timeout=TIMEOUT_WEBHOOK)
+    except requests.exceptions.RequestException as e:
+        print(f"   ❌ {carrera.titulo}: error enviando a Make ({e})")
+        return False
+
+    # Make puede devolver 200 (OK) o 201 (Creado), ambos son éxito
+    if response.status_code in [200, 201]:
+        print(f"   ✅ {carrera.titulo}: enviada a Make.")
+        return True
+    print(f"   ❌ {carrera.titulo}: error en Make: {response.status_code} - {response.text}")
+    return False
+
+
+def revisar_atascadas(client, reintentar):
+    """
+    Devuelve a pendientes las carreras reservadas (ENVIANDO) hace más de RESERVA_MAXIMA minutos,
+    que son de una ejecución que no terminó. Con `reintentar`, todas. Avisa de las demás.
+    """
+    atascadas = client.execute(SQL_ATASCADAS, [ENVIANDO]).rows
+    if not atascadas:
+        return
+    minutos = 0 if reintentar else RESERVA_MAXIMA
+    liberadas = client.execute(SQL_DESATASCAR, [PENDIENTE, ENVIANDO, f"-{minutos:g} minutes"]).rows_affected
+    if liberadas:
+        print(f"🔁 {liberadas} carreras a medio enviar vuelven a estar pendientes "
+              f"(Make descarta por su clave las que ya recibió).")
+    if liberadas < len(atascadas):
+        print(f"⏳ {len(atascadas) - liberadas} carreras reservadas hace menos de {minutos:g} minutos "
+              f"(otra ejecución puede estar enviándolas):")
+        for titulo, fecha, clave, reservada in atascadas:
+            print(f"   · {titulo} ({fecha}) clave {clave}, reservada {reservada}")
+
+
+def publicar_pendientes(lote=None, reintentar_atascadas=False):
     if not WEBHOOK_URL:
         print("❌ ERROR: No encuentro la URL del Webhook")
         return
 
-    if not TURSO_URL or not TURSO_TOKEN:
+    if base_datos.MODO_BD != 'local' and (not TURSO_URL or not TURSO_TOKEN):
         print("❌ ERROR: Variables TURSO_DATABASE_URL o TURSO_AUTH_TOKEN no configuradas")
         return
 
+    if lote is None:
+        lote = LOTE
+
     print("🔄 Iniciando proceso de publicación...")
 
+    client = None
     try:
-        # 1. Conexión a Turso (Modo Remoto)
-        client = libsql_client.create_client_sync(TURSO_URL, auth_token=TURSO_TOKEN)
-        
-        # 2. Buscamos carreras NO publicadas (0) y FUTURAS (>= hoy)
-        # LIMIT 1 nos asegura que solo cogemos la más inminente para no saturar las redes
-        query = """
-            SELECT * FROM carreras 
-            WHERE publicada = 0 AND fecha >= date('now') 
-            ORDER BY fecha ASC 
-            LIMIT 1
-        """
-        resultado = client.execute(query)
+        # 1. Conexión a Turso (remoto, réplica local o solo local según MODO_BD)
+        client = base_datos.conectar()
+        if client is None:
+            return
+        revisar_atascadas(client, reintentar_atascadas)
+
+        # 2. Las `lote` carreras NO publicadas (0) y FUTURAS (>= hoy) más inminentes, en una sola consulta
+        resultado = client.execute(SQL_SIGUIENTES, [lote])
 
         if len(resultado.rows) == 0:
             print("💤 No hay carreras nuevas pendientes de publicar.")
             client.close()
             return
 
-        # Transformamos la fila de Turso en un diccionario igual que hacía Supabase
-        fila = resultado.rows[0]
-        carrera = dict(zip(resultado.columns, fila))
-
-        print(f"✨ Encontrada para publicar: {carrera['titulo']}")
-
-        # 3. Limpieza de URL para la imagen
-        url_sucia = carrera.get('imagen')
-        url_limpia = urllib.parse.quote(url_sucia, safe=':/') if url_sucia else None
-
-        # 4. Preparamos los datos para enviar a Make
-        datos_payload = {
-            "titulo": carrera['titulo'],
-            "fecha": carrera['fecha'],
-            "ubicacion": carrera['ubicacion'],
-            "imagen": url_limpia,
-            "link": carrera['url_inscripcion']
-        }
-
-        # 5. Enviamos la señal a Make (Webhook)
-        response = requests.post(WEBHOOK_URL, json=datos_payload)
-
-        # Make puede devolver 200 (OK) o 201 (Creado), ambos son éxito
-        if response.status_code in [200, 201]:
-            print("✅ Enviado a Make correctamente.")
-
-            # 6. MARCAR COMO PUBLICADA EN LA DB
-            # Usamos una consulta SQL UPDATE normal
-            client.execute("UPDATE carreras SET publicada = 1 WHERE titulo = ?", [carrera['titulo']])
-            print("💾 Base de datos actualizada (publicada = 1).")
-        else:
-            print(f"❌ Error en Make: {response.status_code} - {response.text}")
+        # Transformamos las filas de Turso en Carreras
+        carreras = [Carrera.desde_fila(resultado.columns, fila) for fila in resultado.rows]
+        ids = [fila[list(resultado.columns).index('id')] for fila in resultado.rows]
+        claves = [clave_publicacion(c) for c in carreras]
+
+        # 3. Reservamos todas en una transacción. Solo nos quedamos con las que seguían
+        # pendientes (si otra ejecución se ha adelantado, su UPDATE no afecta a ninguna fila)
+        reservas = client.batch([
+            (SQL_RESERVAR, [ENVIANDO, clave, id_carrera, PENDIENTE])
+            for id_carrera, clave in zip(ids, claves)
+        ])
+        reservadas = [(c, clave, id_carrera) for c, clave, id_carrera, r in zip(carreras, claves, ids, reservas)
+                      if r.rows_affected]
+        if not reservadas:
+            print("💤 Otra ejecución ya está publicando estas carreras.")
+            client.close()
+            return
+        print(f"✨ {len(reservadas)} carreras para publicar: {', '.join(c.titulo for c, _, _ in reservadas)}")
+
+        # 4. Enviamos a Make (Webhook) con varios envíos a la vez, sin pasar del ritmo máximo
+        ritmo = CuboDeTokens(POR_MINUTO / 60, capacidad=1)
+        with ThreadPoolExecutor(max_workers=max(1, CONCURRENCIA)) as pool:
+            enviadas = list(pool.map(lambda reserva: enviar(reserva[0], reserva[1], ritmo), reservadas))
+
+        # 5. MARCAR EN LA DB: publicadas las que han ido bien y pendientes otra vez las que han fallado,
+        # todo en una sola transacción
+        client.batch([
+            (SQL_MARCAR, [PUBLICADA if ok else PENDIENTE, id_carrera])
+            for (_, _, id_carrera), ok in zip(reservadas, enviadas)
+        ])
+        print(f"💾 Base de datos actualizada: {sum(enviadas)} publicadas, "
+              f"{len(enviadas) - sum(enviadas)} vuelven a pendientes.")
 
         # Cerramos la conexión elegantemente
         client.close()
 
     except Exception as e:
         print(f"❌ Error de conexión o ejecución: {e}")
+        # Sin cerrar el cliente, su hilo interno impediría que el script terminase
+        if client is not None and not getattr(client, 'closed', False):
+            client.close()
 
 if __name__ == "__main__":
-    publicar_pendientes()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Publica en RRSS las próximas carreras pendientes")
+    parser.add_argument('--lote', type=int, default=None,
+                        help=f"Cuántas carreras publicar en esta ejecución (por defecto PUBLICAR_LOTE={LOTE})")
+    parser.add_argument('--reintentar-atascadas', action='store_true',
+                        help="Vuelve a dejar pendientes ya todas las carreras que se quedaron a medio enviar, "
+                             f"sin esperar los {RESERVA_MAXIMA:g} minutos de PUBLICAR_RESERVA_MAXIMA")
+    args = parser.parse_args()
+
+    publicar_pendientes(lote=args.lote, reintentar_atascadas=args.reintentar_atascadas)
@@ -1,28 +1,152 @@
 # Importamos las funciones de tus otros scripts
 # (asegúrate de que los archivos .py estén en la misma carpeta)
-from scrapers import scraper_alcanza, scraper_babel, scraper_lineadesalida
+import argparse
+import functools
+import os
+import queue
+import threading
+import time
+
+from scrapers import cliente_http, registro
+import base_datos
 import fusionar_carreras  # El script de arriba
+import metricas
+
+# Tiempo máximo (en segundos) que esperamos a cada fuente, desde que empieza, antes de seguir sin ella
+TIMEOUT_FUENTE = float(os.getenv('TIMEOUT_FUENTE', '900'))
+# Cuántas webs se descargan a la vez (el resto espera turno; su plazo empieza al arrancar)
+FUENTES_EN_PARALELO = int(os.getenv('FUENTES_EN_PARALELO', '8'))
+
+
+def crear_fuentes(completo=False):
+    """
+    Lista de (nombre, generador de carreras, ruta de su instantánea) de cada web a
+    descargar. Las webs se registran solas en scrapers/registro.py al importar su módulo.
+    """
+    return [
+        (fuente.nombre, functools.partial(fuente.iterar, completo), fuente.ruta_csv)
+        for fuente in registro.fuentes()
+    ]
+
+
+def ejecutar_fuentes(fuentes, timeout=TIMEOUT_FUENTE, en_paralelo=FUENTES_EN_PARALELO):
+    """
+    Lanza los scrapers en hilos, como mucho `en_paralelo` a la vez.
+    Cada carrera llega por una cola en cuanto se ha leído (ya como Carrera,
+    limpia y con su título normalizado) mientras las demás webs siguen descargando.
+    Si una web falla o se cuelga, las demás siguen adelante: cada una tiene `timeout`
+    segundos desde que empieza. Si se le acaba, se le pide que pare, lo que haya
+    entregado se descarta y su hueco pasa a la siguiente.
+    Devuelve ({nombre: [carreras]}, {nombre: 'ok' | 'error' | 'timeout'}).
+    """
+    cola = queue.Queue()
+    en_espera = list(fuentes)
+    # {nombre: (plazo, evento para pedirle que pare)} de las que se están descargando
+    en_marcha = {}
+
+    def lanzar(nombre, iterar, parar):
+        generador = iterar()
+        try:
+            for carrera in generador:
+                if parar.is_set():
+                    return
+                cola.put((nombre, carrera, None))
+            cola.put((nombre, None, 'ok'))
+        except Exception as e:
+            print(f"   ❌ {nombre} ha fallado: {e}")
+            cola.put((nombre, None, 'error'))
+        finally:
+            # Si se ha pedido que pare, el scraper deja de paginar y no toca su índice
+            generador.close()
 
+    def arrancar():
+        while en_espera and len(en_marcha) < max(1, en_paralelo):
+            nombre, iterar, _ = en_espera.pop(0)
+            print(f"   ▶️ Descargando {nombre}...")
+            parar = threading.Event()
+            en_marcha[nombre] = (time.monotonic() + timeout, parar)
+            # Hilos "daemon": si una fuente se queda colgada no impide que el proceso termine
+            threading.Thread(target=lanzar, args=(nombre, iterar, parar), name=nombre, daemon=True).start()
 
-def ejecutar_todo():
+    carreras = {nombre: [] for nombre, _, _ in fuentes}
+    estados = {}
+
+    arrancar()
+    while en_marcha:
+        plazo = min(plazo for plazo, _ in en_marcha.values())
+        try:
+            nombre, carrera, estado = cola.get(timeout=max(0, plazo - time.monotonic()))
+        except queue.Empty:
+            pass
+        else:
+            # Lo que llega de una fuente que ya se ha dado por perdida se ignora
+            if nombre in en_marcha:
+                if estado:
+                    estados[nombre] = estado
+                    del en_marcha[nombre]
+                else:
+                    carreras[nombre].append(carrera)
+                    metricas.contar('carreras_leidas', fuente=nombre)
+
+        ahora = time.monotonic()
+        for nombre, (plazo, parar) in list(en_marcha.items()):
+            if plazo <= ahora:
+                print(f"   ⏰ {nombre} no ha terminado en {timeout:.0f}s. Seguimos sin ella.")
+                parar.set()
+                del en_marcha[nombre]
+                estados[nombre] = 'timeout'
+                carreras[nombre] = []
+        arrancar()
+
+    return carreras, estados
+
+
+def ejecutar_todo(completo=False):
     print("🚀 INICIANDO ACTUALIZACIÓN DEL CALENDARIO DE MURCIA 🚀")
 
-    # Paso 1: Ejecutar Crawlers
-    print("\n--- 1. Descargando FAMU ---")
-    scraper_alcanza.ejecucion()  # O como se llame tu función principal
+    # Paso 1: Ejecutar Crawlers (en paralelo, cada uno contra su web)
+    print("\n--- 1. Descargando fuentes ---")
+    inicio = time.monotonic()
+    fuentes = crear_fuentes(completo)
+    with metricas.cronometro('etapa_segundos', etapa='descarga'):
+        carreras, estados = ejecutar_fuentes(fuentes)
+    print(f"\n⏱️ Descarga terminada en {time.monotonic() - inicio:.1f}s")
 
-    print("\n--- 2. Descargando Linea de Salida ---")
-    scraper_lineadesalida.ejecucion()
+    # Las carreras se juntan en el orden de las fuentes (es su prioridad al deduplicar)
+    todas = []
+    for nombre, _, ruta in fuentes:
+        estado = estados.get(nombre)
+        icono = "✅" if estado == 'ok' else "⚠️"
+        print(f"   {icono} {nombre}: {estado} ({len(carreras[nombre])} carreras)")
+        if estado == 'ok' and carreras[nombre]:
+            fusionar_carreras.guardar_instantanea(carreras[nombre], ruta)
+            todas += carreras[nombre]
+        else:
+            # Si una fuente ha fallado (o no ha devuelto nada) se usa su última instantánea
+            todas += fusionar_carreras.cargar_instantanea(ruta)
+    cliente_http.imprimir_resumen()
 
-    print("\n--- 3. Descargando Babelsport ---")
-    scraper_babel.ejecucion()
+    # Paso 2: Fusionar directamente lo descargado, sin volver a leer los CSV
+    print("\n--- 2. Fusionando y Limpiando ---")
+    with metricas.cronometro('etapa_segundos', etapa='fusion'):
+        fusionar_carreras.fusionar_datos(todas)
 
-    # Paso 2: Fusionar
-    print("\n--- 4. Fusionando y Limpiando ---")
-    fusionar_carreras.fusionar_datos()
+    # Informe para saber en qué se ha ido el tiempo (red, parseo, deduplicación o Turso)
+    metricas.guardar({'fuentes': estados, 'completo': completo})
 
     print("\n✅ ¡TODO LISTO! Base de datos actualizada.")
 
 
 if __name__ == "__main__":
-    ejecutar_todo()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Actualiza el calendario de carreras")
+    parser.add_argument('--offline', action='store_true',
+                        help="No usa la red: páginas de la caché local y base de datos SQLite local (MODO_BD=local)")
+    parser.add_argument('--completo', action='store_true',
+                        help="Recorrido completo: ignora el índice incremental y vuelve a descargar todas las fichas")
+    args = parser.parse_args()
+
+    if args.offline:
+        cliente_http.activar_modo_offline()
+        base_datos.activar_modo_local()
+
+    ejecutar_todo(completo=args.completo)
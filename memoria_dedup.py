@@ -0,0 +1,175 @@
+import datetime
+import os
+import sqlite3
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import metricas
+
+# Memoria de la deduplicación entre ejecuciones. De un día a otro las carreras apenas cambian,
+# así que solo se comparan los pares en los que hay algún título nuevo o cambiado.
+# Guardar la similitud de todos los pares candidatos costaría más que recalcularla (rapidfuzz
+# compara millones de pares por segundo), así que se guarda:
+#   titulos: cada (título normalizado, fecha) y la última ejecución en la que estaba;
+#   pares:   solo los pares (título A, fecha A, título B, fecha B) que superaron el umbral.
+# Si los dos títulos de un par estaban en la misma ejecución anterior, ese par ya se comparó
+# (o ya se conocía): su similitud es la guardada o, si no hay, no llegaba al umbral.
+# RUTA vacía la desactiva.
+RUTA = os.getenv('DEDUP_MEMORIA', 'data/memoria_dedup.sqlite')
+# Títulos como máximo; al pasarse se olvidan los vistos hace más ejecuciones (y sus pares)
+MAXIMO = int(os.getenv('DEDUP_MEMORIA_MAXIMO', '200000'))
+ACTIVA = bool(RUTA)
+
+
+class MemoriaDedup:
+    """
+    Al abrir se borran las carreras ya pasadas (no se vuelven a pedir) y se carga el resto en memoria.
+    `firma` resume la configuración que decide qué pares se comparan y cuáles se guardan
+    (umbral, ventana de días...); si cambia, la memoria se vacía.
+    """
+
+    def __init__(self, ruta=None, maximo=None, hoy=None):
+        self.ruta = ruta or RUTA
+        self.maximo = maximo or MAXIMO
+        self.hoy = (hoy or datetime.date.today()).toordinal()
+        self.aciertos = 0
+        self.fallos = 0
+        self.vistos = set()
+        self.nuevos_pares = {}
+
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.conexion = sqlite3.connect(self.ruta)
+        with self.conexion:
+            self.conexion.execute("CREATE TABLE IF NOT EXISTS ajustes (clave TEXT PRIMARY KEY, valor TEXT)")
+            self.conexion.execute("""
+                CREATE TABLE IF NOT EXISTS titulos (
+                    titulo TEXT, fecha INTEGER, ejecucion INTEGER, PRIMARY KEY (titulo, fecha)
+                )
+            """)
+            self.conexion.execute("CREATE INDEX IF NOT EXISTS ix_titulos_ejecucion ON titulos (ejecucion)")
+            self.conexion.execute("""
+                CREATE TABLE IF NOT EXISTS pares (
+                    titulo_a TEXT, fecha_a INTEGER, titulo_b TEXT, fecha_b INTEGER, puntuacion REAL,
+                    PRIMARY KEY (titulo_a, fecha_a, titulo_b, fecha_b)
+                )
+            """)
+            self.caducados = self.conexion.execute("DELETE FROM titulos WHERE fecha < ?", [self.hoy]).rowcount
+            self.conexion.execute("DELETE FROM pares WHERE fecha_a < ? OR fecha_b < ?", [self.hoy, self.hoy])
+
+        ajustes = dict(self.conexion.execute("SELECT clave, valor FROM ajustes"))
+        self.firma = ajustes.get('firma')
+        self.ejecucion = int(ajustes.get('ejecucion', 0)) + 1
+        self.titulos = {(titulo, fecha): ejecucion
+                        for titulo, fecha, ejecucion in self.conexion.execute("SELECT * FROM titulos")}
+        self.pares = {(a, fa, b, fb): puntuacion
+                      for a, fa, b, fb, puntuacion in self.conexion.execute("SELECT * FROM pares")}
+
+    def _vaciar(self, firma):
+        self.firma = firma
+        self.titulos = {}
+        self.pares = {}
+        with self.conexion:
+            self.conexion.execute("DELETE FROM titulos")
+            self.conexion.execute("DELETE FROM pares")
+
+    def _guardados(self, titulos, dias, izquierda, derecha):
+        """Puntuación guardada de cada par candidato (NaN si no hay ninguna)."""
+        resultado = np.full(len(izquierda), np.nan)
+        if not self.pares:
+            return resultado
+        posiciones = defaultdict(list)
+        for i, clave in enumerate(zip(titulos, dias)):
+            posiciones[clave].append(i)
+        n = len(titulos)
+        codigos, valores = [], []
+        for (a, fa, b, fb), puntuacion in self.pares.items():
+            for i in posiciones.get((a, fa), ()):
+                for j in posiciones.get((b, fb), ()):
+                    if i != j:
+                        codigos.append(min(i, j) * n + max(i, j))
+                        valores.append(puntuacion)
+        if not codigos:
+            return resultado
+        orden = np.argsort(codigos)
+        codigos = np.array(codigos, dtype=np.int64)[orden]
+        valores = np.array(valores)[orden]
+        candidatos = np.minimum(izquierda, derecha) * n + np.maximum(izquierda, derecha)
+        donde = np.minimum(np.searchsorted(codigos, candidatos), len(codigos) - 1)
+        encontrados = codigos[donde] == candidatos
+        resultado[encontrados] = valores[donde[encontrados]]
+        return resultado
+
+    def similitudes(self, titulos, dias, izquierda, derecha, calcular, umbral, firma):
+        """
+        Similitud de los títulos de cada par candidato (izquierda[k], derecha[k]), con `titulos`
+        normalizados y `dias` en ordinales por carrera. Solo se llama a `calcular(titulos_a, titulos_b)`
+        con los pares que no se conocen. Los conocidos que no llegaban al umbral dan 0.
+        """
+        if firma != self.firma:
+            self._vaciar(firma)
+        dias = [int(dia) for dia in dias]
+        ultima = np.array([self.titulos.get(clave, -1) for clave in zip(titulos, dias)], dtype=np.int64)
+        conocidos = (ultima[izquierda] >= 0) & (ultima[izquierda] == ultima[derecha])
+
+        guardados = self._guardados(titulos, dias, izquierda, derecha)
+        resultado = np.where(np.isnan(guardados), 0.0, guardados)
+
+        faltan = np.flatnonzero(~conocidos)
+        if len(faltan):
+            calculadas = np.asarray(calcular([titulos[i] for i in izquierda[faltan]],
+                                             [titulos[j] for j in derecha[faltan]]), dtype=np.float64)
+            resultado[faltan] = calculadas
+            for k in np.flatnonzero(calculadas > umbral):
+                i, j = int(izquierda[faltan[k]]), int(derecha[faltan[k]])
+                if dias[i] >= self.hoy and dias[j] >= self.hoy:
+                    a, b = sorted([(titulos[i], dias[i]), (titulos[j], dias[j])])
+                    self.nuevos_pares[a + b] = float(calculadas[k])
+
+        # Desde esta ejecución, los pares entre estos títulos ya están comparados
+        self.vistos.update(clave for clave in zip(titulos, dias) if clave[1] >= self.hoy)
+
+        self.aciertos += len(izquierda) - len(faltan)
+        self.fallos += len(faltan)
+        metricas.contar('dedup_memoria', len(izquierda) - len(faltan), resultado='acierto')
+        metricas.contar('dedup_memoria', len(faltan), resultado='fallo')
+        return resultado
+
+    def tasa_aciertos(self):
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
+
+    def guardar(self):
+        """Apunta los títulos de esta ejecución y los pares parecidos nuevos, y recorta hasta MAXIMO. Devuelve cuántos títulos quedan."""
+        inicio = time.perf_counter()
+        with self.conexion:
+            self.conexion.executemany("INSERT OR REPLACE INTO ajustes VALUES (?, ?)",
+                                      [('firma', self.firma), ('ejecucion', str(self.ejecucion))])
+            self.conexion.executemany("INSERT OR REPLACE INTO titulos VALUES (?, ?, ?)",
+                                      [(titulo, fecha, self.ejecucion) for titulo, fecha in self.vistos])
+            self.conexion.executemany("INSERT OR REPLACE INTO pares VALUES (?, ?, ?, ?, ?)",
+                                      [clave + (puntuacion,) for clave, puntuacion in self.nuevos_pares.items()])
+            total = self.conexion.execute("SELECT COUNT(*) FROM titulos").fetchone()[0]
+            if total > self.maximo:
+                self.conexion.execute("""
+                    DELETE FROM titulos WHERE rowid IN (
+                        SELECT rowid FROM titulos ORDER BY ejecucion ASC, fecha ASC LIMIT ?
+                    )
+                """, [total - self.maximo])
+                # Un par sin alguno de sus títulos ya no se puede dar por conocido
+                self.conexion.execute("""
+                    DELETE FROM pares
+                    WHERE NOT EXISTS (SELECT 1 FROM titulos WHERE titulo = titulo_a AND fecha = fecha_a)
+                       OR NOT EXISTS (SELECT 1 FROM titulos WHERE titulo = titulo_b AND fecha = fecha_b)
+                """)
+                total = self.maximo
+        self.vistos = set()
+        self.nuevos_pares = {}
+        metricas.observar('etapa_segundos', time.perf_counter() - inicio, etapa='memoria_dedup')
+        return total
+
+    def close(self):
+        self.conexion.close()
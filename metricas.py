@@ -0,0 +1,172 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Informe JSON de cada ejecución (vacío = no se guarda)
+RUTA_INFORME = os.getenv('METRICAS_INFORME', 'data/informe_ejecucion.json')
+# Mismas métricas en formato de texto de Prometheus (vacío = no se guarda)
+RUTA_PROMETHEUS = os.getenv('METRICAS_PROMETHEUS', '')
+# Prefijo de los nombres en Prometheus
+PREFIJO = 'calendario_'
+PERCENTILES = (50, 90, 99)
+
+_lock = threading.Lock()
+# (nombre, etiquetas ordenadas) -> valor acumulado
+_contadores = defaultdict(float)
+# (nombre, etiquetas ordenadas) -> lista de observaciones (latencias, tamaños...)
+_histogramas = defaultdict(list)
+_inicio = time.time()
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def contar(nombre, valor=1, **etiquetas):
+    """Suma `valor` al contador (p. ej. contar('http_peticiones', host='x', resultado=200))."""
+    with _lock:
+        _contadores[_clave(nombre, etiquetas)] += valor
+
+
+def observar(nombre, valor, **etiquetas):
+    """Añade una observación al histograma `nombre`."""
+    with _lock:
+        _histogramas[_clave(nombre, etiquetas)].append(valor)
+
+
+@contextmanager
+def cronometro(nombre, **etiquetas):
+    """Mide lo que tarda el bloque y lo guarda (en segundos) en el histograma `nombre`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+
+def cronometrado(nombre, **etiquetas):
+    """Decorador: como cronometro() pero para toda la función."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with cronometro(nombre, **etiquetas):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def reiniciar():
+    global _inicio
+    with _lock:
+        _contadores.clear()
+        _histogramas.clear()
+        _inicio = time.time()
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolación lineal; `valores` ya ordenados."""
+    if not valores:
+        return 0.0
+    posicion = (len(valores) - 1) * p / 100
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(valores) - 1)
+    return valores[abajo] + (valores[arriba] - valores[abajo]) * (posicion - abajo)
+
+
+def _resumen(valores):
+    ordenados = sorted(valores)
+    resumen = {
+        'cuenta': len(ordenados),
+        'suma': sum(ordenados),
+        'min': ordenados[0] if ordenados else 0.0,
+        'max': ordenados[-1] if ordenados else 0.0,
+    }
+    for p in PERCENTILES:
+        resumen[f'p{p}'] = percentil(ordenados, p)
+    return resumen
+
+
+def informe(extra=None):
+    """Todas las métricas como diccionario listo para JSON."""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {clave: list(valores) for clave, valores in _histogramas.items()}
+        inicio = _inicio
+
+    datos = {
+        'inicio': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(inicio)),
+        'duracion_segundos': time.time() - inicio,
+        'contadores': [
+            {'nombre': nombre, 'etiquetas': dict(etiquetas), 'valor': valor}
+            for (nombre, etiquetas), valor in sorted(contadores.items())
+        ],
+        'histogramas': [
+            dict({'nombre': nombre, 'etiquetas': dict(etiquetas)}, **_resumen(valores))
+            for (nombre, etiquetas), valores in sorted(histogramas.items())
+        ],
+    }
+    if extra:
+        datos.update(extra)
+    return datos
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas_prometheus(etiquetas, **mas):
+    pares = list(etiquetas) + [(k, str(v)) for k, v in mas.items()]
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def texto_prometheus():
+    """Contadores como `counter` y histogramas como `summary` (percentiles, suma y cuenta)."""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {clave: list(valores) for clave, valores in _histogramas.items()}
+
+    lineas = []
+    tipos_escritos = set()
+    for (nombre, etiquetas), valor in sorted(contadores.items()):
+        metrica = f'{PREFIJO}{nombre}_total'
+        if metrica not in tipos_escritos:
+            lineas.append(f'# TYPE {metrica} counter')
+            tipos_escritos.add(metrica)
+        lineas.append(f'{metrica}{_etiquetas_prometheus(etiquetas)} {valor:g}')
+
+    for (nombre, etiquetas), valores in sorted(histogramas.items()):
+        metrica = f'{PREFIJO}{nombre}'
+        if metrica not in tipos_escritos:
+            lineas.append(f'# TYPE {metrica} summary')
+            tipos_escritos.add(metrica)
+        resumen = _resumen(valores)
+        for p in PERCENTILES:
+            lineas.append(f'{metrica}{_etiquetas_prometheus(etiquetas, quantile=p / 100)} {resumen[f"p{p}"]:g}')
+        lineas.append(f'{metrica}_sum{_etiquetas_prometheus(etiquetas)} {resumen["suma"]:g}')
+        lineas.append(f'{metrica}_count{_etiquetas_prometheus(etiquetas)} {resumen["cuenta"]}')
+
+    return '\n'.join(lineas) + '\n'
+
+
+def _escribir(ruta, texto):
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(texto)
+
+
+def guardar(extra=None):
+    """Guarda el informe JSON y, si está configurado, el fichero de Prometheus."""
+    if RUTA_INFORME:
+        _escribir(RUTA_INFORME, json.dumps(informe(extra), ensure_ascii=False, indent=2))
+        print(f"📈 Informe de la ejecución guardado en '{RUTA_INFORME}'")
+    if RUTA_PROMETHEUS:
+        _escribir(RUTA_PROMETHEUS, texto_prometheus())
+        print(f"📈 Métricas de Prometheus guardadas en '{RUTA_PROMETHEUS}'")
@@ -0,0 +1,352 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+import deduplicacion
+import geografia
+import metricas
+
+# Esquema de la tabla carreras, versionado. Cada migración se aplica una sola vez
+# (queda apuntada en la tabla `migraciones`) y en orden; para cambiar el esquema se
+# añade una al final de MIGRACIONES, nunca se edita una que ya se ha aplicado.
+# base_datos.conectar() las aplica al conectar, con un solo viaje si no hay ninguna pendiente.
+
+# La tabla completa tal como queda con todas las migraciones
+TABLA_CARRERAS = """
+    CREATE TABLE IF NOT EXISTS carreras (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TEXT, titulo TEXT, ubicacion TEXT, url_inscripcion TEXT, url_ficha TEXT,
+        imagen TEXT, origen TEXT, publicada INTEGER DEFAULT 0, hash_contenido TEXT,
+        clave_publicacion TEXT, titulo_normalizado TEXT,
+        imagen_estado TEXT, imagen_hash TEXT, imagen_ancho INTEGER, imagen_alto INTEGER,
+        imagen_etag TEXT, imagen_miniatura TEXT, modificada TEXT,
+        ubicacion_normalizada TEXT, latitud REAL, longitud REAL
+    )
+"""
+
+COLUMNAS_CARRERAS = re.findall(r'(\w+) (?:INTEGER|TEXT|REAL)', TABLA_CARRERAS)
+
+# Índice de texto completo de títulos y ubicaciones (ver busqueda.py). Es de contenido externo:
+# no guarda otra copia del texto, lo lee de carreras, y los disparadores lo mantienen al día
+# con cualquier escritura (la fusión, imagenes.py, geografia.py...).
+COLUMNAS_FTS = 'titulo, ubicacion, ubicacion_normalizada'
+TABLA_FTS = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS carreras_fts USING fts5(
+        {COLUMNAS_FTS}, content='carreras', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+DISPARADORES_FTS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS carreras_fts_insertar AFTER INSERT ON carreras BEGIN
+        INSERT INTO carreras_fts (rowid, {COLUMNAS_FTS})
+        VALUES (new.id, new.titulo, new.ubicacion, new.ubicacion_normalizada);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS carreras_fts_borrar AFTER DELETE ON carreras BEGIN
+        INSERT INTO carreras_fts (carreras_fts, rowid, {COLUMNAS_FTS})
+        VALUES ('delete', old.id, old.titulo, old.ubicacion, old.ubicacion_normalizada);
+    END
+    """,
+    # Solo si cambia alguna columna indexada: publicar o comprobar la imagen no toca el índice
+    f"""
+    CREATE TRIGGER IF NOT EXISTS carreras_fts_actualizar AFTER UPDATE OF {COLUMNAS_FTS} ON carreras BEGIN
+        INSERT INTO carreras_fts (carreras_fts, rowid, {COLUMNAS_FTS})
+        VALUES ('delete', old.id, old.titulo, old.ubicacion, old.ubicacion_normalizada);
+        INSERT INTO carreras_fts (rowid, {COLUMNAS_FTS})
+        VALUES (new.id, new.titulo, new.ubicacion, new.ubicacion_normalizada);
+    END
+    """,
+]
+
+
+def consultas_calientes():
+    """
+    Consultas de cada día (sincronización, Instagram, imágenes, API, búsqueda y la web) que deben
+    ir por índice: {nombre: (sql, args)}. El SQL es el mismo que ejecuta cada módulo (sus constantes
+    SQL_*). `python migraciones.py --comprobar` y tests/test_migraciones.py revisan su EXPLAIN QUERY PLAN.
+    """
+    # Aquí y no arriba: todos estos módulos importan base_datos, que importa este
+    import api
+    import base_datos
+    import busqueda
+    import feeds
+    import imagenes
+    import instagram
+
+    fila = ['2026-01-01', 'San Silvestre', 'Lorca', None, None, None, 'A', 'h', 'san silvestre', 'Lorca', 37.6, -1.7]
+    marcas = ', '.join('?' * 3)
+    return {
+        'fusion: leer existentes': (base_datos.SQL_LEER_EXISTENTES.format(marcas=marcas), ['a', 'b', 'c'] * 2),
+        # El plan de un INSERT sale vacío, pero EXPLAIN falla si su ON CONFLICT no es un índice único
+        'fusion: insertar': (base_datos.SQL_INSERTAR, fila),
+        'fusion: actualizar': (base_datos.SQL_ACTUALIZAR, [fila[1], fila[0]] + fila[2:] + [1]),
+        'instagram: atascadas': (instagram.SQL_ATASCADAS, [instagram.ENVIANDO]),
+        'instagram: desatascar': (instagram.SQL_DESATASCAR, [instagram.PENDIENTE, instagram.ENVIANDO, '-60 minutes']),
+        'instagram: siguientes': (instagram.SQL_SIGUIENTES, [1]),
+        'instagram: reservar': (instagram.SQL_RESERVAR, [instagram.ENVIANDO, 'clave', 1, instagram.PENDIENTE]),
+        'instagram: marcar': (instagram.SQL_MARCAR, [instagram.PUBLICADA, 1]),
+        # La web (front/src/pages/index.astro) hace la misma consulta que los feeds
+        'web y feeds: próximas': (feeds.SQL_PROXIMAS, ['2026-01-01']),
+        'imagenes: próximas': (imagenes.SQL_LEER, []),
+        'imagenes: guardar': (imagenes.SQL_GUARDAR.format(marcas=', '.join('?' * 2)),
+                              ['ok', 'h', 1, 1, 'etag', None, 1, 2]),
+        'api: cambios': (api.SQL_ULTIMA_MARCA, []),
+        'api: leer cambiadas': (api.SQL_CAMBIADAS, ['2026-01-01 00:00:00.000']),
+        'busqueda: texto': (busqueda.SQL_BUSCAR, ['"media"*', '2026-01-01', 20]),
+        'busqueda: total': (busqueda.SQL_CONTAR, ['"media"*', '2026-01-01']),
+    }
+
+
+def columnas(client, tabla='carreras'):
+    return [fila[1] for fila in client.execute(f"PRAGMA table_info({tabla})").rows]
+
+
+def asegurar_columna(client, nombre, tipo='TEXT'):
+    """Añade la columna `nombre` a la tabla carreras si todavía no existe."""
+    if nombre not in columnas(client):
+        client.execute(f"ALTER TABLE carreras ADD COLUMN {nombre} {tipo}")
+        print(f"   🛠️ Añadida la columna '{nombre}' a la tabla carreras.")
+
+
+# --- Migraciones ---
+
+def _tabla_con_id(client):
+    """Crea la tabla o, si es antigua y no tiene `id`, la reconstruye con una clave estable."""
+    existentes = columnas(client)
+    if not existentes:
+        client.execute(TABLA_CARRERAS)
+        return
+    if 'id' in existentes:
+        return
+    # SQLite no deja añadir una PRIMARY KEY: se copia a una tabla nueva en una transacción
+    comunes = ', '.join(c for c in existentes if c in COLUMNAS_CARRERAS)
+    client.batch([
+        TABLA_CARRERAS.replace('carreras', 'carreras_nueva', 1),
+        f"INSERT INTO carreras_nueva ({comunes}) SELECT {comunes} FROM carreras ORDER BY rowid",
+        "DROP TABLE carreras",
+        "ALTER TABLE carreras_nueva RENAME TO carreras",
+    ])
+    print("   🛠️ Tabla carreras reconstruida con la columna 'id'.")
+
+
+def _columnas_nuevas(client):
+    for nombre in ('hash_contenido', 'clave_publicacion', 'titulo_normalizado'):
+        asegurar_columna(client, nombre)
+
+
+def _rellenar_titulo_normalizado(client):
+    filas = client.execute("SELECT id, titulo FROM carreras WHERE titulo_normalizado IS NULL").rows
+    sentencias = [
+        ("UPDATE carreras SET titulo_normalizado = ? WHERE id = ?",
+         [deduplicacion.normalizar_titulo(titulo or ''), id_])
+        for id_, titulo in filas
+    ]
+    for i in range(0, len(sentencias), 200):
+        client.batch(sentencias[i:i + 200])
+
+
+def _columnas_imagen(client):
+    for nombre, tipo in [('imagen_estado', 'TEXT'), ('imagen_hash', 'TEXT'), ('imagen_ancho', 'INTEGER'),
+                         ('imagen_alto', 'INTEGER'), ('imagen_etag', 'TEXT'), ('imagen_miniatura', 'TEXT')]:
+        asegurar_columna(client, nombre, tipo)
+
+
+def _marca_modificada(client):
+    # Cuándo se escribió cada fila por última vez: la API relee solo las que han cambiado
+    asegurar_columna(client, 'modificada')
+    client.execute("CREATE INDEX IF NOT EXISTS ix_carreras_modificada ON carreras (modificada)")
+
+
+def _coordenadas(client):
+    # Lugar del nomenclátor y coordenadas de cada carrera (ver geografia.py); se rellenan las que ya hay
+    for nombre, tipo in [('ubicacion_normalizada', 'TEXT'), ('latitud', 'REAL'), ('longitud', 'REAL')]:
+        asegurar_columna(client, nombre, tipo)
+    sin_reconocer = geografia.geocodificar_tabla(client)
+    if sin_reconocer:
+        print(f"   🗺️ {len(sin_reconocer)} ubicaciones sin coordenadas (python geografia.py para verlas).")
+
+
+def _clave_unica(client):
+    # Antes de crear el índice único se juntan las filas repetidas: se queda la primera
+    # (la de menor id) y, si alguna de ellas ya se había publicado, la que queda también.
+    repetidas = client.execute("""
+        SELECT COUNT(*) - COUNT(DISTINCT titulo_normalizado || '|' || fecha) FROM carreras
+        WHERE titulo_normalizado IS NOT NULL AND fecha IS NOT NULL
+    """).rows[0][0]
+    client.batch([
+        """
+        UPDATE carreras SET publicada = 1
+        WHERE publicada != 1 AND EXISTS (
+            SELECT 1 FROM carreras otra
+            WHERE otra.titulo_normalizado = carreras.titulo_normalizado
+              AND otra.fecha = carreras.fecha AND otra.publicada = 1
+        )
+        """,
+        """
+        DELETE FROM carreras
+        WHERE titulo_normalizado IS NOT NULL AND fecha IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM carreras GROUP BY titulo_normalizado, fecha
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_carreras_titulo_fecha ON carreras (titulo_normalizado, fecha)",
+    ])
+    if repetidas:
+        print(f"   🧹 {repetidas} carreras repetidas (mismo título normalizado y fecha) juntadas.")
+
+
+# Clave de una carrera en la tabla: título normalizado, fecha y lugar del nomenclátor. Con el
+# lugar, dos carreras que la deduplicación separa por estar lejos ("San Silvestre" en Lorca y
+# en Yecla el mismo día) son dos filas y no una que cambia de pueblo en cada ejecución.
+CLAVE_CARRERA = "titulo_normalizado, fecha, COALESCE(ubicacion_normalizada, '')"
+
+
+def _clave_unica_con_lugar(client):
+    # Deshace la clave de la 4, que juntaba carreras de pueblos distintos, y crea la de
+    # CLAVE_CARRERA con el título normalizado que ya está guardado (la fusión lo pone al día
+    # cuando cambia normalizar_titulo). Antes se juntan las filas repetidas como en la 4, pero
+    # las que se quitan no se pierden: se copian a carreras_repetidas.
+    client.execute("DROP INDEX IF EXISTS ux_carreras_titulo_fecha")
+    sobrantes = f"""
+        titulo_normalizado IS NOT NULL AND fecha IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM carreras GROUP BY {CLAVE_CARRERA}
+        )
+    """
+    repetidas = client.execute(f"SELECT COUNT(*) FROM carreras WHERE {sobrantes}").rows[0][0]
+    client.batch([
+        "CREATE TABLE IF NOT EXISTS carreras_repetidas AS SELECT * FROM carreras WHERE 0",
+        f"INSERT INTO carreras_repetidas SELECT * FROM carreras WHERE {sobrantes}",
+        """
+        UPDATE carreras SET publicada = 1
+        WHERE publicada != 1 AND EXISTS (
+            SELECT 1 FROM carreras otra
+            WHERE otra.titulo_normalizado = carreras.titulo_normalizado AND otra.fecha = carreras.fecha
+              AND COALESCE(otra.ubicacion_normalizada, '') = COALESCE(carreras.ubicacion_normalizada, '')
+              AND otra.publicada = 1
+        )
+        """,
+        f"DELETE FROM carreras WHERE {sobrantes}",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS ux_carreras_clave ON carreras ({CLAVE_CARRERA})",
+    ])
+    if repetidas:
+        print(f"   🧹 {repetidas} carreras repetidas (mismo título normalizado, fecha y lugar) juntadas; "
+              f"las filas quitadas están en carreras_repetidas.")
+
+
+def _hora_reserva(client):
+    # Cuándo reservó instagram.py cada carrera: pasado un rato, la reserva se da por perdida
+    asegurar_columna(client, 'reservada')
+
+
+MIGRACIONES = [
+    (1, 'tabla carreras con id', _tabla_con_id),
+    (2, 'columnas hash_contenido, clave_publicacion y titulo_normalizado', _columnas_nuevas),
+    (3, 'rellenar titulo_normalizado', _rellenar_titulo_normalizado),
+    # La 10 la sustituye por una con el lugar
+    (4, 'clave única titulo_normalizado + fecha', _clave_unica),
+    (5, 'índices de las consultas diarias', [
+        "CREATE INDEX IF NOT EXISTS ix_carreras_fecha ON carreras (fecha)",
+        "CREATE INDEX IF NOT EXISTS ix_carreras_publicada_fecha ON carreras (publicada, fecha)",
+        "CREATE INDEX IF NOT EXISTS ix_carreras_titulo ON carreras (titulo)",
+    ]),
+    (6, 'columnas de la comprobación de imágenes', _columnas_imagen),
+    (7, 'marca de modificación para la API', _marca_modificada),
+    (8, 'ubicación normalizada y coordenadas', _coordenadas),
+    (9, 'búsqueda de texto completo (FTS5)', [TABLA_FTS] + DISPARADORES_FTS + [
+        "INSERT INTO carreras_fts (carreras_fts) VALUES ('rebuild')",
+    ]),
+    (10, 'clave única titulo_normalizado + fecha + lugar', _clave_unica_con_lugar),
+    (11, 'hora de reserva de las publicaciones', _hora_reserva),
+]
+VERSION = MIGRACIONES[-1][0]
+
+
+def migrar(client):
+    """Aplica las migraciones pendientes. Devuelve cuántas se han aplicado."""
+    metricas.contar('bd_viajes', tipo='esquema')
+    _, aplicadas = client.batch([
+        "CREATE TABLE IF NOT EXISTS migraciones (version INTEGER PRIMARY KEY, nombre TEXT, aplicada TEXT)",
+        "SELECT version FROM migraciones",
+    ])
+    hechas = {fila[0] for fila in aplicadas.rows}
+
+    pendientes = [m for m in MIGRACIONES if m[0] not in hechas]
+    for version, nombre, migracion in pendientes:
+        if callable(migracion):
+            migracion(client)
+        else:
+            client.batch(migracion)
+        client.execute(
+            "INSERT INTO migraciones (version, nombre, aplicada) VALUES (?, ?, ?)",
+            [version, nombre, time.strftime('%Y-%m-%d %H:%M:%S')],
+        )
+        print(f"   🛠️ Migración {version} aplicada: {nombre}")
+    return len(pendientes)
+
+
+# --- Comprobación de los planes de consulta ---
+
+_FTS_CON_MATCH = re.compile(r'VIRTUAL TABLE INDEX \d+:\w*M')
+
+
+def plan(client, sql, args):
+    """Líneas de EXPLAIN QUERY PLAN de la consulta."""
+    return [fila[-1] for fila in client.execute(f"EXPLAIN QUERY PLAN {sql}", args).rows]
+
+
+def problemas_plan(lineas):
+    """Recorridos completos (de la tabla o de un índice entero) u ordenaciones que no salen de un índice."""
+    return [
+        linea for linea in lineas
+        # Una tabla FTS5 siempre sale como SCAN; con MATCH ("INDEX 32:rM3") usa su índice
+        if (linea.startswith('SCAN') and not _FTS_CON_MATCH.search(linea)) or 'TEMP B-TREE' in linea
+    ]
+
+
+def comprobar_consultas(client):
+    """Imprime el plan de cada consulta caliente. Devuelve cuántas no usan un índice."""
+    fallos = 0
+    for nombre, (sql, args) in consultas_calientes().items():
+        lineas = plan(client, sql, args)
+        malas = problemas_plan(lineas)
+        fallos += bool(malas)
+        print(f"{'❌' if malas else '✅'} {nombre}: {' | '.join(lineas)}")
+    return fallos
+
+
+def _comprobar_en_base_temporal():
+    import libsql_client
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        client = libsql_client.create_client_sync(f"file:{os.path.join(carpeta, 'carreras.db')}")
+        try:
+            migrar(client)
+            return comprobar_consultas(client)
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la tabla carreras")
+    parser.add_argument('--comprobar', action='store_true',
+                        help="Crea el esquema en una base temporal y comprueba que las consultas diarias usan índices")
+    args = parser.parse_args()
+
+    if args.comprobar:
+        fallos = _comprobar_en_base_temporal()
+        if fallos:
+            print(f"\n❌ {fallos} consultas no usan ningún índice.")
+            sys.exit(1)
+        print("\n✅ Todas las consultas diarias usan un índice.")
+    else:
+        import base_datos
+
+        # conectar() ya aplica las migraciones pendientes
+        client = base_datos.conectar()
+        if client is not None:
+            client.close()
+            print(f"✅ Esquema en la versión {VERSION}.")
@@ -0,0 +1,71 @@
+import sys
+
+import numpy as np
+
+import deduplicacion
+from fechas import parsear_fecha
+
+# Campos que se guardan de cada carrera (mismo orden que las columnas de los CSV)
+CAMPOS = ('fecha', 'titulo', 'ubicacion', 'url_inscripcion', 'url_ficha', 'imagen', 'origen')
+
+
+def limpiar_valor(dato):
+    """None, NaN y '' -> None; cualquier otro valor -> texto."""
+    if dato is None:
+        return None
+    if isinstance(dato, (float, np.floating)) and (np.isnan(dato) or np.isinf(dato)):
+        return None
+    texto = str(dato)
+    return texto if texto != '' else None
+
+
+class Carrera:
+    """
+    Una carrera tal como viaja de los scrapers a la fusión, la base de datos e Instagram.
+
+    Se limpia y valida una sola vez al crearla: la fecha queda en formato
+    'AAAA-MM-DD' (y como ordinal en `dia`, None si no se entiende), el origen
+    se interna porque se repite en todas las carreras de una fuente y `clave`
+    guarda el título normalizado que usa la deduplicación.
+    """
+
+    __slots__ = CAMPOS + ('dia', 'clave')
+
+    def __init__(self, titulo, fecha, ubicacion=None, url_inscripcion=None, url_ficha=None, imagen=None, origen=None):
+        self.titulo = limpiar_valor(titulo)
+        if self.titulo is None:
+            raise ValueError("la carrera no tiene título")
+
+        texto_fecha = limpiar_valor(fecha)
+        dia = parsear_fecha(texto_fecha)
+        self.fecha = dia.isoformat() if dia else texto_fecha
+        self.dia = dia.toordinal() if dia else None
+
+        self.ubicacion = limpiar_valor(ubicacion)
+        self.url_inscripcion = limpiar_valor(url_inscripcion)
+        self.url_ficha = limpiar_valor(url_ficha)
+        self.imagen = limpiar_valor(imagen)
+        origen = limpiar_valor(origen)
+        self.origen = sys.intern(origen) if origen else None
+
+        self.clave = deduplicacion.normalizar_titulo(self.titulo)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Desde un diccionario (fila de CSV, índice JSON...). Las claves no distinguen mayúsculas."""
+        datos = {str(clave).lower().strip(): valor for clave, valor in datos.items()}
+        return cls(**{campo: datos.get(campo) for campo in CAMPOS})
+
+    @classmethod
+    def desde_fila(cls, columnas, fila):
+        """Desde una fila de la base de datos; las columnas que no son campos se ignoran."""
+        return cls.desde_dict(dict(zip(columnas, fila)))
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS}
+
+    def __eq__(self, otra):
+        return isinstance(otra, Carrera) and self.a_dict() == otra.a_dict()
+
+    def __repr__(self):
+        return f"Carrera({self.titulo!r}, {self.fecha!r}, origen={self.origen!r})"
@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+# Fichero SQLite donde se guardan las respuestas descargadas
+RUTA_CACHE = os.getenv('HTTP_CACHE_RUTA', 'data/cache_http.sqlite')
+# Tamaño máximo de la caché; al pasarse se borran las entradas usadas hace más tiempo (LRU)
+TAMANO_MAXIMO = int(float(os.getenv('HTTP_CACHE_MAX_MB', '200')) * 1024 * 1024)
+
+# Tiempo (segundos) durante el cual una respuesta se da por buena sin volver a preguntar al servidor.
+# Se busca el prefijo más largo que coincida con la URL; si ninguno coincide se usa TTL_POR_DEFECTO.
+TTL_POR_FUENTE = {
+    # Las fichas de carrera casi nunca cambian una vez publicadas
+    'https://lineadesalida.net/carreras/': int(os.getenv('HTTP_CACHE_TTL_FICHAS', str(3 * 24 * 3600))),
+}
+# Los listados se revalidan siempre (con petición condicional si el servidor lo permite)
+TTL_POR_DEFECTO = int(os.getenv('HTTP_CACHE_TTL', '0'))
+
+_conexion = None
+_tamano_total = 0
+_lock = threading.Lock()
+
+
+def _abrir():
+    global _conexion, _tamano_total
+    if _conexion is None:
+        carpeta = os.path.dirname(RUTA_CACHE)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        _conexion = sqlite3.connect(RUTA_CACHE, check_same_thread=False)
+        _conexion.execute("""
+            CREATE TABLE IF NOT EXISTS respuestas (
+                url TEXT PRIMARY KEY,
+                contenido BLOB,
+                cabeceras TEXT,
+                encoding TEXT,
+                fecha_descarga REAL,
+                ultimo_acceso REAL,
+                tamano INTEGER
+            )
+        """)
+        _conexion.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_acceso ON respuestas (ultimo_acceso)")
+        _tamano_total = _conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+    return _conexion
+
+
+def ttl(url):
+    mejor = None
+    for prefijo in TTL_POR_FUENTE:
+        if url.startswith(prefijo) and (mejor is None or len(prefijo) > len(mejor)):
+            mejor = prefijo
+    return TTL_POR_FUENTE[mejor] if mejor else TTL_POR_DEFECTO
+
+
+def leer(url):
+    """
+    Devuelve la entrada guardada como diccionario
+    {'contenido', 'cabeceras', 'encoding', 'fecha_descarga', 'fresca'} o None.
+    """
+    with _lock:
+        conexion = _abrir()
+        fila = conexion.execute(
+            "SELECT contenido, cabeceras, encoding, fecha_descarga FROM respuestas WHERE url = ?", [url]
+        ).fetchone()
+        if fila is None:
+            return None
+        ahora = time.time()
+        conexion.execute("UPDATE respuestas SET ultimo_acceso = ? WHERE url = ?", [ahora, url])
+        conexion.commit()
+
+    contenido, cabeceras, encoding, fecha_descarga = fila
+    return {
+        'contenido': contenido,
+        'cabeceras': CaseInsensitiveDict(json.loads(cabeceras)),
+        'encoding': encoding,
+        'fecha_descarga': fecha_descarga,
+        'fresca': ahora - fecha_descarga < ttl(url),
+    }
+
+
+def guardar(url, contenido, cabeceras, encoding):
+    global _tamano_total
+    ahora = time.time()
+    with _lock:
+        conexion = _abrir()
+        anterior = conexion.execute("SELECT tamano FROM respuestas WHERE url = ?", [url]).fetchone()
+        conexion.execute(
+            "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [url, contenido, json.dumps(dict(cabeceras)), encoding, ahora, ahora, len(contenido)]
+        )
+        _tamano_total += len(contenido) - (anterior[0] if anterior else 0)
+        _recortar(conexion)
+        conexion.commit()
+
+
+def renovar(url):
+    """El servidor ha confirmado (304) que no hay cambios: reiniciamos su TTL."""
+    with _lock:
+        conexion = _abrir()
+        conexion.execute("UPDATE respuestas SET fecha_descarga = ? WHERE url = ?", [time.time(), url])
+        conexion.commit()
+
+
+def _recortar(conexion):
+    """Borra las entradas menos usadas hasta volver a estar por debajo del tamaño máximo."""
+    global _tamano_total
+    while _tamano_total > TAMANO_MAXIMO:
+        viejas = conexion.execute(
+            "SELECT url, tamano FROM respuestas ORDER BY ultimo_acceso ASC LIMIT 50"
+        ).fetchall()
+        if not viejas:
+            _tamano_total = 0
+            break
+        conexion.executemany("DELETE FROM respuestas WHERE url = ?", [[url] for url, _ in viejas])
+        _tamano_total -= sum(tamano for _, tamano in viejas)
@@ -0,0 +1,221 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metricas
+from scrapers import cache_http
+
+# IMPORTANTE: Usamos un "User-Agent" para parecer un navegador real.
+# Si no pones esto, muchas webs bloquean el script pensando que es un robot malicioso.
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# (conexión, lectura) en segundos
+TIMEOUT = (
+    float(os.getenv('HTTP_TIMEOUT_CONEXION', '5')),
+    float(os.getenv('HTTP_TIMEOUT_LECTURA', '30')),
+)
+REINTENTOS = int(os.getenv('HTTP_REINTENTOS', '3'))
+# Conexiones abiertas que se reutilizan por dominio
+TAMANO_POOL = int(os.getenv('HTTP_TAMANO_POOL', '10'))
+
+
+def crear_sesion():
+    """
+    Sesión compartida con keep-alive y reintentos con espera exponencial
+    (1s, 2s, 4s...) ante errores 5xx o 429 (demasiadas peticiones).
+    """
+    reintentos = Retry(
+        total=REINTENTOS,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        # Si se agotan los reintentos devolvemos la última respuesta en vez de lanzar excepción
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(pool_connections=TAMANO_POOL, pool_maxsize=TAMANO_POOL, max_retries=reintentos)
+
+    nueva = requests.Session()
+    nueva.headers.update(HEADERS)
+    nueva.mount("http://", adaptador)
+    nueva.mount("https://", adaptador)
+    return nueva
+
+
+sesion = crear_sesion()
+
+# En modo offline no se hace ninguna petición: todo sale de la caché en disco
+modo_offline = False
+
+_lock = threading.Lock()
+
+estadisticas = {
+    'peticiones': 0,
+    'bytes': 0,
+    'respuestas_304': 0,
+    'desde_cache': 0,
+    'errores': 0,
+    'por_host': {},
+}
+
+
+def activar_modo_offline():
+    global modo_offline
+    modo_offline = True
+    print("📴 Modo offline: las páginas se leen solo de la caché local.")
+
+
+def _anotar(url, bytes_recibidos=0, es_304=False, desde_cache=False, es_error=False):
+    host = urlparse(url).netloc
+    with _lock:
+        por_host = estadisticas['por_host'].setdefault(
+            host, {'peticiones': 0, 'bytes': 0, 'respuestas_304': 0, 'desde_cache': 0}
+        )
+        for destino in (estadisticas, por_host):
+            if desde_cache:
+                destino['desde_cache'] += 1
+                continue
+            destino['peticiones'] += 1
+            destino['bytes'] += bytes_recibidos
+            if es_304:
+                destino['respuestas_304'] += 1
+        if es_error:
+            estadisticas['errores'] += 1
+
+
+def _respuesta_desde_cache(url, guardada, response=None):
+    """Construye (o reutiliza) una respuesta 200 con el contenido guardado."""
+    if response is None:
+        response = requests.Response()
+        response.url = url
+        response.headers.update(guardada['cabeceras'])
+    response.status_code = 200
+    response._content = guardada['contenido']
+    response.encoding = guardada['encoding']
+    return response
+
+
+def obtener(url, limitador=None):
+    """
+    GET con la sesión compartida y la caché en disco.
+    - Si la copia guardada aún está dentro de su TTL, no se toca la red.
+    - Si ha caducado, se pide con If-None-Match / If-Modified-Since y, cuando el
+      servidor responde 304, se reutiliza el contenido guardado.
+    En ambos casos se devuelve una respuesta 200 normal para que los scrapers no cambien.
+    """
+    host = urlparse(url).netloc
+    guardada = cache_http.leer(url)
+
+    if modo_offline or (guardada and guardada['fresca']):
+        if guardada is None:
+            # 504 = "Gateway Timeout": no tenemos la página y no podemos ir a buscarla
+            response = requests.Response()
+            response.url = url
+            response.status_code = 504
+            response._content = b''
+            _anotar(url, desde_cache=True, es_error=True)
+            metricas.contar('http_peticiones', host=host, resultado='sin_cache')
+            return response
+        _anotar(url, desde_cache=True)
+        metricas.contar('http_peticiones', host=host, resultado='cache')
+        return _respuesta_desde_cache(url, guardada)
+
+    if limitador:
+        with metricas.cronometro('http_espera_limitador_segundos', host=host):
+            limitador.esperar(url)
+
+    cabeceras = {}
+    if guardada:
+        if guardada['cabeceras'].get('ETag'):
+            cabeceras['If-None-Match'] = guardada['cabeceras']['ETag']
+        if guardada['cabeceras'].get('Last-Modified'):
+            cabeceras['If-Modified-Since'] = guardada['cabeceras']['Last-Modified']
+
+    inicio = time.perf_counter()
+    try:
+        response = sesion.get(url, headers=cabeceras, timeout=TIMEOUT)
+    except requests.exceptions.RequestException:
+        _anotar(url, es_error=True)
+        metricas.contar('http_peticiones', host=host, resultado='error')
+        raise
+    # Latencia de red por dominio (incluye los reintentos que haga la sesión)
+    metricas.observar('http_latencia_segundos', time.perf_counter() - inicio, host=host)
+    metricas.contar('http_peticiones', host=host, resultado=response.status_code)
+
+    if response.status_code == 304 and guardada:
+        cache_http.renovar(url)
+        _anotar(url, es_304=True)
+        return _respuesta_desde_cache(url, guardada, response)
+
+    bytes_recibidos = int(response.headers.get('Content-Length') or len(response.content))
+    _anotar(url, bytes_recibidos, es_error=response.status_code >= 400)
+    metricas.contar('http_bytes', bytes_recibidos, host=host)
+
+    if response.status_code == 200:
+        cache_http.guardar(url, response.content, response.headers, response.encoding)
+
+    return response
+
+
+def _sin_cache(metodo, url, limitador=None):
+    """Petición con la sesión compartida, sin pasar por la caché de páginas (imágenes, HEAD...)."""
+    host = urlparse(url).netloc
+    if modo_offline:
+        response = requests.Response()
+        response.url = url
+        response.status_code = 504
+        response._content = b''
+        _anotar(url, desde_cache=True, es_error=True)
+        metricas.contar('http_peticiones', host=host, resultado='sin_cache')
+        return response
+
+    if limitador:
+        with metricas.cronometro('http_espera_limitador_segundos', host=host):
+            limitador.esperar(url)
+
+    inicio = time.perf_counter()
+    try:
+        response = sesion.request(metodo, url, timeout=TIMEOUT, allow_redirects=True)
+    except requests.exceptions.RequestException:
+        _anotar(url, es_error=True)
+        metricas.contar('http_peticiones', host=host, resultado='error')
+        raise
+    metricas.observar('http_latencia_segundos', time.perf_counter() - inicio, host=host)
+    metricas.contar('http_peticiones', host=host, resultado=response.status_code)
+
+    bytes_recibidos = len(response.content) if metodo == 'GET' else 0
+    _anotar(url, bytes_recibidos, es_error=response.status_code >= 400)
+    metricas.contar('http_bytes', bytes_recibidos, host=host)
+    return response
+
+
+def cabecera(url, limitador=None):
+    """HEAD: comprueba que la URL existe y lee su ETag / tamaño sin descargarla."""
+    return _sin_cache('HEAD', url, limitador)
+
+
+def descargar(url, limitador=None):
+    """GET de un fichero (p. ej. una imagen) sin guardarlo en la caché de páginas."""
+    return _sin_cache('GET', url, limitador)
+
+
+def imprimir_resumen():
+    with _lock:
+        peticiones = estadisticas['peticiones']
+        total = peticiones + estadisticas['desde_cache']
+        if total == 0:
+            return
+        aciertos = estadisticas['respuestas_304'] + estadisticas['desde_cache']
+        print(f"🌐 HTTP: {peticiones} peticiones, {estadisticas['bytes'] / 1024:.1f} KB descargados, "
+              f"{estadisticas['desde_cache']} servidas desde caché, {estadisticas['respuestas_304']} sin cambios (304), "
+              f"aciertos {aciertos / total * 100:.0f}%, {estadisticas['errores']} errores")
+        for host, datos in estadisticas['por_host'].items():
+            print(f"   · {host}: {datos['peticiones']} peticiones, {datos['bytes'] / 1024:.1f} KB, "
+                  f"{datos['desde_cache']} desde caché, {datos['respuestas_304']} × 304")
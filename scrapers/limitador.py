@@ -0,0 +1,58 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class CuboDeTokens:
+    """
+    Limitador tipo "token bucket".
+    Repone `por_segundo` tokens cada segundo hasta un máximo de `capacidad`,
+    así se permiten pequeñas ráfagas sin pasarse del ritmo medio.
+    """
+
+    def __init__(self, por_segundo, capacidad=None):
+        self.por_segundo = float(por_segundo)
+        self.capacidad = float(capacidad) if capacidad else max(1.0, self.por_segundo)
+        self.tokens = self.capacidad
+        self.ultima_recarga = time.monotonic()
+        self.lock = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        if self.por_segundo <= 0:
+            return
+
+        while True:
+            with self.lock:
+                ahora = time.monotonic()
+                transcurrido = ahora - self.ultima_recarga
+                self.tokens = min(self.capacidad, self.tokens + transcurrido * self.por_segundo)
+                self.ultima_recarga = ahora
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                # Tiempo que falta para que se reponga el siguiente token
+                espera = (1 - self.tokens) / self.por_segundo
+
+            time.sleep(espera)
+
+
+class LimitadorPorHost:
+    """Mantiene un cubo de tokens independiente para cada dominio."""
+
+    def __init__(self, por_segundo, capacidad=None):
+        self.por_segundo = por_segundo
+        self.capacidad = capacidad
+        self.cubos = {}
+        self.lock = threading.Lock()
+
+    def esperar(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            cubo = self.cubos.get(host)
+            if cubo is None:
+                cubo = CuboDeTokens(self.por_segundo, self.capacidad)
+                self.cubos[host] = cubo
+        cubo.esperar()
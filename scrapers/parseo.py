@@ -0,0 +1,49 @@
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+import metricas
+
+# Capa común para convertir el HTML descargado en un árbol de BeautifulSoup.
+# Usa lxml si está instalado (bastante más rápido) y si no el html.parser de la
+# librería estándar. Con un SoupStrainer solo se construye el árbol de la parte
+# de la página que lee cada scraper: cabecera, menús, scripts y pie se saltan.
+
+try:
+    import lxml  # noqa: F401
+    MOTOR_POR_DEFECTO = 'lxml'
+except ImportError:
+    MOTOR_POR_DEFECTO = 'html.parser'
+
+# html.parser | lxml
+MOTOR = os.getenv('PARSER_HTML', MOTOR_POR_DEFECTO)
+# Con PARSER_HTML_PARCIAL=0 se analiza siempre el documento entero (como antes)
+PARCIAL = os.getenv('PARSER_HTML_PARCIAL', '1') == '1'
+
+# Las partes de cada web que leen los scrapers
+FILAS_ALCANZA = SoupStrainer('tr')
+TARJETAS_BABEL = SoupStrainer('div', class_='row p-3')
+LISTADO_LINEADESALIDA = SoupStrainer(id='todasCarrerasDiv')
+FICHA_LINEADESALIDA = SoupStrainer('div', class_=['row mt-3', 'row px-2 py-3'])
+
+# Nombre con el que aparece cada zona en las métricas
+_NOMBRES = {
+    id(FILAS_ALCANZA): 'alcanza',
+    id(TARJETAS_BABEL): 'babel',
+    id(LISTADO_LINEADESALIDA): 'lineadesalida_listado',
+    id(FICHA_LINEADESALIDA): 'lineadesalida_ficha',
+}
+
+
+def analizar(html, solo=None, motor=None, parcial=None):
+    """
+    Devuelve el BeautifulSoup de `html`. Si se pasa `solo` (uno de los
+    SoupStrainer de arriba) y el análisis parcial está activo, el árbol
+    contiene únicamente esos elementos y todo lo que tengan dentro.
+    """
+    if motor is None:
+        motor = MOTOR
+    if parcial is None:
+        parcial = PARCIAL
+    with metricas.cronometro('parseo_segundos', pagina=_NOMBRES.get(id(solo), 'otra'), motor=motor):
+        return BeautifulSoup(html, motor, parse_only=solo if parcial else None)
@@ -0,0 +1,195 @@
+import importlib
+import os
+import pkgutil
+
+import requests
+
+from modelo import Carrera
+from scrapers import cliente_http, parseo
+
+# Registro de las webs de las que se sacan carreras. Cada módulo scrapers/scraper_*.py
+# se registra al importarse: o bien con su propio generador (registrar) o bien
+# describiendo la web (URL, paginación, selectores CSS y qué campo sale de cada uno)
+# con definir(), y entonces no necesita código propio. main.py y fusionar_carreras.py
+# sacan de aquí la lista de fuentes, así que añadir una web es añadir un módulo.
+
+# Nombres de fuentes a saltarse, separados por comas (p. ej. "Babelsport,FAMU")
+FUENTES_DESACTIVADAS = {n.strip() for n in os.getenv('FUENTES_DESACTIVADAS', '').split(',') if n.strip()}
+
+_fuentes = {}
+_descubiertas = False
+
+
+class ErrorFuente(Exception):
+    """
+    La web no se ha podido leer entera (error de conexión o una página del listado que no
+    responde). main.py da la fuente por fallida y usa su última instantánea en vez de una lista corta.
+    """
+
+
+class Fuente:
+    """
+    Una web registrada. `iterar(completo)` devuelve el generador de sus carreras
+    y `ruta_csv` es su instantánea. Las fuentes se juntan por `orden` (de menor a
+    mayor), que es también su prioridad al deduplicar.
+    """
+
+    def __init__(self, nombre, iterar, ruta_csv, orden=100):
+        self.nombre = nombre
+        self.iterar = iterar
+        self.ruta_csv = ruta_csv
+        self.orden = orden
+
+    def __repr__(self):
+        return f"Fuente({self.nombre!r}, orden={self.orden})"
+
+
+class Campo:
+    """
+    De dónde sale un campo de la carrera dentro de cada elemento del listado.
+    - `selector`: selector CSS relativo al elemento (None = el propio elemento).
+    - `atributo`: atributo a leer (p. ej. 'src', 'href'); si no, el texto.
+    - `texto`: solo vale un elemento cuyo texto (en mayúsculas) contenga esto,
+      para distinguir botones que comparten selector.
+    - `url`: el valor es un enlace y se completa con la URL base si es relativo.
+    - `defecto`: valor si no se encuentra; con `obligatorio` se descarta la carrera.
+    - `primero`: solo vale el primer elemento del selector y su valor se toma aunque esté
+      vacío (si no, se sigue con los demás hasta encontrar uno con valor).
+    """
+
+    def __init__(self, selector=None, atributo=None, texto=None, url=False, defecto='', obligatorio=False,
+                 primero=False):
+        self.selector = selector
+        self.atributo = atributo
+        self.texto = texto
+        self.url = url
+        self.defecto = defecto
+        self.obligatorio = obligatorio
+        self.primero = primero
+
+
+class Definicion:
+    """
+    Descripción declarativa de una web con un listado de carreras.
+    - `url`: primera página del listado; `url_base` completa los enlaces relativos.
+    - `pagina`: plantilla para las páginas siguientes ('?page={pagina}') o None si
+      solo hay una. Se para en la primera página sin carreras o en `max_paginas`.
+    - `elementos`: selector CSS de cada carrera y `zona` el SoupStrainer con la parte
+      de la página a analizar (ver parseo.py).
+    - `campos`: {nombre del campo de Carrera: Campo}.
+    """
+
+    def __init__(self, nombre, origen, url, url_base, elementos, campos, ruta_csv,
+                 zona=None, pagina=None, max_paginas=50, limitador=None):
+        self.nombre = nombre
+        self.origen = origen
+        self.url = url
+        self.url_base = url_base
+        self.elementos = elementos
+        self.campos = campos
+        self.ruta_csv = ruta_csv
+        self.zona = zona
+        self.pagina = pagina
+        self.max_paginas = max_paginas
+        self.limitador = limitador
+
+
+def registrar(nombre, iterar, ruta_csv, orden=100):
+    """Registra una fuente con su propio generador; `iterar(completo)` devuelve las carreras."""
+    _fuentes[nombre] = Fuente(nombre, iterar, ruta_csv, orden)
+    return _fuentes[nombre]
+
+
+def definir(definicion, orden=100):
+    """Registra una fuente declarativa: la descarga y la lectura las hace iterar_definicion()."""
+    def iterar(completo=False):
+        return iterar_definicion(definicion)
+    return registrar(definicion.nombre, iterar, definicion.ruta_csv, orden)
+
+
+def descubrir():
+    """Importa todos los scrapers/scraper_*.py para que se registren (solo la primera vez)."""
+    global _descubiertas
+    if _descubiertas:
+        return
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    for modulo in sorted(m.name for m in pkgutil.iter_modules([carpeta])):
+        if modulo.startswith('scraper_'):
+            importlib.import_module(f'scrapers.{modulo}')
+    _descubiertas = True
+
+
+def fuentes():
+    """Fuentes registradas y activas, en su orden de prioridad."""
+    descubrir()
+    activas = [f for f in _fuentes.values() if f.nombre not in FUENTES_DESACTIVADAS]
+    return sorted(activas, key=lambda f: f.orden)
+
+
+# --- Lectura de las fuentes declarativas ---
+
+def url_absoluta(url_base, href):
+    if not href or href.startswith('http'):
+        return href
+    return url_base + href.lstrip('/')
+
+
+def leer_campo(elemento, campo, url_base):
+    candidatos = [elemento] if campo.selector is None else elemento.select(campo.selector)
+    if campo.primero:
+        candidatos = candidatos[:1]
+    for candidato in candidatos:
+        if campo.texto and campo.texto not in candidato.get_text(strip=True).upper():
+            continue
+        valor = candidato.get(campo.atributo) if campo.atributo else candidato.text.strip()
+        if valor or campo.primero:
+            return url_absoluta(url_base, valor) if campo.url else valor
+    if campo.obligatorio:
+        raise ValueError(f"no se encuentra '{campo.selector}'")
+    return campo.defecto
+
+
+def extraer_definicion(definicion, html):
+    """Generador con las carreras de una página según la definición (sin hacer peticiones)."""
+    soup = parseo.analizar(html, definicion.zona)
+    for elemento in soup.select(definicion.elementos):
+        try:
+            datos = {nombre: leer_campo(elemento, campo, definicion.url_base)
+                     for nombre, campo in definicion.campos.items()}
+            yield Carrera(origen=definicion.origen, **datos)
+        except Exception as e:
+            # Si falta algún dato en una tarjeta, saltamos a la siguiente para no romper el programa
+            print(f"⚠️ Error leyendo una fila: {e}")
+
+
+def iterar_definicion(definicion):
+    """
+    Generador: descarga cada página del listado y entrega sus carreras según las lee.
+    Si una página no se puede descargar lanza ErrorFuente: lo leído hasta ahí no es el listado entero.
+    """
+    encontradas = 0
+    for pagina in range(1, definicion.max_paginas + 1):
+        url = definicion.url if pagina == 1 else definicion.url + definicion.pagina.format(pagina=pagina)
+        print(f"🔄 Conectando con {url}...")
+        try:
+            response = cliente_http.obtener(url, limitador=definicion.limitador)
+        except requests.exceptions.RequestException as e:
+            raise ErrorFuente(f"error de conexión en la página {pagina} ({e})") from e
+        if response.status_code != 200:
+            raise ErrorFuente(f"error {response.status_code} en la página {pagina}")
+
+        en_pagina = 0
+        for carrera in extraer_definicion(definicion, response.text):
+            en_pagina += 1
+            yield carrera
+        encontradas += en_pagina
+        if not definicion.pagina or not en_pagina:
+            break
+
+    print(f"\n🎉 {definicion.nombre}: se han encontrado {encontradas} carreras.")
+
+
+def iterar_fuente(nombre, completo=False):
+    """Generador de carreras de la fuente `nombre` (útil para probar una sola web)."""
+    descubrir()
+    return _fuentes[nombre].iterar(completo)
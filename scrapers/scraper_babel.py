@@ -1,111 +1,50 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
 
-# 1. Configuración Inicial
-# URL de la web que queremos leer (Pondremos una de ejemplo)
-url_objetivo = "https://www.babelsport.com/eventos-proximos/"
-url_base = "https://www.babelsport.com/"
-
-# IMPORTANTE: Usamos un "User-Agent" para parecer un navegador real.
-# Si no pones esto, muchas webs bloquean el script pensando que es un robot malicioso.
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-}
+from scrapers import parseo, registro
+from scrapers.registro import Campo
+
+# babelsport.com no necesita código propio: basta con describir su listado.
+# Cada carrera es una tarjeta 'row p-3' con dos columnas: el cartel y el evento, con el
+# título (h3), la fecha (el primer span), el lugar y los botones de inscripción y reglamento.
+# Los selectores van a su columna: un span o una imagen sobre el cartel no son la fecha.
+EVENTO = ':scope > div:nth-of-type(2)'
+DEFINICION = registro.Definicion(
+    nombre="Babelsport",
+    origen='BABELSPORT',
+    url="https://www.babelsport.com/eventos-proximos/",
+    url_base="https://www.babelsport.com/",
+    # Última instantánea de las carreras (se usa si la web falla en la siguiente ejecución)
+    ruta_csv='data/babelsport_completo.csv',
+    # Solo se construye el árbol de las tarjetas de las carreras
+    zona=parseo.TARJETAS_BABEL,
+    # Solo las tarjetas con exactamente esas dos columnas
+    elementos='div.row.p-3:has(> div:nth-of-type(2):last-of-type)',
+    campos={
+        'titulo': Campo(f'{EVENTO} h3', obligatorio=True, primero=True),
+        'fecha': Campo(f'{EVENTO} span', obligatorio=True, primero=True),
+        'ubicacion': Campo(f'{EVENTO} div.col-7.mb-4.text-end', defecto="Murcia", primero=True),
+        'imagen': Campo(':scope > div:nth-of-type(1) img', atributo='src', url=True, primero=True),
+        'url_ficha': Campo(f'{EVENTO} a', atributo='href', texto="REGLAMENTO", url=True),
+        'url_inscripcion': Campo(f'{EVENTO} a', atributo='href', texto="INSCRÍBETE", url=True),
+    },
+)
+registro.definir(DEFINICION, orden=30)
+
+RUTA_CSV = DEFINICION.ruta_csv
+
+
+def extraer_carreras(html):
+    """Generador con las carreras de las tarjetas de la página (sin hacer peticiones)."""
+    return registro.extraer_definicion(DEFINICION, html)
+
+
+def iterar_carreras():
+    """Generador: entrega cada carrera en cuanto se ha leído su tarjeta."""
+    return registro.iterar_definicion(DEFINICION)
 
 
 def obtener_carreras():
-    print(f"🔄 Conectando con {url_objetivo}...")
-
-    try:
-        response = requests.get(url_objetivo, headers=headers)
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error de conexión: {e}")
-        return []
-
-    if response.status_code == 200:
-        print("✅ Conexión exitosa. Analizando HTML...")
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        lista_carreras = []
-        carreras = soup.find_all('div', class_='row p-3')
-
-        for carrera in carreras:
-            try:
-
-                imagen, evento = carrera.find_all('div', recursive=False)
-
-                # 1. EXTRAEMOS IMAGEN
-                img_tag = imagen.find('img')
-                img_url = ""
-                if img_tag:
-                    src = img_tag.get('src')
-                    if src:
-                        if src.startswith('http'):
-                            img_url = src
-                        else:
-                            img_url = url_base + src.lstrip('/')
-
-
-                # 2. EXTRAEMOS DATOS DEL EVENTO
-                # 2.1. Extraer Título
-                titulo = evento.find('h3').text.strip()
-
-                # 2.2. Extraer Fecha
-                fecha = evento.find('span').text.strip()
-
-                # 2.3. Extraemos Ubicación
-                ubicacion = "Murcia" 
-                lugar_tag = evento.find('div', class_='col-7 mb-4 text-end')
-                if lugar_tag:
-                    ubicacion = lugar_tag.text.strip()
-
-                # 3. ENLACES
-                enlace_ficha = ""
-                enlace_inscripcion = ""
-                botones = evento.find_all('a')
-
-                for btn in botones:
-                    href = btn.get('href')
-                    texto_btn = btn.get_text(strip=True).upper()
-
-                    if href:
-                        
-                        if not href.startswith('http'):
-                            href = url_base + href.lstrip('/')
-
-                        if "REGLAMENTO" in texto_btn:
-                            enlace_ficha = href
-                        elif "INSCRÍBETE" in texto_btn:
-                            enlace_inscripcion = href
-
-                # Guardamos en un diccionario
-                carrera = {
-                    'titulo': titulo,
-                    'fecha': fecha,
-                    'ubicacion': ubicacion,
-                    "imagen": img_url,
-                    "url_ficha": enlace_ficha,
-                    "url_inscripcion": enlace_inscripcion,
-                    'origen': 'BABELSPORT'  
-                }
-
-                lista_carreras.append(carrera)
-
-            except Exception as e:
-                # Si falta algún dato en una tarjeta, saltamos a la siguiente para no romper el programa
-                print(f"⚠️ Error leyendo una fila: {e}")
-                continue
-
-        # --- RESULTADO EN CONSOLA ---
-        print(f"\n🎉 Se han encontrado {len(lista_carreras)} carreras.")
-        return lista_carreras
-
-    else:
-        print(f"❌ Error al conectar: {response.status_code}")
-        return []
+    return list(iterar_carreras())
 
 
 def ejecucion():
@@ -113,10 +52,10 @@ def ejecucion():
 
     if datos:
         # Guardar en un Excel/CSV para verlos
-        df = pd.DataFrame(datos)
+        df = pd.DataFrame([carrera.a_dict() for carrera in datos])
         cols = ['fecha', 'titulo', 'ubicacion', 'url_inscripcion', 'url_ficha', 'imagen', 'origen']
         df = df[cols]
-        df.to_csv('data/babelsport_completo.csv', index=False, encoding='utf-8-sig')
-        print(f"📂 Datos guardados en 'babelsport_completo.csv'")
+        df.to_csv(RUTA_CSV, index=False, encoding='utf-8-sig')
+        print(f"📂 Datos guardados en '{RUTA_CSV}'")
     else:
-        print("\n⚠️ No se encontraron datos. Revisa los selectores HTML.")
\ No newline at end of file
+        print("\n⚠️ No se encontraron datos. Revisa los selectores HTML.")
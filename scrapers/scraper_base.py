@@ -1,24 +1,19 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import time
 
+from scrapers import cliente_http
+
 # 1. Configuración Inicial
 # URL de la web que queremos leer (Pondremos una de ejemplo)
 url_objetivo = "https://www.alcanzatumeta.es/calendario.php"
 
-# IMPORTANTE: Usamos un "User-Agent" para parecer un navegador real.
-# Si no pones esto, muchas webs bloquean el script pensando que es un robot malicioso.
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-}
-
 
 def obtener_carreras():
     print(f"🔄 Conectando con {url_objetivo}...")
 
     # Hacemos la petición a la web
-    response = requests.get(url_objetivo, headers=headers)
+    response = cliente_http.obtener(url_objetivo)
 
     # Si la respuesta es 200 (OK), procedemos
     if response.status_code == 200:
@@ -1,171 +1,337 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
+import hashlib
+import json
+import os
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from ficheros import escribir_atomico
+from modelo import Carrera
+from scrapers import cliente_http, parseo, registro
+from scrapers.limitador import LimitadorPorHost
 
 # --- CONFIGURACIÓN ---
 url_base = "https://lineadesalida.net/"
 # URL inicial (sin número de página)
 url_inicial = "https://lineadesalida.net/proximas-carreras"
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-}
+# Número de fichas que se descargan a la vez
+CONCURRENCIA = int(os.getenv('LINEADESALIDA_CONCURRENCIA', '4'))
+# Ritmo máximo de peticiones por segundo contra el dominio (sustituye a los time.sleep fijos)
+PETICIONES_POR_SEGUNDO = float(os.getenv('LINEADESALIDA_PETICIONES_POR_SEGUNDO', '2'))
+
+limitador = LimitadorPorHost(PETICIONES_POR_SEGUNDO)
+
+# Modo incremental: no volver a descargar fichas de carreras ya conocidas y sin cambios
+MODO_INCREMENTAL = os.getenv('LINEADESALIDA_INCREMENTAL', '1') == '1'
+# Dejar de paginar al encontrar una página en la que todo es conocido (desactivado por defecto)
+PARAR_SI_PAGINA_CONOCIDA = os.getenv('LINEADESALIDA_PARAR_SI_CONOCIDA', '0') == '1'
+RUTA_INDICE = 'data/indice_lineadesalida.json'
+# Última instantánea de las carreras (se usa si la web falla en la siguiente ejecución)
+RUTA_CSV = 'data/lineadesalida_completo.csv'
+
+
+def descargar(url):
+    """Hace la petición respetando el ritmo máximo permitido para el dominio."""
+    return cliente_http.obtener(url, limitador=limitador)
+
+
+def extraer_detalle(html, url_carrera):
+    """Lee la ficha de una carrera (sin hacer peticiones). Devuelve una Carrera o None."""
+    # Solo se construye el árbol de la ficha y del bloque del reglamento
+    soup = parseo.analizar(html, parseo.FICHA_LINEADESALIDA)
+
+    evento = soup.find('div', class_='row mt-3')
+    if not evento: return None
+
+    # 1. IMAGEN
+    img_tag = evento.find('img')
+    img_url = ""
+    if img_tag:
+        src = img_tag.get('src')
+        if src:
+            if src.startswith('http'):
+                img_url = src
+            else:
+                img_url = url_base + src.lstrip('/')
+
+    # 2. TÍTULO
+    titulo = evento.find('h3').text.strip()
+
+    # 3. DATOS (Lugar, Fecha, Hora) 
+    divs_encontrados = evento.find_all('div', class_="col-12 col-md mb-1 text-center")
+    
+
+    lugar = "Murcia"
+    fecha = "Desconocida"
+
+    textos_limpios = [d.get_text(strip=True) for d in divs_encontrados]
+
+    if len(textos_limpios) >= 3:
+
+        lugar = textos_limpios[0].split(':')[-1].strip()
+        fecha = textos_limpios[1].split(':')[-1].strip()
+
+    # 4. ENLACE FICHA
+    enlace_ficha = ""
+    reglamento = soup.find('div', class_="row px-2 py-3")
+    if reglamento:
+        btn = reglamento.find('a')
+        if btn:
+            href = btn.get('href')
+            if href:
+                if not href.startswith('http'):
+                    href = url_base + href.lstrip('/')
+                enlace_ficha = href
+
+    # 5. ENLACE INSCRIPCIÓN
+    enlace_inscripcion = f"{url_carrera}/invitado"
+
+    return Carrera(
+        titulo=titulo,
+        fecha=fecha,
+        ubicacion=lugar,
+        imagen=img_url,
+        url_ficha=enlace_ficha,
+        url_inscripcion=enlace_inscripcion,
+        origen='LINEADESALIDA'
+    )
+
+
+def extraer_tarjetas(html):
+    """Tarjetas de una página del listado, o None si la página no tiene el bloque de carreras."""
+    # Solo se construye el árbol del bloque con las tarjetas
+    soup = parseo.analizar(html, parseo.LISTADO_LINEADESALIDA)
+    portada = soup.find('div', {"id": "todasCarrerasDiv"})
+    if not portada:
+        return None
+    return portada.find_all('div', class_='col d-flex justify-content-center')
 
 
 def obtener_detalle_carrera(url_carrera):
     """
     Función auxiliar para entrar en la ficha de la carrera y sacar detalles.
-    Devuelve un diccionario o None si falla.
+    Devuelve una Carrera o None si falla.
     """
     try:
-        response = requests.get(url_carrera, headers=headers)
+        response = descargar(url_carrera)
         if response.status_code != 200:
             return None
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        evento = soup.find('div', class_='row mt-3')
-        if not evento: return None
-
-        # 1. IMAGEN
-        img_tag = evento.find('img')
-        img_url = ""
-        if img_tag:
-            src = img_tag.get('src')
-            if src:
-                if src.startswith('http'):
-                    img_url = src
-                else:
-                    img_url = url_base + src.lstrip('/')
-
-        # 2. TÍTULO
-        titulo = evento.find('h3').text.strip()
-
-        # 3. DATOS (Lugar, Fecha, Hora) 
-        divs_encontrados = evento.find_all('div', class_="col-12 col-md mb-1 text-center")
-        
-
-        lugar = "Murcia"
-        fecha = "Desconocida"
-
-        textos_limpios = [d.get_text(strip=True) for d in divs_encontrados]
-
-        if len(textos_limpios) >= 3:
-
-            lugar = textos_limpios[0].split(':')[-1].strip()
-            fecha = textos_limpios[1].split(':')[-1].strip()
-
-        # 4. ENLACE FICHA
-        enlace_ficha = ""
-        reglamento = soup.find('div', class_="row px-2 py-3")
-        if reglamento:
-            btn = reglamento.find('a')
-            if btn:
-                href = btn.get('href')
-                if href:
-                    if not href.startswith('http'):
-                        href = url_base + href.lstrip('/')
-                    enlace_ficha = href
-
-        # 5. ENLACE INSCRIPCIÓN
-        enlace_inscripcion = f"{url_carrera}/invitado"
-
-        return {
-            'titulo': titulo,
-            'fecha': fecha,
-            'ubicacion': lugar,
-            "imagen": img_url,
-            "url_ficha": enlace_ficha,
-            "url_inscripcion": enlace_inscripcion,
-            'origen': 'LINEADESALIDA'
-        }
+        return extraer_detalle(response.text, url_carrera)
 
     except Exception as e:
         print(f"⚠️ Error leyendo detalle: {e}")
         return None
 
 
-def obtener_todas_las_carreras():
-    lista_carreras = []
-    pagina = 1
-
-    while True:
-
-        # Si es la pagina 1, la URL es la base. Si es la 2, añadimos el parámetro.
-        if pagina == 1:
-            url_actual = url_inicial
-        else:
-            url_actual = f"{url_inicial}?page={pagina}"
-            
-
-        print(f"\n📄 Escaneando PÁGINA {pagina} ({url_actual})...")
-
-        response = requests.get(url_actual, headers=headers)
-
-        if response.status_code != 200:
-            print("⛔ Fin de la paginación o error de red.")
-            break
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        portada = soup.find('div', {"id": "todasCarrerasDiv"})
-        if not portada:
-            print("⛔ No se encontró el div 'todasCarrerasDiv'. Fin.")
-            break
-
-        carreras = portada.find_all('div', class_='col d-flex justify-content-center')
-
-        # Si no hay items en esta página, hemos terminado
-        if not carreras:
-            print("⛔ Página vacía. Hemos terminado.")
-            break
-  
-        nuevas_carreras_en_pagina = 0
-        for carrera in carreras:
-            try:
-                # Sacar URL de la pagina de detalle
-                enlace_tag = carrera.find('a')
-                if not enlace_tag: continue
-
-                url_relativa = enlace_tag['href']
-                url_final = url_base + url_relativa.lstrip('/')
+def cargar_indice():
+    """Índice local {url_ficha: {'huella', 'carrera'}} de carreras ya descargadas."""
+    if not os.path.exists(RUTA_INDICE):
+        return {}
+    try:
+        with open(RUTA_INDICE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ No se pudo leer el índice ({e}). Se hará un recorrido completo.")
+        return {}
 
-                # Llamada a la función de detalle
-                detalle = obtener_detalle_carrera(url_final)
 
-                if detalle:
-                    lista_carreras.append(detalle)
-                    nuevas_carreras_en_pagina += 1
+def guardar_indice(indice):
+    escribir_atomico(RUTA_INDICE, json.dumps(indice, ensure_ascii=False).encode('utf-8'))
 
-                # ¡VITAL! Esperar 1 segundo entre carrera y carrera para no ser baneado
-                time.sleep(1)
 
-            except Exception as e:
-                print(f"   ❌ Error en item: {e}")
-                continue
+def huella_tarjeta(tarjeta):
+    """
+    Hash de la tarjeta del listado (su texto con los espacios normalizados, sus enlaces y sus
+    imágenes): si no cambia, la ficha tampoco. No depende del analizador HTML (ver parseo.py).
+    """
+    partes = [' '.join(tarjeta.get_text(' ').split())]
+    partes += [etiqueta.get('href', '') for etiqueta in tarjeta.find_all('a')]
+    partes += [etiqueta.get('src', '') for etiqueta in tarjeta.find_all('img')]
+    return hashlib.sha1('\x1f'.join(partes).encode('utf-8')).hexdigest()
 
-        if nuevas_carreras_en_pagina == 0:
-            print("⚠️ No se pudieron extraer carreras válidas de esta página.")
-            
 
-        pagina += 1
+def iterar_todas_las_carreras(incremental=None, parar_si_conocida=None):
+    """
+    Recorre el listado página a página y va encargando las fichas de detalle
+    a un pool de hilos según se descubren, sin esperar a terminar la paginación.
+    Es un generador: entrega las carreras en el orden del listado en cuanto
+    están listas, así la fusión puede ir preparándolas mientras se sigue descargando.
+
+    En modo incremental no se descargan las fichas cuya tarjeta del listado no ha
+    cambiado desde la última vez (se reutiliza lo guardado en el índice) y, si
+    `parar_si_conocida` está activo, se deja de paginar al llegar a una página
+    en la que todas las carreras ya eran conocidas.
+    """
+    if incremental is None:
+        incremental = MODO_INCREMENTAL
+    if parar_si_conocida is None:
+        parar_si_conocida = PARAR_SI_PAGINA_CONOCIDA
 
-        # Pausa extra al cambiar de página
-        time.sleep(2)
-    
-    print(f"\n🎉 Se han encontrado un total de {len(lista_carreras)} carreras.")
+    indice = cargar_indice() if incremental else {}
 
-    return lista_carreras
+    # (url, huella, carrera conocida o futuro con la descarga), en el orden del listado
+    pendientes = deque()
+    vistas = set()
+    pagina = 1
+    peticiones = 0
+    reutilizadas = 0
+    encontradas = 0
+    parada_anticipada = False
+    # Solo si el listado termina de forma normal (página vacía o sin el bloque de carreras)
+    # se sabe qué carreras ya no están publicadas. Si no, aquí queda el motivo.
+    error_listado = None
+    inicio = time.monotonic()
+
+    def entregar(esperar):
+        """Saca de la cola las fichas ya resueltas (o todas, si `esperar`) respetando el orden."""
+        nonlocal peticiones, reutilizadas, encontradas
+        while pendientes:
+            url_final, huella, resultado = pendientes[0]
+            if isinstance(resultado, Carrera):
+                detalle = resultado
+                reutilizadas += 1
+            elif esperar or resultado.done():
+                detalle = resultado.result()
+                peticiones += 1
+            else:
+                return
+            pendientes.popleft()
+            vistas.add(url_final)
+            if detalle:
+                indice[url_final] = {'huella': huella, 'carrera': detalle.a_dict()}
+                encontradas += 1
+                yield detalle
+
+    with ThreadPoolExecutor(max_workers=max(1, CONCURRENCIA)) as pool:
+        while True:
+
+            # Si es la pagina 1, la URL es la base. Si es la 2, añadimos el parámetro.
+            if pagina == 1:
+                url_actual = url_inicial
+            else:
+                url_actual = f"{url_inicial}?page={pagina}"
+
+            print(f"\n📄 Escaneando PÁGINA {pagina} ({url_actual})...")
 
-def ejecucion():
-    datos = obtener_todas_las_carreras()
+            try:
+                response = descargar(url_actual)
+            except requests.exceptions.RequestException as e:
+                error_listado = f"error de conexión en la página {pagina} ({e})"
+                break
+            peticiones += 1
+
+            if response.status_code != 200:
+                # Un 5xx/429 tras los reintentos (o el 504 sin conexión) no es el final del listado
+                error_listado = f"error {response.status_code} en la página {pagina}"
+                break
+
+            carreras = extraer_tarjetas(response.text)
+            if carreras is None:
+                print("⛔ No se encontró el div 'todasCarrerasDiv'. Fin.")
+                break
+
+            # Si no hay items en esta página, hemos terminado
+            if not carreras:
+                print("⛔ Página vacía. Hemos terminado.")
+                break
+
+            enlaces_en_pagina = 0
+            conocidas_en_pagina = 0
+            for carrera in carreras:
+                try:
+                    # Sacar URL de la pagina de detalle
+                    enlace_tag = carrera.find('a')
+                    if not enlace_tag: continue
+
+                    url_relativa = enlace_tag['href']
+                    url_final = url_base + url_relativa.lstrip('/')
+                    huella = huella_tarjeta(carrera)
+                    enlaces_en_pagina += 1
+
+                    conocida = indice.get(url_final)
+                    if conocida and conocida['huella'] == huella:
+                        pendientes.append((url_final, huella, Carrera.desde_dict(conocida['carrera'])))
+                        conocidas_en_pagina += 1
+                        continue
+
+                    # La ficha se descarga en segundo plano; el limitador marca el ritmo
+                    pendientes.append((url_final, huella, pool.submit(obtener_detalle_carrera, url_final)))
+
+                except Exception as e:
+                    print(f"   ❌ Error en item: {e}")
+                    continue
+
+            if enlaces_en_pagina == 0:
+                print("⚠️ No se pudieron extraer carreras válidas de esta página.")
+
+            # Lo que ya esté descargado se entrega sin esperar a las páginas siguientes
+            yield from entregar(esperar=False)
+
+            if parar_si_conocida and enlaces_en_pagina > 0 and conocidas_en_pagina == enlaces_en_pagina:
+                print("⏹️ Todas las carreras de esta página ya eran conocidas. Paramos aquí.")
+                parada_anticipada = True
+                break
+
+            pagina += 1
+
+        # Esperamos a las fichas que aún se estén descargando
+        yield from entregar(esperar=True)
+
+    # Si no hemos llegado al final del listado, las carreras conocidas de las
+    # páginas que no se han visitado siguen siendo válidas
+    if parada_anticipada:
+        for url_final, entrada in list(indice.items()):
+            if url_final not in vistas:
+                reutilizadas += 1
+                encontradas += 1
+                yield Carrera.desde_dict(entrada['carrera'])
+
+    # Si hemos recorrido el listado entero, lo que no aparece ya no está publicado
+    if not parada_anticipada and not error_listado:
+        indice = {url: entrada for url, entrada in indice.items() if url in vistas}
+    guardar_indice(indice)
+
+    # Las fichas ya descargadas quedan en el índice, pero la lista está incompleta
+    if error_listado:
+        print(f"⛔ {error_listado.capitalize()}. Se deja el índice como estaba.")
+        raise registro.ErrorFuente(f"listado incompleto: {error_listado}")
+
+    duracion = time.monotonic() - inicio
+    print(f"\n🎉 Se han encontrado un total de {encontradas} carreras "
+          f"({reutilizadas} reutilizadas del índice sin descargar la ficha).")
+    if duracion > 0:
+        print(f"⏱️ {peticiones} peticiones en {duracion:.1f}s "
+              f"({peticiones / duracion:.2f} peticiones/s, {encontradas / duracion:.2f} carreras/s) "
+              f"con {CONCURRENCIA} hilos y límite de {PETICIONES_POR_SEGUNDO} peticiones/s.")
+
+
+def obtener_todas_las_carreras(incremental=None, parar_si_conocida=None):
+    return list(iterar_todas_las_carreras(incremental=incremental, parar_si_conocida=parar_si_conocida))
+
+
+def ejecucion(incremental=None):
+    datos = obtener_todas_las_carreras(incremental=incremental)
 
     if datos:
-        df = pd.DataFrame(datos)
+        df = pd.DataFrame([carrera.a_dict() for carrera in datos])
         cols = ['fecha', 'titulo', 'ubicacion', 'url_inscripcion', 'url_ficha', 'imagen', 'origen']
         df = df[cols]
-        df.to_csv('data/lineadesalida_completo.csv', index=False, encoding='utf-8-sig')
-        print(f"📂 Datos guardados en 'data/lineadesalida_completo.csv'")
+        df.to_csv(RUTA_CSV, index=False, encoding='utf-8-sig')
+        print(f"📂 Datos guardados en '{RUTA_CSV}'")
         print(f"\n🎉 ¡Éxito Total! Se han guardado {len(datos)} carreras.")
     else:
         print("\n⚠️ No se encontraron datos. Revisa los selectores HTML.")
+
+
+# En el recorrido completo se vuelven a descargar todas las fichas aunque ya las conozcamos
+registro.registrar(
+    "Linea de Salida",
+    lambda completo: iterar_todas_las_carreras(incremental=False if completo else None),
+    RUTA_CSV,
+    orden=20,
+)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos del pipeline están en la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migraciones  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Base SQLite temporal con todas las migraciones aplicadas."""
+    import libsql_client
+
+    client = libsql_client.create_client_sync(f"file:{tmp_path / 'carreras.db'}")
+    try:
+        migraciones.migrar(client)
+        yield client
+    finally:
+        client.close()
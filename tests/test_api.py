@@ -0,0 +1,50 @@
+import json
+
+import api
+import base_datos
+from modelo import Carrera
+
+
+def test_refrescar_quita_las_filas_borradas(client):
+    base_datos.sincronizar_carreras(client, [
+        Carrera(titulo='Media Maratón de Murcia', fecha='15-11-2026', ubicacion='Murcia', origen='A'),
+        Carrera(titulo='Carrera del Puerto', fecha='22-11-2026', ubicacion='Cartagena', origen='A'),
+    ])
+    indice = api.IndiceCarreras(conectar=lambda: client)
+    indice.refrescar()
+    assert indice.version.total == 2
+
+    client.execute("DELETE FROM carreras WHERE titulo = 'Carrera del Puerto'")
+    indice.refrescar(forzar=True)
+
+    assert [c['titulo'] for c in indice.por_id.values()] == ['Media Maratón de Murcia']
+    assert indice.version.total == 1
+    assert indice.refrescar(forzar=True) == 0
+
+
+def test_buscar_cuenta_el_total_y_refresca_si_falta_una_fila(client, monkeypatch):
+    base_datos.sincronizar_carreras(client, [
+        Carrera(titulo='Media Maratón de Murcia', fecha='15-11-2026', ubicacion='Murcia', origen='A'),
+        Carrera(titulo='Media Maratón de Cartagena', fecha='22-11-2026', ubicacion='Cartagena', origen='A'),
+    ])
+    indice = api.IndiceCarreras(conectar=lambda: client)
+    indice.refrescar()
+    monkeypatch.setattr(api, 'indice', indice)
+
+    # Escrita después de cargar el índice y antes del siguiente refresco
+    base_datos.sincronizar_carreras(client, [
+        Carrera(titulo='Media Maratón de Lorca', fecha='01-11-2026', ubicacion='Lorca', origen='A'),
+    ])
+    _, cuerpo = api.responder_busqueda(indice.version, {'q': 'media maraton', 'desde': '2026-01-01'})
+
+    respuesta = json.loads(cuerpo)
+    assert respuesta['total'] == 3
+    assert sorted(c['ubicacion'] for c in respuesta['carreras']) == [
+        'Cartagena', 'Lorca', 'Murcia']
+    assert indice.version.total == 3
+
+    # El total es de todas las que hay, no de las que caben en el límite
+    _, cuerpo = api.responder_busqueda(indice.version, {'q': 'media maraton', 'desde': '2026-01-01', 'limite': '1'})
+    respuesta = json.loads(cuerpo)
+    assert respuesta['total'] == 3
+    assert len(respuesta['carreras']) == 1
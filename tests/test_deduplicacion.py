@@ -0,0 +1,58 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import deduplicacion
+
+DIA = datetime.date(2026, 2, 15)
+
+
+@pytest.mark.parametrize('titulo, normalizado', [
+    ('XXXV Carrera Alcalde de La Unión 2026', 'carrera alcalde de la union'),
+    ('Cross de Lorca, XV edición', 'cross de lorca edicion'),
+    ('12º Trail de Yecla', 'trail de yecla'),
+    # Palabras y siglas que parecen números romanos pero no son la edición
+    ('Mi Primera Carrera', 'mi primera carrera'),
+    ('Trail Vi Mar', 'trail vi mar'),
+    ('Marcha MD', 'marcha md'),
+    ('XII', 'xii'),
+])
+def test_normalizar_titulo_quita_la_edicion(titulo, normalizado):
+    assert deduplicacion.normalizar_titulo(titulo) == normalizado
+
+
+def test_claves_de_bloqueo_sin_palabras_vacias():
+    assert deduplicacion.claves_bloqueo('media maraton de santomera') == {'medi', 'mara', 'sant'}
+    assert deduplicacion.claves_bloqueo('carrera de la') == set()
+
+
+def test_solo_se_comparan_las_que_comparten_clave():
+    claves = [{'medi', 'mara'}, {'mara', 'sant'}, {'cros'}, set()]
+    izquierda, derecha = deduplicacion._pares_candidatos(claves, np.array([1, 1, 1, 1]), 0)
+    # La que no tiene claves se compara con todas las de su ventana
+    assert sorted(zip(izquierda.tolist(), derecha.tolist())) == [(0, 1), (0, 3), (1, 3), (2, 3)]
+
+
+@pytest.mark.parametrize('dias, ventana, grupos', [
+    (1, 1, [[0, 1]]),
+    (2, 1, [[0], [1]]),
+    (1, 0, [[0], [1]]),
+    (2, 2, [[0, 1]]),
+])
+def test_ventana_de_dias(dias, ventana, grupos):
+    titulos = ['Media Maratón de Santomera', 'Media Maraton Santomera']
+    fechas = [DIA, DIA + datetime.timedelta(days=dias)]
+    assert deduplicacion.agrupar_duplicados(titulos, fechas, ventana_dias=ventana) == grupos
+
+
+def test_misma_carrera_con_y_sin_edicion():
+    titulos = ['XXXV Carrera Alcalde de La Unión', 'Carrera Alcalde de la Union 2026']
+    assert deduplicacion.agrupar_duplicados(titulos, [DIA, DIA]) == [[0, 1]]
+
+
+def test_dos_pruebas_del_mismo_evento_no_se_juntan():
+    # Mismo día, mismo pueblo y casi el mismo nombre: la carrera de adultos y la infantil
+    titulos = ['XII San Jorge Dragon Trail', 'XII San Jorge Dragon Kid Cross']
+    ubicaciones = ['Molina De Segura / MURCIA'] * 2
+    assert deduplicacion.agrupar_duplicados(titulos, [DIA, DIA], ubicaciones) == [[0], [1]]
@@ -0,0 +1,39 @@
+import datetime
+
+import feeds
+
+
+def _carrera(titulo, fecha):
+    return {'titulo': titulo, 'fecha': fecha, 'ubicacion': 'Lorca', 'imagen': None, 'url_inscripcion': None,
+            'url_ficha': 'https://ejemplo.es/ficha', 'origen': 'PRUEBA', 'imagen_estado': None,
+            'imagen_ancho': None, 'imagen_alto': None, 'imagen_miniatura': None}
+
+
+def test_dtstamp_es_la_hora_de_generacion():
+    generado = datetime.datetime(2026, 10, 18, 6, 30, 5, tzinfo=datetime.timezone.utc)
+    contenido = feeds.calendario([_carrera('Cross de Lorca', '2026-11-10')], 'Prueba', generado)
+    assert b'DTSTAMP:20261018T063005Z\r\n' in contenido
+    assert b'DTSTART;VALUE=DATE:20261110\r\n' in contenido
+
+
+def test_solo_el_dtstamp_distinto_no_reescribe(tmp_path):
+    carreras = [_carrera('Cross de Lorca', '2026-11-10')]
+    antes = datetime.datetime(2026, 10, 17, 6, 0, tzinfo=datetime.timezone.utc)
+    ruta = str(tmp_path / 'carreras.ics')
+    assert feeds.escribir_si_cambia(ruta, feeds.calendario(carreras, 'Prueba', antes))
+    assert not feeds.escribir_si_cambia(ruta, feeds.calendario(carreras, 'Prueba'))
+    assert feeds.escribir_si_cambia(ruta, feeds.calendario(carreras + [_carrera('Trail', '2026-11-12')], 'Prueba'))
+
+
+def test_el_mes_en_curso_no_cambia_al_pasar_los_dias(client, tmp_path):
+    # La web quita las carreras pasadas; el feed empieza el día 1 y no pierde una cada día
+    for titulo, fecha in (('Cross de Lorca', '2026-11-10'), ('Trail de Yecla', '2026-11-25')):
+        client.execute("INSERT INTO carreras (titulo, titulo_normalizado, fecha, ubicacion, url_ficha, origen) "
+                       "VALUES (?, ?, ?, 'Lorca', 'https://ejemplo.es/ficha', 'PRUEBA')",
+                       [titulo, titulo.lower(), fecha])
+
+    primero = feeds.actualizar_feeds(client, str(tmp_path), hoy=datetime.date(2026, 11, 5))
+    despues = feeds.actualizar_feeds(client, str(tmp_path), hoy=datetime.date(2026, 11, 20))
+
+    assert 'meses/2026-11.json' in primero['escritos']
+    assert despues['escritos'] == []
@@ -0,0 +1,37 @@
+import geografia
+
+
+def _insertar(client, titulo, ubicacion, ubicacion_normalizada=None, publicada=0):
+    client.execute(
+        "INSERT INTO carreras (titulo, titulo_normalizado, fecha, ubicacion, ubicacion_normalizada, publicada) "
+        "VALUES (?, ?, '2026-11-10', ?, ?, ?)",
+        [titulo, titulo.lower(), ubicacion, ubicacion_normalizada, publicada],
+    )
+
+
+def _filas(client):
+    return [tuple(fila) for fila in client.execute(
+        "SELECT ubicacion, ubicacion_normalizada, latitud IS NOT NULL, publicada FROM carreras ORDER BY id").rows]
+
+
+def test_dos_escrituras_del_mismo_pueblo_dejan_una_fila(client):
+    # Con el nomenclátor viejo eran dos lugares; con el nuevo, los dos son Lorca
+    _insertar(client, 'Cross de Lorca', 'Lorca', 'Lorca')
+    _insertar(client, 'Cross de Lorca', 'Lorca / MURCIA', 'Lorca / MURCIA', publicada=1)
+    _insertar(client, 'Trail de Yecla', 'Yecla')
+
+    sin_reconocer = geografia.geocodificar_tabla(client, solo_pendientes=False)
+
+    assert not sin_reconocer
+    assert _filas(client) == [('Lorca', 'Lorca', 1, 1), ('Yecla', 'Yecla', 1, 0)]
+    repetidas = client.execute("SELECT ubicacion FROM carreras_repetidas").rows
+    assert [tuple(fila) for fila in repetidas] == [('Lorca / MURCIA',)]
+
+
+def test_una_ubicacion_sin_reconocer_no_borra_la_que_habia(client):
+    _insertar(client, 'Cross del Paraje', 'Paraje Raro', 'Paraje')
+
+    sin_reconocer = geografia.geocodificar_tabla(client, solo_pendientes=False)
+
+    assert sin_reconocer == {'Paraje Raro': 1}
+    assert _filas(client) == [('Paraje Raro', 'Paraje', 0, 0)]
@@ -0,0 +1,13 @@
+import imagenes
+
+
+def test_la_miniatura_se_guarda_como_ruta_publicada(tmp_path, monkeypatch):
+    monkeypatch.setattr(imagenes, 'CARPETA', str(tmp_path))
+    monkeypatch.setattr(imagenes, 'ANCHOS', [640, 320])
+    for ancho in (320, 640):
+        (tmp_path / 'miniaturas').mkdir(exist_ok=True)
+        (tmp_path / 'miniaturas' / f'abc_{ancho}.webp').write_bytes(b'RIFF')
+
+    # Ya están hechas: no hace falta Pillow ni el original
+    assert imagenes.crear_miniaturas('abc') == 'miniaturas/abc_320.webp'
+    assert (tmp_path / imagenes.crear_miniaturas('abc')).exists()
@@ -0,0 +1,61 @@
+import base_datos
+import instagram
+from modelo import Carrera
+
+
+class _SinCerrar:
+    """El cliente de la prueba: publicar_pendientes lo cierra al terminar y el fixture también."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, nombre):
+        return getattr(self.client, nombre)
+
+    def close(self):
+        pass
+
+
+def _estados(client):
+    return [tuple(fila) for fila in client.execute(
+        "SELECT ubicacion_normalizada, publicada FROM carreras ORDER BY id").rows]
+
+
+def test_reserva_y_marca_por_id(client, monkeypatch):
+    # Mismo título y fecha en dos pueblos: son dos filas y se publican por separado
+    base_datos.sincronizar_carreras(client, [
+        Carrera(titulo='San Silvestre', fecha='31-12-2099', ubicacion='Lorca', origen='A'),
+        Carrera(titulo='San Silvestre', fecha='31-12-2099', ubicacion='Yecla', origen='B'),
+    ])
+    enviadas = []
+    monkeypatch.setattr(instagram, 'WEBHOOK_URL', 'https://ejemplo.es/webhook')
+    monkeypatch.setattr(base_datos, 'MODO_BD', 'local')
+    monkeypatch.setattr(base_datos, 'conectar', lambda *args: _SinCerrar(client))
+    monkeypatch.setattr(instagram, 'enviar', lambda carrera, clave, ritmo: enviadas.append(carrera.ubicacion) or True)
+
+    instagram.publicar_pendientes(lote=1)
+    assert len(enviadas) == 1
+    assert sorted(publicada for _, publicada in _estados(client)) == [instagram.PENDIENTE, instagram.PUBLICADA]
+
+    instagram.publicar_pendientes(lote=1)
+    assert sorted(enviadas) == ['Lorca', 'Yecla']
+    assert _estados(client) == [('Lorca', instagram.PUBLICADA), ('Yecla', instagram.PUBLICADA)]
+
+
+def test_las_reservas_viejas_se_liberan_solas(client):
+    base_datos.sincronizar_carreras(client, [
+        Carrera(titulo='Cross de Lorca', fecha='10-11-2099', ubicacion='Lorca', origen='A'),
+        Carrera(titulo='Trail de Yecla', fecha='12-11-2099', ubicacion='Yecla', origen='A'),
+    ])
+    client.batch([
+        ("UPDATE carreras SET publicada = ?, reservada = strftime('%Y-%m-%d %H:%M:%f', 'now', '-2 hours') "
+         "WHERE titulo = 'Cross de Lorca'", [instagram.ENVIANDO]),
+        ("UPDATE carreras SET publicada = ?, reservada = strftime('%Y-%m-%d %H:%M:%f', 'now') "
+         "WHERE titulo = 'Trail de Yecla'", [instagram.ENVIANDO]),
+    ])
+
+    instagram.revisar_atascadas(client, reintentar=False)
+    assert _estados(client) == [('Lorca', instagram.PENDIENTE), ('Yecla', instagram.ENVIANDO)]
+
+    instagram.revisar_atascadas(client, reintentar=True)
+    assert _estados(client) == [('Lorca', instagram.PENDIENTE), ('Yecla', instagram.PENDIENTE)]
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from scrapers import parseo, registro, scraper_lineadesalida
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures')
+
+
+def _fixture(nombre):
+    with open(os.path.join(FIXTURES, nombre), encoding='utf-8') as f:
+        return f.read()
+
+
+class _Respuesta:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+
+# Un <p> sin cerrar: lxml lo cierra antes del <div> y html.parser no, así que el HTML difiere
+TARJETA = ('<div id="todasCarrerasDiv"><div class="col d-flex justify-content-center">'
+           '<a href="/carrera/1"><p>Cross<div>Lorca</div><img src="a.jpg"></a></div></div>')
+
+
+def test_la_huella_no_depende_del_analizador():
+    tarjetas = [
+        parseo.analizar(TARJETA, parseo.LISTADO_LINEADESALIDA, motor=motor)
+        .find('div', class_='col d-flex justify-content-center')
+        for motor in ('lxml', 'html.parser')
+    ]
+    assert str(tarjetas[0]) != str(tarjetas[1])
+    assert scraper_lineadesalida.huella_tarjeta(tarjetas[0]) == scraper_lineadesalida.huella_tarjeta(tarjetas[1])
+
+
+def test_un_error_en_el_listado_falla_la_fuente_sin_podar_el_indice(tmp_path, monkeypatch):
+    ruta = tmp_path / 'indice.json'
+    otra = {'huella': 'x', 'carrera': {'titulo': 'Carrera de la página 2', 'fecha': '2026-11-01'}}
+    ruta.write_text(json.dumps({'https://lineadesalida.net/otra': otra}), encoding='utf-8')
+    monkeypatch.setattr(scraper_lineadesalida, 'RUTA_INDICE', str(ruta))
+
+    def descargar(url):
+        if url == scraper_lineadesalida.url_inicial:
+            return _Respuesta(200, _fixture('lineadesalida_listado.html'))
+        if '?page=' in url:
+            return _Respuesta(503)
+        return _Respuesta(200, _fixture('lineadesalida_ficha.html'))
+    monkeypatch.setattr(scraper_lineadesalida, 'descargar', descargar)
+
+    with pytest.raises(registro.ErrorFuente):
+        list(scraper_lineadesalida.iterar_todas_las_carreras(incremental=True))
+
+    indice = json.loads(ruta.read_text(encoding='utf-8'))
+    assert indice['https://lineadesalida.net/otra'] == otra
+    assert len(indice) > 1
@@ -0,0 +1,42 @@
+import threading
+import time
+
+import main
+
+
+def test_cada_fuente_tiene_su_propio_plazo():
+    # Con una sola a la vez, la segunda empieza cuando acaba la primera: un plazo común la cortaría
+    def lenta():
+        time.sleep(0.3)
+        yield 'carrera'
+
+    fuentes = [('A', lenta, None), ('B', lenta, None)]
+    carreras, estados = main.ejecutar_fuentes(fuentes, timeout=0.5, en_paralelo=1)
+
+    assert estados == {'A': 'ok', 'B': 'ok'}
+    assert carreras == {'A': ['carrera'], 'B': ['carrera']}
+
+
+def test_la_fuente_que_se_pasa_del_plazo_para_y_se_descarta():
+    seguir = threading.Event()
+    entregadas = []
+
+    def colgada():
+        for numero in range(100):
+            entregadas.append(numero)
+            yield f'colgada {numero}'
+            seguir.wait()
+
+    def rapida():
+        yield 'rapida'
+
+    fuentes = [('Colgada', colgada, None), ('Rápida', rapida, None)]
+    carreras, estados = main.ejecutar_fuentes(fuentes, timeout=0.3, en_paralelo=2)
+
+    assert estados == {'Colgada': 'timeout', 'Rápida': 'ok'}
+    assert carreras == {'Colgada': [], 'Rápida': ['rapida']}
+
+    # Al soltarla, ve que se le ha pedido parar y no sigue descargando
+    seguir.set()
+    time.sleep(0.2)
+    assert entregadas == [0, 1]
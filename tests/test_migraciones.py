@@ -0,0 +1,99 @@
+import os
+import re
+
+import pytest
+
+import base_datos
+import feeds
+import geografia
+import migraciones
+from modelo import Carrera
+
+CONSULTAS = migraciones.consultas_calientes()
+INDEX_ASTRO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'front', 'src', 'pages', 'index.astro')
+
+
+def _compacta(sql):
+    return ' '.join(sql.split())
+
+
+def _filas(client, sql):
+    return [tuple(fila) for fila in client.execute(sql).rows]
+
+
+@pytest.mark.parametrize('nombre', list(CONSULTAS))
+def test_consulta_caliente_usa_indice(client, nombre):
+    sql, args = CONSULTAS[nombre]
+    lineas = migraciones.plan(client, sql, args)
+    assert migraciones.problemas_plan(lineas) == [], f"{nombre}: {' | '.join(lineas)}"
+
+
+def test_la_web_hace_la_consulta_de_los_feeds():
+    # index.astro no puede importar la constante: al menos que no se separen sin darnos cuenta
+    with open(INDEX_ASTRO, encoding='utf-8') as f:
+        sql = re.search(r'sql:\s*`([^`]*)`', f.read()).group(1)
+    assert _compacta(sql) == _compacta(feeds.SQL_PROXIMAS)
+
+
+def test_misma_carrera_en_pueblos_distintos_son_dos_filas(client):
+    carreras = [
+        Carrera(titulo='San Silvestre', fecha='31-12-2026', ubicacion='Lorca', origen='A'),
+        Carrera(titulo='San Silvestre', fecha='31-12-2026', ubicacion='Yecla', origen='B'),
+    ]
+    base_datos.sincronizar_carreras(client, carreras)
+    antes = _filas(client, "SELECT id, titulo, ubicacion, modificada FROM carreras ORDER BY id")
+    resumen = base_datos.sincronizar_carreras(client, carreras)
+
+    assert [fila[2] for fila in antes] == ['Lorca', 'Yecla']
+    assert (resumen['sin_cambios'], resumen['actualizada'], resumen['nueva']) == (2, 0, 0)
+    assert _filas(client, "SELECT id, titulo, ubicacion, modificada FROM carreras ORDER BY id") == antes
+
+
+def test_mismo_titulo_en_dias_distintos_son_dos_filas(client):
+    carreras = [
+        Carrera(titulo='Cross Escolar', fecha='2026-11-10', ubicacion='Lorca', origen='A'),
+        Carrera(titulo='Cross Escolar', fecha='2026-12-10', ubicacion='Yecla', origen='A'),
+    ]
+    base_datos.sincronizar_carreras(client, carreras)
+    resumen = base_datos.sincronizar_carreras(client, carreras)
+
+    assert _filas(client, "SELECT id, titulo, fecha, ubicacion FROM carreras ORDER BY id") == [
+        (1, 'Cross Escolar', '2026-11-10', 'Lorca'),
+        (2, 'Cross Escolar', '2026-12-10', 'Yecla'),
+    ]
+    assert (resumen['sin_cambios'], resumen['actualizada'], resumen['nueva']) == (2, 0, 0)
+
+
+@pytest.mark.parametrize('guardada, estado, esperada', [
+    ('propia.jpg', None, 'propia.jpg'),
+    ('propia.jpg', 'rota', 'nueva.jpg'),
+    (base_datos.IMAGEN_DEFECTO_URL_ALCANZA, None, 'nueva.jpg'),
+])
+def test_on_conflict_aplica_la_regla_de_la_imagen(client, guardada, estado, esperada):
+    carrera = Carrera(titulo='Trail de Moratalla', fecha='2026-10-25', ubicacion='Moratalla', origen='A')
+    base_datos.sincronizar_carreras(client, [carrera])
+    client.execute("UPDATE carreras SET imagen = ?, imagen_estado = ?", [guardada, estado])
+
+    # Lo que haría otra ejecución que no había visto la fila al leer
+    client.execute(base_datos.SQL_INSERTAR, [
+        carrera.fecha, carrera.titulo, carrera.ubicacion, None, None, 'nueva.jpg', 'A', 'h', carrera.clave,
+        *geografia.columnas_ubicacion(carrera.ubicacion),
+    ])
+    assert _filas(client, "SELECT imagen FROM carreras") == [(esperada,)]
+
+
+def test_titulo_cambiado_actualiza_la_fila(client):
+    base_datos.sincronizar_carreras(client, [
+        Carrera(titulo='San Silvestre', fecha='31-12-2026', ubicacion='Lorca', origen='A'),
+    ])
+    base_datos.sincronizar_carreras(client, [
+        Carrera(titulo='XX San Silvestre', fecha='31-12-2026', ubicacion='Lorca', origen='A'),
+    ])
+    assert _filas(client, "SELECT id, titulo FROM carreras") == [(1, 'XX San Silvestre')]
+
+
+def test_la_10_deshace_la_clave_de_la_4(client):
+    indices = {fila[0] for fila in _filas(client, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert 'ux_carreras_clave' in indices
+    assert 'ux_carreras_titulo_fecha' not in indices
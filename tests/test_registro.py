@@ -0,0 +1,41 @@
+import pytest
+import requests
+
+from scrapers import cliente_http, registro
+
+
+class _Respuesta:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+
+DEFINICION = registro.Definicion(
+    nombre='Prueba', origen='PRUEBA', url='https://ejemplo.es/carreras', url_base='https://ejemplo.es/',
+    elementos='div.carrera', ruta_csv='data/prueba.csv', pagina='?page={pagina}',
+    campos={'titulo': registro.Campo('h3', obligatorio=True), 'fecha': registro.Campo('span')},
+)
+PAGINA = '<div class="carrera"><h3>Cross de Lorca</h3><span>2026-11-10</span></div>'
+
+
+@pytest.mark.parametrize('fallo', [_Respuesta(503), requests.exceptions.ConnectionError('sin red')])
+def test_una_pagina_que_falla_no_es_el_final_del_listado(monkeypatch, fallo):
+    def obtener(url, limitador=None):
+        if url == DEFINICION.url:
+            return _Respuesta(200, PAGINA)
+        if isinstance(fallo, Exception):
+            raise fallo
+        return fallo
+    monkeypatch.setattr(cliente_http, 'obtener', obtener)
+
+    leidas = []
+    with pytest.raises(registro.ErrorFuente):
+        for carrera in registro.iterar_definicion(DEFINICION):
+            leidas.append(carrera.titulo)
+    assert leidas == ['Cross de Lorca']
+
+
+def test_una_pagina_vacia_es_el_final_del_listado(monkeypatch):
+    monkeypatch.setattr(cliente_http, 'obtener',
+                        lambda url, limitador=None: _Respuesta(200, PAGINA if url == DEFINICION.url else ''))
+    assert [c.titulo for c in registro.iterar_definicion(DEFINICION)] == ['Cross de Lorca']